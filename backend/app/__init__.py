@@ -1,9 +1,9 @@
 import os
-from flask import Flask, jsonify, send_from_directory, request
+from flask import Flask, g, jsonify, send_from_directory, request
 from pathlib import Path
 
 from .config import get_config
-from .extensions import db, migrate, jwt, cors, csrf, socketio
+from .extensions import db, migrate, jwt, cors, csrf, socketio, cache, make_celery
 
 
 def ensure_test_accounts(app: Flask) -> None:
@@ -65,6 +65,7 @@ def register_blueprints(app: Flask) -> None:
     from .blueprints.schools import bp as schools_bp
     from .blueprints.events import bp as events_bp
     from .blueprints.news import bp as news_bp
+    from .blueprints.batch import bp as batch_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(users_bp)
@@ -75,6 +76,23 @@ def register_blueprints(app: Flask) -> None:
     app.register_blueprint(schools_bp)
     app.register_blueprint(events_bp)
     app.register_blueprint(news_bp)
+    app.register_blueprint(batch_bp)
+
+
+def init_celery(app: Flask):
+    """Bind a Celery app to this Flask app and register the shared tasks."""
+    celery = make_celery(app)
+    app.extensions["celery"] = celery
+    from .tasks import (  # noqa: F401
+        document_previews,
+        document_text,
+        document_uploads,
+        news_images,
+        storage_cleanup,
+        storage_quota,
+    )
+
+    return celery
 
 
 def create_app(config_name: str | None = None) -> Flask:
@@ -88,8 +106,13 @@ def create_app(config_name: str | None = None) -> Flask:
     # 确保模型被导入，使得 Alembic 能发现元数据
     with app.app_context():
         from . import models  # noqa: F401
+
+        # 测试环境使用内存数据库，直接按模型建表
+        if app.config.get("TESTING"):
+            db.create_all()
     migrate.init_app(app, db)
     jwt.init_app(app)
+    cache.init_app(app)
     # CORS：允许所有来源，特别是本地开发
     cors.init_app(
         app,
@@ -116,12 +139,17 @@ def create_app(config_name: str | None = None) -> Flask:
 
     # Register blueprints
     register_blueprints(app)
+    from .services.file_delivery import validate_config as validate_file_delivery
+
+    validate_file_delivery(app)
+    init_celery(app)
 
     # 避免 API 响应被缓存，确保读取到最新数据
+    # 显式启用条件请求（ETag/Last-Modified）的接口除外，见 services/conditional.py
     @app.after_request
     def add_no_cache_headers(response):
         try:
-            if request.path.startswith('/api/'):
+            if request.path.startswith('/api/') and not g.get("conditional_response"):
                 response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
                 response.headers['Pragma'] = 'no-cache'
                 response.headers['Expires'] = '0'
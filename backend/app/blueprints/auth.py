@@ -2,12 +2,12 @@
 from flask_jwt_extended import (
     create_access_token,
     create_refresh_token,
-    get_jwt_identity,
     jwt_required,
 )
 
 from ..extensions import csrf, db
 from ..models import User
+from ..services.authz import get_current_user
 
 bp = Blueprint("auth", __name__, url_prefix="/api/auth")
 
@@ -78,8 +78,7 @@ def login():
 @jwt_required(refresh=True)
 @csrf.exempt
 def refresh():
-    ident = get_jwt_identity()
-    user = User.query.get(int(ident)) if ident is not None else None
+    user = get_current_user()
     if not user:
         return jsonify({"message": "用户不存在或已被删除"}), 401
 
@@ -109,8 +108,7 @@ def refresh():
 @bp.get("/me")
 @jwt_required()
 def me():
-    ident = get_jwt_identity()
-    user = User.query.get(int(ident)) if ident is not None else None
+    user = get_current_user()
     if not user:
         return jsonify({"message": "未找到用户"}), 404
     return jsonify({"id": user.id, "email": user.email, "name": user.name, "role": user.role}), 200
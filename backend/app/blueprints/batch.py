@@ -0,0 +1,98 @@
+"""``POST /api/batch``: run several read-only GET sub-requests in one round-trip.
+
+The token is verified once up front (a bad token fails the whole batch with
+401). Each sub-request is dispatched through the normal view stack in its own
+app context, built from the batch request's WSGI environ, with the verified
+claims (``VerifiedJWTManager``) and the already loaded user on ``g``, so no
+sub-view decodes the token or reloads the user again.
+"""
+import io
+from urllib.parse import unquote, urlsplit
+
+from flask import Blueprint, current_app, g, jsonify, request
+from flask_jwt_extended import get_jwt, jwt_required
+
+from ..extensions import csrf, db
+from ..services.authz import get_current_user
+
+bp = Blueprint("batch", __name__, url_prefix="/api/batch")
+
+MAX_BATCH_REQUESTS = 20
+# Request headers a sub-request may set itself; Authorization always comes from the batch.
+FORWARDED_HEADERS = ("If-None-Match", "If-Modified-Since", "Accept-Language")
+# Response headers echoed back for each sub-request.
+RETURNED_HEADERS = ("ETag", "Last-Modified", "Cache-Control")
+# Batch request environ keys carried over to sub-requests (server and WSGI data).
+INHERITED_ENVIRON = ("SERVER_NAME", "SERVER_PORT", "SERVER_PROTOCOL", "SCRIPT_NAME", "REMOTE_ADDR", "HTTP_HOST")
+
+
+def subrequest_environ(path: str, headers: dict) -> dict:
+    url = urlsplit(path)
+    environ = {key: value for key, value in request.environ.items() if key.startswith("wsgi.")}
+    environ.update({key: request.environ[key] for key in INHERITED_ENVIRON if key in request.environ})
+    environ.update(
+        {
+            "REQUEST_METHOD": "GET",
+            # WSGI carries the decoded path as latin-1 code points of its UTF-8 bytes.
+            "PATH_INFO": unquote(url.path).encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": url.query,
+            "CONTENT_LENGTH": "0",
+            "wsgi.input": io.BytesIO(),
+        }
+    )
+    for name, value in headers.items():
+        environ["HTTP_" + name.upper().replace("-", "_")] = value
+    return environ
+
+
+def run_subrequest(path: str, headers: dict, verified: tuple[str, dict], user) -> dict:
+    app = current_app._get_current_object()
+    environ = subrequest_environ(path, headers)
+    with app.app_context(), app.request_context(environ):
+        g.verified_jwt = verified
+        g._current_user = db.session.merge(user, load=False) if user is not None else None
+        response = app.full_dispatch_request()
+        body = None
+        if response.is_json:
+            body = response.get_json(silent=True)
+        result = {"status": response.status_code, "body": body}
+        result["headers"] = {name: response.headers[name] for name in RETURNED_HEADERS if name in response.headers}
+        response.close()
+    return result
+
+
+@bp.post("")
+@bp.post("/")
+@jwt_required()
+@csrf.exempt
+def run_batch():
+    data = request.get_json(silent=True) or {}
+    items = data.get("requests")
+    if not isinstance(items, list) or not items:
+        return jsonify({"message": "requests 必须是非空数组"}), 400
+    if len(items) > MAX_BATCH_REQUESTS:
+        return jsonify({"message": f"单次最多 {MAX_BATCH_REQUESTS} 个子请求"}), 400
+
+    prepared = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            return jsonify({"message": f"第 {index + 1} 个子请求格式无效"}), 400
+        method = str(item.get("method") or "GET").upper()
+        path = item.get("path")
+        if method != "GET":
+            return jsonify({"message": "子请求仅支持 GET"}), 400
+        if not isinstance(path, str) or not path.startswith("/api/") or path.startswith("/api/batch"):
+            return jsonify({"message": f"第 {index + 1} 个子请求路径无效"}), 400
+        extra = item.get("headers") if isinstance(item.get("headers"), dict) else {}
+        headers = {name: str(extra[name]) for name in FORWARDED_HEADERS if name in extra}
+        headers["Authorization"] = request.headers["Authorization"]
+        prepared.append((item.get("id", index), path, headers))
+
+    verified = (request.headers["Authorization"].split(None, 1)[-1].strip(), get_jwt())
+    user = get_current_user()
+    responses = []
+    for request_id, path, headers in prepared:
+        result = run_subrequest(path, headers, verified, user)
+        result["id"] = request_id
+        responses.append(result)
+    return jsonify({"responses": responses})
@@ -1,10 +1,31 @@
-﻿import os
-import uuid
-from flask import Blueprint, jsonify, request, send_file, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
+﻿import click
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required
 from werkzeug.utils import secure_filename
 from ..extensions import db, csrf
 from ..models import Document
+from ..services import (
+    chunked_uploads,
+    document_blobs,
+    document_previews,
+    document_storage,
+    document_text,
+    storage_cleanup,
+    storage_quota,
+)
+from ..services.authz import current_user_id, get_current_user
+from ..services.conditional import conditional, table_validator
+from ..services.pagination import (
+    InvalidCursor,
+    apply_created_at_keyset,
+    created_at_cursor,
+    decode_cursor,
+    fetch_page,
+    parse_limit,
+)
+from ..tasks.document_previews import enqueue_preview, preview_or_enqueue
+from ..tasks.document_text import enqueue_extraction
+from ..tasks.storage_cleanup import enqueue_deletions
 
 bp = Blueprint("documents", __name__, url_prefix="/api/documents")
 
@@ -12,6 +33,8 @@ bp = Blueprint("documents", __name__, url_prefix="/api/documents")
 ALLOWED_EXTENSIONS = {
     "txt", "pdf", "png", "jpg", "jpeg", "gif", "doc", "docx", "xls", "xlsx", "ppt", "pptx"
 }
+# Allowance for multipart boundaries/headers when comparing Content-Length with a quota.
+MULTIPART_OVERHEAD = 16 * 1024
 
 
 def allowed_file(filename: str) -> bool:
@@ -22,56 +45,81 @@ def get_file_extension(filename: str) -> str:
     return filename.rsplit(".", 1)[1].lower() if "." in filename else ""
 
 
-def get_current_user_id() -> int | None:
-    ident = get_jwt_identity()
-    if ident is None:
-        return None
-    try:
-        return int(ident)
-    except (TypeError, ValueError):
-        return None
+def serialize_document(doc: Document) -> dict:
+    """List/detail payload; storage keys stay server-side."""
+    return {
+        "id": doc.id,
+        "name": doc.name,
+        "original_name": doc.original_name,
+        "file_size": doc.file_size,
+        "file_type": doc.file_type,
+        "category": doc.category,
+        "created_at": doc.created_at.isoformat() if doc.created_at else None,
+    }
 
 
-def resolve_document_path(path: str | None) -> str | None:
-    """Resolve legacy absolute path to current instance uploads path if needed."""
-    if not path:
-        return None
-    if os.path.exists(path):
-        return path
+def filtered_documents(user_id: int):
+    """Current user's documents narrowed by the ``category``/``file_type`` query args."""
+    query = Document.query.filter(Document.user_id == user_id)
+    category = (request.args.get("category") or "").strip()
+    if category:
+        query = query.filter(Document.category == category)
+    file_type = (request.args.get("file_type") or "").strip().lower()
+    if file_type:
+        query = query.filter(Document.file_type == file_type)
+    return query
 
-    basename = os.path.basename(path)
-    if not basename:
-        return None
 
-    candidate = os.path.join(current_app.instance_path, "uploads", basename)
-    if os.path.exists(candidate):
-        return candidate
-    return None
+def wants_pagination() -> bool:
+    """Paginated mode is opt-in; a bare ``GET /api/documents`` keeps the legacy array."""
+    return "limit" in request.args or "cursor" in request.args
+
+
+def documents_validator():
+    user_id = current_user_id()
+    if user_id is None:
+        return None
+    return table_validator(
+        filtered_documents(user_id),
+        Document.updated_at,
+        user_id,
+        request.query_string.decode("utf-8", "replace"),
+    )
 
 
 @bp.get("")
 @bp.get("/")
 @jwt_required()
+@conditional(documents_validator, private=True)
 def list_documents():
-    """Return all documents for the current JWT user only."""
-    user_id = get_current_user_id()
+    """List the current JWT user's documents, newest first.
+
+    ``category`` and ``file_type`` filter the list. With ``limit`` or
+    ``cursor`` the response is one keyset page ``{items, next_cursor, limit}``
+    served from the ``(user_id, created_at, id)`` index; otherwise a plain array.
+    """
+    user_id = current_user_id()
     if user_id is None:
         return jsonify({"message": "未找到用户"}), 404
 
-    documents = Document.query.filter_by(user_id=user_id).order_by(Document.created_at.desc()).all()
-    return jsonify([
+    query = filtered_documents(user_id)
+    if not wants_pagination():
+        documents = query.order_by(Document.created_at.desc(), Document.id.desc()).all()
+        return jsonify([serialize_document(doc) for doc in documents])
+
+    limit = parse_limit(request.args.get("limit"))
+    try:
+        query = apply_created_at_keyset(query, Document, decode_cursor(request.args.get("cursor")))
+    except InvalidCursor:
+        return jsonify({"message": "分页参数无效"}), 400
+    documents, next_cursor = fetch_page(query, limit, created_at_cursor)
+    return jsonify(
         {
-            "id": doc.id,
-            "name": doc.name,
-            "original_name": doc.original_name,
-            "file_path": doc.file_path,
-            "file_size": doc.file_size,
-            "file_type": doc.file_type,
-            "category": doc.category,
-            "created_at": doc.created_at.isoformat() if doc.created_at else None,
+            "items": [serialize_document(doc) for doc in documents],
+            "next_cursor": next_cursor,
+            "limit": limit,
         }
-        for doc in documents
-    ])
+    )
 
 
 @bp.post("")
@@ -80,10 +128,16 @@ def list_documents():
 @csrf.exempt
 def upload_document():
     """Upload a document for the current JWT user only."""
-    user_id = get_current_user_id()
-    if user_id is None:
+    user = get_current_user()
+    if not user:
         return jsonify({"message": "未找到用户"}), 404
 
+    # Reject before the body is read when it cannot possibly fit.
+    try:
+        storage_quota.check(user, max((request.content_length or 0) - MULTIPART_OVERHEAD, 0))
+    except storage_quota.QuotaExceeded as exc:
+        return jsonify({"message": exc.message, "usage": storage_quota.usage_payload(user)}), 413
+
     if "file" not in request.files:
         return jsonify({"message": "没有选择文件"}), 400
 
@@ -94,28 +148,32 @@ def upload_document():
     if not allowed_file(file.filename):
         return jsonify({"message": "不支持的文件类型"}), 400
 
+    storage_key = None
     try:
         original_filename = secure_filename(file.filename)
         file_extension = get_file_extension(original_filename)
-        unique_filename = f"{uuid.uuid4()}.{file_extension}" if file_extension else str(uuid.uuid4())
-
-        upload_folder = os.path.join(current_app.instance_path, "uploads")
-        os.makedirs(upload_folder, exist_ok=True)
-
-        file_path = os.path.join(upload_folder, unique_filename)
-        file.save(file_path)
-        file_size = os.path.getsize(file_path)
+        storage_key, file_size, digest = document_storage.save_upload(
+            file, file_extension, limit=storage_quota.remaining(user)
+        )
+        blob, redundant_key = document_blobs.claim(digest, storage_key, file_size)
+        storage_quota.charge(user, file_size)
 
         document = Document(
-            user_id=user_id,
+            user_id=user.id,
             name=original_filename,
             original_name=original_filename,
-            file_path=file_path,
+            file_path=blob.storage_key,
+            blob=blob,
             file_size=file_size,
             file_type=file_extension,
         )
         db.session.add(document)
+        storage_cleanup.schedule("documents", redundant_key)
         db.session.commit()
+        if redundant_key:
+            enqueue_deletions()
+        enqueue_extraction(document.id)
+        enqueue_preview(document.id)
 
         return (
             jsonify(
@@ -131,15 +189,146 @@ def upload_document():
             ),
             201,
         )
+    except storage_quota.QuotaExceeded as exc:
+        # Aborted mid-stream or lost a race for the last bytes of quota.
+        db.session.rollback()
+        if storage_key:
+            document_storage.delete_key(storage_key)
+        db.session.refresh(user)
+        return jsonify({"message": exc.message, "usage": storage_quota.usage_payload(user)}), 413
     except Exception as exc:
+        # A file stored before the failure has no row; the orphan sweep removes it.
+        db.session.rollback()
         return jsonify({"message": f"上传失败: {exc}"}), 500
 
 
+def upload_error_response(exc: chunked_uploads.UploadError):
+    return jsonify({"message": exc.message}), exc.status
+
+
+def upload_session_response(session, status: int = 200):
+    response = jsonify(session.to_dict())
+    response.status_code = status
+    response.headers["Upload-Offset"] = str(session.received)
+    response.headers["Upload-Length"] = str(session.total_size)
+    return response
+
+
+@bp.post("/uploads")
+@jwt_required()
+@csrf.exempt
+def create_upload():
+    """Start a resumable upload: ``{filename, size, category?, checksum?}``."""
+    user_id = current_user_id()
+    if user_id is None:
+        return jsonify({"message": "未找到用户"}), 404
+
+    data = request.get_json(silent=True) or {}
+    raw_name = (data.get("filename") or "").strip()
+    if not raw_name:
+        return jsonify({"message": "没有选择文件"}), 400
+    if not allowed_file(raw_name):
+        return jsonify({"message": "不支持的文件类型"}), 400
+
+    filename = secure_filename(raw_name)
+    try:
+        session = chunked_uploads.create_session(
+            user_id,
+            filename=filename,
+            file_type=get_file_extension(filename),
+            size=data.get("size"),
+            category=data.get("category") or "general",
+            checksum=data.get("checksum"),
+        )
+    except chunked_uploads.UploadError as exc:
+        return upload_error_response(exc)
+
+    response = upload_session_response(session, 201)
+    response.headers["Location"] = f"{bp.url_prefix}/uploads/{session.id}"
+    return response
+
+
+@bp.get("/uploads/<upload_id>")
+@jwt_required()
+def get_upload(upload_id: str):
+    """Current offset of a resumable upload (also answers HEAD)."""
+    session = chunked_uploads.get_session(upload_id, current_user_id())
+    if not session:
+        return jsonify({"message": "上传不存在或已过期"}), 404
+    return upload_session_response(session)
+
+
+@bp.patch("/uploads/<upload_id>")
+@jwt_required()
+@csrf.exempt
+def append_upload(upload_id: str):
+    """Append the raw request body at the ``Upload-Offset`` header."""
+    session = chunked_uploads.get_session(upload_id, current_user_id())
+    if not session:
+        return jsonify({"message": "上传不存在或已过期"}), 404
+
+    try:
+        offset = int(request.headers.get("Upload-Offset", ""))
+    except ValueError:
+        return jsonify({"message": "缺少 Upload-Offset 请求头"}), 400
+
+    try:
+        chunked_uploads.append_chunk(session, offset, request.stream, request.content_length)
+    except chunked_uploads.UploadError as exc:
+        return upload_error_response(exc)
+    return upload_session_response(session)
+
+
+@bp.post("/uploads/<upload_id>/complete")
+@jwt_required()
+@csrf.exempt
+def complete_upload(upload_id: str):
+    """Turn a fully received upload into a document."""
+    session = chunked_uploads.get_session(upload_id, current_user_id())
+    if not session:
+        return jsonify({"message": "上传不存在或已过期"}), 404
+
+    try:
+        document, digest = chunked_uploads.finalize(session)
+    except chunked_uploads.UploadError as exc:
+        return upload_error_response(exc)
+    enqueue_deletions()
+    enqueue_extraction(document.id)
+    enqueue_preview(document.id)
+
+    return (
+        jsonify(
+            {
+                "message": "文件上传成功",
+                "document": {
+                    "id": document.id,
+                    "name": document.name,
+                    "file_size": document.file_size,
+                    "file_type": document.file_type,
+                },
+                "sha256": digest,
+            }
+        ),
+        201,
+    )
+
+
+@bp.delete("/uploads/<upload_id>")
+@jwt_required()
+@csrf.exempt
+def abort_upload(upload_id: str):
+    session = chunked_uploads.get_session(upload_id, current_user_id())
+    if not session:
+        return jsonify({"message": "上传不存在或已过期"}), 404
+    chunked_uploads.abort(session)
+    return jsonify({"message": "上传已取消"})
+
+
 @bp.get("/<int:document_id>")
 @jwt_required()
 def get_document(document_id: int):
     """Return metadata for one of current user's documents."""
-    user_id = get_current_user_id()
+    user_id = current_user_id()
     if user_id is None:
         return jsonify({"message": "未找到用户"}), 404
 
@@ -147,17 +336,7 @@ def get_document(document_id: int):
     if not document:
         return jsonify({"message": "文档不存在"}), 404
 
-    return jsonify(
-        {
-            "id": document.id,
-            "name": document.name,
-            "original_name": document.original_name,
-            "file_size": document.file_size,
-            "file_type": document.file_type,
-            "category": document.category,
-            "created_at": document.created_at.isoformat() if document.created_at else None,
-        }
-    )
+    return jsonify(serialize_document(document))
 
 
 def get_mime_type(file_type: str | None) -> str:
@@ -182,11 +361,21 @@ def get_mime_type(file_type: str | None) -> str:
     return mime_types.get(file_type.lower(), "application/octet-stream")
 
 
+@bp.get("/usage")
+@jwt_required()
+def get_usage():
+    """Current user's storage usage and quota."""
+    user = get_current_user()
+    if not user:
+        return jsonify({"message": "未找到用户"}), 404
+    return jsonify(storage_quota.usage_payload(user))
+
+
 @bp.get("/<int:document_id>/view")
 @jwt_required()
 def view_document(document_id: int):
     """View one of current user's documents in browser."""
-    user_id = get_current_user_id()
+    user_id = current_user_id()
     if user_id is None:
         return jsonify({"message": "未找到用户"}), 404
 
@@ -194,27 +383,45 @@ def view_document(document_id: int):
     if not document:
         return jsonify({"message": "文档不存在"}), 404
 
-    resolved_path = resolve_document_path(document.file_path)
-    if not resolved_path:
+    try:
+        return document_storage.send_document(
+            document.file_path,
+            as_attachment=False,
+            download_name=document.original_name,
+            mimetype=get_mime_type(document.file_type),
+        )
+    except FileNotFoundError:
         return jsonify({"message": "文件不存在"}), 404
 
-    if document.file_path != resolved_path:
-        document.file_path = resolved_path
-        db.session.commit()
 
-    return send_file(
-        resolved_path,
-        as_attachment=False,
-        download_name=document.original_name,
-        mimetype=get_mime_type(document.file_type),
-    )
+@bp.get("/<int:document_id>/preview")
+@jwt_required()
+def preview_document(document_id: int):
+    """First-page/thumbnail preview of one of current user's documents."""
+    user_id = current_user_id()
+    if user_id is None:
+        return jsonify({"message": "未找到用户"}), 404
+
+    document = Document.query.filter_by(id=document_id, user_id=user_id).first()
+    if not document:
+        return jsonify({"message": "文档不存在"}), 404
+    if not document_previews.supports(document):
+        return jsonify({"message": "该文件类型不支持预览"}), 404
+
+    try:
+        response = preview_or_enqueue(document)
+    except document_previews.PreviewFailed:
+        return jsonify({"message": "该文件无法生成预览"}), 422
+    if response is None:
+        return jsonify({"message": "预览生成中，请稍后重试"}), 202
+    return response
 
 
 @bp.get("/<int:document_id>/download")
 @jwt_required()
 def download_document(document_id: int):
     """Download one of current user's documents."""
-    user_id = get_current_user_id()
+    user_id = current_user_id()
     if user_id is None:
         return jsonify({"message": "未找到用户"}), 404
 
@@ -222,28 +429,23 @@ def download_document(document_id: int):
     if not document:
         return jsonify({"message": "文档不存在"}), 404
 
-    resolved_path = resolve_document_path(document.file_path)
-    if not resolved_path:
+    try:
+        return document_storage.send_document(
+            document.file_path,
+            as_attachment=True,
+            download_name=document.original_name,
+            mimetype=get_mime_type(document.file_type),
+        )
+    except FileNotFoundError:
         return jsonify({"message": "文件不存在"}), 404
 
-    if document.file_path != resolved_path:
-        document.file_path = resolved_path
-        db.session.commit()
-
-    return send_file(
-        resolved_path,
-        as_attachment=True,
-        download_name=document.original_name,
-        mimetype=get_mime_type(document.file_type),
-    )
-
 
 @bp.put("/<int:document_id>")
 @jwt_required()
 @csrf.exempt
 def update_document(document_id: int):
     """Rename one of current user's documents."""
-    user_id = get_current_user_id()
+    user_id = current_user_id()
     if user_id is None:
         return jsonify({"message": "未找到用户"}), 404
 
@@ -278,7 +480,7 @@ def update_document(document_id: int):
 @csrf.exempt
 def delete_document(document_id: int):
     """Delete one of current user's documents."""
-    user_id = get_current_user_id()
+    user_id = current_user_id()
     if user_id is None:
         return jsonify({"message": "未找到用户"}), 404
 
@@ -287,12 +489,102 @@ def delete_document(document_id: int):
         return jsonify({"message": "文档不存在"}), 404
 
     try:
-        resolved_path = resolve_document_path(document.file_path)
-        if resolved_path and os.path.exists(resolved_path):
-            os.remove(resolved_path)
-
-        db.session.delete(document)
-        db.session.commit()
-        return jsonify({"message": "文档删除成功"})
+        document_blobs.delete_document(document)
     except Exception as exc:
+        db.session.rollback()
         return jsonify({"message": f"删除失败: {exc}"}), 500
+    enqueue_deletions()
+    return jsonify({"message": "文档删除成功"})
+
+
+@bp.cli.command("reconcile-paths")
+@click.option("--batch-size", default=500, show_default=True, help="Rows rewritten per commit.")
+@click.option("--dry-run", is_flag=True, help="Only report what would change.")
+def reconcile_paths_command(batch_size: int, dry_run: bool):
+    """Rewrite legacy absolute document paths as keys relative to DOCUMENT_STORAGE_ROOT."""
+    result = document_storage.reconcile_legacy_paths(batch_size=batch_size, dry_run=dry_run)
+    verb = "Would convert" if dry_run else "Converted"
+    print(f"{verb} {result['converted']} document paths.")
+    if result["missing"]:
+        print(f"Files not found for {len(result['missing'])} documents: {result['missing']}")
+
+
+@bp.cli.command("dedupe")
+@click.option("--batch-size", default=200, show_default=True, help="Documents loaded per query.")
+@click.option("--dry-run", is_flag=True, help="Only report what would change.")
+def dedupe_command(batch_size: int, dry_run: bool):
+    """Hash existing uploads and share one stored file per distinct content."""
+    result = document_blobs.deduplicate_existing(batch_size=batch_size, dry_run=dry_run)
+    verb = "Would link" if dry_run else "Linked"
+    print(
+        f"{verb} {result['linked']} documents; {result['duplicates']} duplicates, "
+        f"{result['bytes_freed']} bytes reclaimable."
+    )
+    if result["legacy"]:
+        print(f"Skipped {len(result['legacy'])} legacy paths; run reconcile-paths first: {result['legacy']}")
+    if result["missing"]:
+        print(f"Files not found for {len(result['missing'])} documents: {result['missing']}")
+    if not dry_run:
+        storage_cleanup.process_pending()
+
+
+@bp.cli.command("purge-uploads")
+def purge_uploads_command():
+    """Delete expired resumable upload sessions and their partial files."""
+    count = chunked_uploads.purge_expired()
+    print(f"Removed {count} expired uploads.")
+
+
+@bp.cli.command("extract-text")
+@click.option("--all", "reextract", is_flag=True, help="Re-extract documents that already have text.")
+def extract_text_command(reextract: bool):
+    """Extract searchable text from uploads (PDF, DOCX, TXT) that have none yet."""
+    from ..models import DocumentText
+
+    query = db.session.query(Document.id).order_by(Document.id)
+    if not reextract:
+        query = query.outerjoin(DocumentText).filter(DocumentText.document_id.is_(None))
+    ids = [row[0] for row in query]
+    statuses: dict[str, int] = {}
+    for document_id in ids:
+        status = document_text.extract_document(document_id)
+        statuses[status] = statuses.get(status, 0) + 1
+    print(f"Processed {len(ids)} documents: {statuses}")
+
+
+@bp.cli.command("reindex-text")
+def reindex_text_command():
+    """Rebuild the document full-text index from extracted text."""
+    count = document_text.rebuild_index()
+    print(f"Indexed {count} documents.")
+
+
+@bp.cli.command("previews")
+@click.option("--retry-failed", is_flag=True, help="Render again documents whose preview failed before.")
+def previews_command(retry_failed: bool):
+    """Render missing previews for every previewable document."""
+    ids = [row[0] for row in db.session.query(Document.id).order_by(Document.id)]
+    created = sum(
+        1 for document_id in ids if document_previews.generate_preview(document_id, retry_failed=retry_failed)
+    )
+    print(f"Checked {len(ids)} documents; {created} have previews.")
+
+
+@bp.cli.command("process-deletions")
+def process_deletions_command():
+    """Delete stored files queued by document deletions and deduplication."""
+    result = storage_cleanup.process_pending()
+    print(f"Deleted {result['deleted']} files, kept {result['kept']} re-referenced, {result['failed']} to retry.")
+
+
+@bp.cli.command("sweep-storage")
+@click.option("--grace-hours", default=24, show_default=True, help="Leave files younger than this alone.")
+@click.option("--dry-run", is_flag=True, help="Only report orphaned files.")
+def sweep_storage_command(grace_hours: int, dry_run: bool):
+    """Find stored files no row references (uploads, previews, news images) and delete them."""
+    found = storage_cleanup.sweep(grace_seconds=grace_hours * 3600, dry_run=dry_run)
+    for namespace, keys in found.items():
+        print(f"{namespace}: {len(keys)} orphaned")
+    if not dry_run:
+        result = storage_cleanup.process_pending()
+        print(f"Deleted {result['deleted']} files, {result['failed']} to retry.")
@@ -1,14 +1,28 @@
-import os
-import re
-import uuid
-from html import unescape
 
-from flask import Blueprint, current_app, jsonify, request, send_from_directory
-from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required
+import click
+from flask import Blueprint, g, jsonify, request
+from sqlalchemy import or_
+from sqlalchemy.orm import joinedload
 from werkzeug.utils import secure_filename
 
 from ..extensions import csrf, db
 from ..models import News, User
+from ..services import news_cache, news_images, news_search
+from ..services.authz import current_user_id, role_required
+from ..services.html_sanitizer import SanitizedHTML
+from ..services.html_sanitizer import sanitize as sanitize_html
+from ..services.conditional import conditional, make_validator, table_validator
+from ..services.file_delivery import send_from_storage
+from ..services.pagination import (
+    InvalidCursor,
+    apply_created_at_keyset,
+    created_at_cursor,
+    decode_cursor,
+    encode_cursor,
+    fetch_page,
+    parse_limit,
+)
+from ..tasks.news_images import enqueue_variants
 
 
 bp = Blueprint("news", __name__, url_prefix="/api/news")
@@ -28,69 +42,20 @@ MIME_TO_EXTENSION = {
     "image/heif": "heif",
     "image/tiff": "tiff",
 }
-NEWS_UPLOAD_SUBDIR = "news_uploads"
 MAX_SUMMARY_LENGTH = 180
+# Plain text needed for an auto summary; the sanitizer stops collecting after this.
+SUMMARY_TEXT_BUDGET = MAX_SUMMARY_LENGTH * 4
 
 
-TAG_DROP_PATTERN = re.compile(r"(?is)<(script|style|iframe|object|embed)[^>]*>.*?</\\1>")
-EVENT_ATTR_PATTERN_DOUBLE = re.compile(r'(?i)\son\w+\s*=\s*"[^"]*"')
-EVENT_ATTR_PATTERN_SINGLE = re.compile(r"(?i)\son\w+\s*=\s*'[^']*'")
-EVENT_ATTR_PATTERN_BARE = re.compile(r"(?i)\son\w+\s*=\s*[^\s>]+")
-JS_URI_PATTERN = re.compile(r"(?i)(href|src)\s*=\s*([\"'])\s*javascript:[^\"']*\\2")
-IMG_SRC_PATTERN = re.compile(r'(?is)<img[^>]+src=["\']([^"\']+)["\']')
-SUMMARY_STRIP_TAG_PATTERN = re.compile(r"(?is)<[^>]+>")
+def sanitize_content(content: str | None) -> SanitizedHTML:
+    """Sanitized HTML, summary text and first image of ``content`` in one pass."""
+    return sanitize_html(content, text_limit=SUMMARY_TEXT_BUDGET)
 
 
-def require_teacher() -> tuple[dict, int] | None:
-    """Check teacher permission using JWT claims first, DB fallback second."""
-    try:
-        claims = get_jwt()
-        role = claims.get("role") if claims else None
-    except Exception:
-        role = None
-
-    if role == "teacher":
-        return None
-
-    ident = get_jwt_identity()
-    try:
-        user_id = int(ident) if ident is not None else None
-    except Exception:
-        user_id = None
-
-    user = User.query.get(user_id) if user_id is not None else None
-    if not user:
-        return {"error": "User not found"}, 404
-    if user.role != "teacher":
-        return {"error": "Teacher role required"}, 403
-    return None
-
-
-def sanitize_news_html(content: str) -> str:
-    """Basic backend sanitization as defense-in-depth.
-
-    Frontend still uses DOMPurify before rendering details.
-    """
-    cleaned = TAG_DROP_PATTERN.sub("", content or "")
-    cleaned = EVENT_ATTR_PATTERN_DOUBLE.sub("", cleaned)
-    cleaned = EVENT_ATTR_PATTERN_SINGLE.sub("", cleaned)
-    cleaned = EVENT_ATTR_PATTERN_BARE.sub("", cleaned)
-    cleaned = JS_URI_PATTERN.sub(r"\\1=\\2#\\2", cleaned)
-    return cleaned.strip()
-
-
-def html_to_plain_text(content: str) -> str:
-    no_script = TAG_DROP_PATTERN.sub("", content or "")
-    no_tag = SUMMARY_STRIP_TAG_PATTERN.sub(" ", no_script)
-    text = unescape(no_tag)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
-
-
-def build_summary(summary: str | None, content: str) -> str:
+def build_summary(summary: str | None, plain_text: str) -> str:
     candidate = (summary or "").strip()
     if not candidate:
-        candidate = html_to_plain_text(content)
+        candidate = plain_text
     if len(candidate) > MAX_SUMMARY_LENGTH:
         return candidate[:MAX_SUMMARY_LENGTH].rstrip() + "..."
     return candidate
@@ -105,18 +70,6 @@ def normalize_cover_image(value) -> str | None:
     return value or None
 
 
-def extract_cover_from_html(content: str) -> str | None:
-    match = IMG_SRC_PATTERN.search(content or "")
-    if match:
-        src = (match.group(1) or "").strip()
-        return src or None
-    return None
-
-
-def ensure_cover_image(cover_image: str | None, content: str) -> str | None:
-    return cover_image or extract_cover_from_html(content)
-
-
 def allowed_image_file(filename: str) -> bool:
     if "." not in filename:
         return False
@@ -149,45 +102,105 @@ def resolve_image_extension(filename: str, mimetype: str | None) -> str | None:
     return MIME_TO_EXTENSION.get(mime)
 
 
+def wants_pagination() -> bool:
+    """Paginated mode is opt-in; a bare ``GET /api/news`` keeps the legacy array."""
+    return "limit" in request.args or "cursor" in request.args
+
+
+def search_news_items(keyword: str, limit: int | None = None, offset: int = 0) -> tuple[list[News], bool]:
+    """Return matching news (relevance order) and whether more results follow."""
+    fetch = None if limit is None else limit + 1
+    matches = news_search.matches(keyword)
+    if matches is None:
+        # No full-text index on this database backend: plain LIKE filter.
+        pattern = f"%{keyword}%"
+        query = (
+            News.query.outerjoin(User, User.id == News.created_by)
+            .filter(
+                or_(
+                    News.title.ilike(pattern),
+                    News.summary.ilike(pattern),
+                    User.name.ilike(pattern),
+                )
+            )
+            .order_by(News.created_at.desc(), News.id.desc())
+        )
+    else:
+        query = News.query.join(matches, matches.c.news_id == News.id).order_by(matches.c.rank, News.id.desc())
+    query = query.offset(offset)
+    items = query.limit(fetch).all() if fetch is not None else query.all()
+
+    if limit is not None and len(items) > limit:
+        return items[:limit], True
+    return items, False
+
+
+def news_list_validator():
+    return table_validator(News.query, News.updated_at, request.query_string.decode("utf-8", "replace"))
+
+
+def current_updated_at(news_id: int):
+    """``News.updated_at`` of ``news_id`` (None if it is gone), looked up once per request."""
+    if "news_updated_at" not in g:
+        g.news_updated_at = db.session.query(News.updated_at).filter(News.id == news_id).scalar()
+    return g.news_updated_at
+
+
+def news_detail_validator(news_id: int):
+    updated_at = current_updated_at(news_id)
+    if updated_at is None:
+        return None
+    return make_validator(news_id, updated_at, last_modified=updated_at)
+
+
+def build_news_list_payload():
+    """Serialize the list for the current query args; raises InvalidCursor on a bad cursor."""
+    keyword = (request.args.get("q") or "").strip()
+
+    if not wants_pagination():
+        if keyword:
+            items, _ = search_news_items(keyword)
+        else:
+            items = News.query.order_by(News.created_at.desc(), News.id.desc()).all()
+        return [n.to_dict(include_author=True, include_content=False) for n in items]
+
+    limit = parse_limit(request.args.get("limit"))
+    cursor = decode_cursor(request.args.get("cursor"))
+    if keyword:
+        # Relevance order has no stable keyset, so search pages by offset.
+        try:
+            offset = max(int((cursor or {}).get("offset", 0)), 0)
+        except (TypeError, ValueError) as exc:
+            raise InvalidCursor("invalid cursor") from exc
+        items, has_more = search_news_items(keyword, limit=limit, offset=offset)
+        next_cursor = encode_cursor({"offset": offset + len(items)}) if has_more else None
+    else:
+        query = apply_created_at_keyset(News.query, News, cursor)
+        items, next_cursor = fetch_page(query, limit, created_at_cursor)
+
+    return {
+        "items": [n.to_dict(include_author=True, include_content=False) for n in items],
+        "next_cursor": next_cursor,
+        "limit": limit,
+    }
+
+
 @bp.get("")
 @bp.get("/")
+@conditional(news_list_validator)
 def list_news():
-    keyword = (request.args.get("q") or "").strip().lower()
-    items = News.query.order_by(News.created_at.desc()).all()
-
-    if keyword:
-        filtered_items = []
-        for item in items:
-            author_name = None
-            try:
-                author = User.query.get(item.created_by)
-                author_name = author.name if author else ""
-            except Exception:
-                author_name = ""
-
-            haystack = " ".join(
-                [
-                    item.title or "",
-                    item.summary or "",
-                    author_name or "",
-                ]
-            ).lower()
-            if keyword in haystack:
-                filtered_items.append(item)
-        items = filtered_items
-
-    return jsonify([n.to_dict(include_author=True, include_content=False) for n in items])
+    try:
+        payload = news_cache.get_list(request.query_string.decode("utf-8", "replace"), build_news_list_payload)
+    except InvalidCursor:
+        return jsonify({"error": "invalid cursor"}), 400
+    return jsonify(payload)
 
 
 @bp.post("")
 @bp.post("/")
-@jwt_required()
+@role_required("teacher")
 @csrf.exempt
 def create_news():
-    perm = require_teacher()
-    if perm is not None:
-        return perm
-
     data = request.get_json(silent=True) or {}
     title = (data.get("title") or "").strip()
     raw_content = (data.get("content") or "").strip()
@@ -197,14 +210,15 @@ def create_news():
     if not raw_content:
         return jsonify({"error": "content is required"}), 400
 
-    content = sanitize_news_html(raw_content)
+    cleaned = sanitize_content(raw_content)
+    content = cleaned.html
     if not content:
         return jsonify({"error": "content is empty after sanitization"}), 400
 
-    summary = build_summary(data.get("summary"), content)
-    cover_image = ensure_cover_image(normalize_cover_image(data.get("cover_image")), content)
+    summary = build_summary(data.get("summary"), cleaned.text)
+    cover_image = normalize_cover_image(data.get("cover_image")) or cleaned.cover_image
 
-    author_id = int(get_jwt_identity())
+    author_id = current_user_id()
     news = News(
         title=title,
         summary=summary,
@@ -214,26 +228,29 @@ def create_news():
     )
     db.session.add(news)
     db.session.commit()
+    news_cache.invalidate(news.id)
     return jsonify(news.to_dict(include_author=True, include_content=True)), 201
 
 
 @bp.get("/<int:news_id>")
+@conditional(news_detail_validator)
 def get_news(news_id: int):
-    news = News.query.get(news_id)
-    if not news:
+    def build():
+        news = db.session.get(News, news_id, options=[joinedload(News.author)])
+        return news.to_dict(include_author=True, include_content=True) if news else None
+
+    updated_at = current_updated_at(news_id)
+    payload = news_cache.get_detail(news_id, build, updated_at) if updated_at is not None else None
+    if payload is None:
         return jsonify({"error": "not found"}), 404
-    return jsonify(news.to_dict(include_author=True, include_content=True))
+    return jsonify(payload)
 
 
 @bp.put("/<int:news_id>")
 @bp.patch("/<int:news_id>")
-@jwt_required()
+@role_required("teacher")
 @csrf.exempt
 def update_news(news_id: int):
-    perm = require_teacher()
-    if perm is not None:
-        return perm
-
     news = News.query.get(news_id)
     if not news:
         return jsonify({"error": "not found"}), 404
@@ -246,55 +263,64 @@ def update_news(news_id: int):
             return jsonify({"error": "title cannot be empty"}), 400
         news.title = title
 
+    cleaned = None
     if "content" in data:
         content_raw = (data.get("content") or "").strip()
         if not content_raw:
             return jsonify({"error": "content cannot be empty"}), 400
-        sanitized = sanitize_news_html(content_raw)
-        if not sanitized:
+        cleaned = sanitize_content(content_raw)
+        if not cleaned.html:
             return jsonify({"error": "content is empty after sanitization"}), 400
-        news.content = sanitized
+        news.content = cleaned.html
+
+    def stored_content() -> SanitizedHTML:
+        # Only re-parse the stored body when a summary or cover must be derived from it.
+        nonlocal cleaned
+        if cleaned is None:
+            cleaned = sanitize_content(news.content)
+        return cleaned
 
     if "summary" in data:
-        news.summary = build_summary(data.get("summary"), news.content)
+        requested_summary = (data.get("summary") or "").strip()
+        news.summary = build_summary(requested_summary, "" if requested_summary else stored_content().text)
     elif "content" in data and not (news.summary or "").strip():
-        news.summary = build_summary("", news.content)
+        news.summary = build_summary("", cleaned.text)
 
     if "cover_image" in data:
         requested_cover = normalize_cover_image(data.get("cover_image"))
-        news.cover_image = ensure_cover_image(requested_cover, news.content)
+        news.cover_image = requested_cover or stored_content().cover_image
     elif "content" in data and not news.cover_image:
-        news.cover_image = ensure_cover_image(None, news.content)
+        news.cover_image = cleaned.cover_image
 
     db.session.commit()
+    news_cache.invalidate(news_id)
     return jsonify(news.to_dict(include_author=True, include_content=True))
 
 
 @bp.delete("/<int:news_id>")
-@jwt_required()
+@role_required("teacher")
 @csrf.exempt
 def delete_news(news_id: int):
-    perm = require_teacher()
-    if perm is not None:
-        return perm
-
     news = News.query.get(news_id)
     if not news:
         return jsonify({"error": "not found"}), 404
 
     db.session.delete(news)
     db.session.commit()
+    news_cache.invalidate(news_id)
     return jsonify({"message": "deleted"})
 
 
+@bp.get("/cache/stats")
+@role_required("teacher")
+def news_cache_stats():
+    return jsonify(news_cache.report())
+
+
 @bp.post("/upload_image")
-@jwt_required()
+@role_required("teacher")
 @csrf.exempt
 def upload_news_image():
-    perm = require_teacher()
-    if perm is not None:
-        return perm
-
     if "file" not in request.files:
         return jsonify({"error": "file field is required"}), 400
 
@@ -312,20 +338,17 @@ def upload_news_image():
             }
         ), 400
 
-    filename = f"{uuid.uuid4().hex}.{ext}"
-
-    upload_dir = os.path.join(current_app.instance_path, NEWS_UPLOAD_SUBDIR)
-    os.makedirs(upload_dir, exist_ok=True)
-
-    file_path = os.path.join(upload_dir, filename)
-    image.save(file_path)
+    filename, created = news_images.store_image(image.stream, ext)
+    if created:
+        enqueue_variants(filename)
 
     return jsonify(
         {
-            "url": f"/api/news/images/{filename}",
+            "url": news_images.image_url(filename),
             "filename": filename,
+            "deduplicated": not created,
         }
-    ), 201
+    ), 201 if created else 200
 
 
 @bp.get("/images/<path:filename>")
@@ -334,5 +357,38 @@ def serve_news_image(filename: str):
     if not safe_name or safe_name != filename:
         return jsonify({"error": "invalid filename"}), 400
 
-    upload_dir = os.path.join(current_app.instance_path, NEWS_UPLOAD_SUBDIR)
-    return send_from_directory(upload_dir, safe_name)
+    key = news_images.resolve_serving_key(safe_name)
+    if not key:
+        return jsonify({"error": "not found"}), 404
+    try:
+        return send_from_storage(news_images.storage(), key)
+    except FileNotFoundError:
+        return jsonify({"error": "not found"}), 404
+
+
+@bp.cli.command("reindex")
+def reindex_news_command():
+    """Rebuild the news full-text search index from existing rows."""
+    count = news_search.rebuild_index()
+    print(f"Indexed {count} news articles.")
+
+
+@bp.cli.command("gc-images")
+@click.option("--grace-hours", default=news_images.GC_GRACE_SECONDS // 3600, show_default=True,
+              help="Keep unreferenced images younger than this.")
+@click.option("--dry-run", is_flag=True, help="Only list what would be removed.")
+def gc_news_images_command(grace_hours: int, dry_run: bool):
+    """Delete uploaded news images no article references anymore."""
+    removed = news_images.collect_garbage(grace_seconds=grace_hours * 3600, dry_run=dry_run)
+    verb = "Would remove" if dry_run else "Removed"
+    print(f"{verb} {len(removed)} unreferenced images.")
+
+
+@bp.cli.command("build-variants")
+def build_news_image_variants_command():
+    """Generate missing thumbnails/WebP variants for every stored news image."""
+    count = 0
+    for filename in news_images.iter_originals():
+        if news_images.generate_variants(filename):
+            count += 1
+    print(f"Generated variants for {count} images.")
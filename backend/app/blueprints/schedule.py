@@ -1,15 +1,106 @@
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime, date
-from ..models import Appointment, User
+from flask_jwt_extended import jwt_required
+from datetime import datetime, date, timedelta
+from ..models import Appointment, TeacherBlackout, User
 from ..extensions import db
+from ..services import authz, availability, booking
 
 bp = Blueprint('schedule', __name__, url_prefix='/api/schedule')
 
 
+def parse_date_arg(name, default):
+    value = request.args.get(name)
+    if not value:
+        return default
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
 @bp.get('/slots')
 def get_slots():
-    return jsonify([{'id': 1, 'teacher_id': 100, 'start': '2025-01-01T10:00:00Z'}])
+    """多位老师在一段日期内的空闲时间段
+
+    teacher_ids 逗号分隔，省略时为全部老师；start 默认今天，end 默认 start 后 6 天。
+    """
+    today = date.today()
+    try:
+        start = max(parse_date_arg('start', today), today)
+        end = parse_date_arg('end', start + timedelta(days=6))
+    except ValueError:
+        return jsonify({'error': '日期格式错误，应为YYYY-MM-DD'}), 400
+    if end < start:
+        return jsonify({'error': '结束日期不能早于开始日期'}), 400
+    if (end - start).days >= availability.MAX_RANGE_DAYS:
+        return jsonify({'error': f'日期范围不能超过{availability.MAX_RANGE_DAYS}天'}), 400
+
+    teachers = User.query.with_entities(User.id).filter(User.role == 'teacher')
+    raw_ids = request.args.get('teacher_ids', '').strip()
+    if raw_ids:
+        try:
+            requested = {int(part) for part in raw_ids.split(',') if part.strip()}
+        except ValueError:
+            return jsonify({'error': '老师参数无效'}), 400
+        if len(requested) > availability.MAX_TEACHERS:
+            return jsonify({'error': f'一次最多查询{availability.MAX_TEACHERS}位老师'}), 400
+        teachers = teachers.filter(User.id.in_(requested))
+    teacher_ids = [row.id for row in teachers.order_by(User.id).limit(availability.MAX_TEACHERS)]
+
+    free = availability.free_slots(teacher_ids, start, end) if teacher_ids else {}
+    return jsonify({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'teachers': [{'teacher_id': teacher_id, 'slots': free[teacher_id]} for teacher_id in teacher_ids],
+    })
+
+
+@bp.get('/availability')
+@authz.role_required('teacher')
+def get_availability():
+    """当前老师的工作时间、时间段模板和停约日期"""
+    return jsonify(availability.rules_payload(authz.current_user_id()))
+
+
+@bp.put('/availability')
+@authz.role_required('teacher')
+def update_availability():
+    """替换工作时间和/或时间段模板（未提供的部分保持不变）"""
+    data = request.get_json(silent=True) or {}
+    teacher_id = authz.current_user_id()
+    try:
+        availability.replace_rules(
+            teacher_id,
+            working_hours=data.get('working_hours'),
+            slot_templates=data.get('slot_templates'),
+        )
+    except availability.InvalidAvailability as exc:
+        return jsonify({'error': exc.message}), 400
+    return jsonify(availability.rules_payload(teacher_id))
+
+
+@bp.post('/availability/blackouts')
+@authz.role_required('teacher')
+def add_blackout():
+    """添加停约日期（start_date 到 end_date，含两端）"""
+    data = request.get_json(silent=True) or {}
+    try:
+        start = datetime.strptime(data.get('start_date') or '', '%Y-%m-%d').date()
+        end = datetime.strptime(data.get('end_date') or data['start_date'], '%Y-%m-%d').date()
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': '日期格式错误，应为YYYY-MM-DD'}), 400
+    try:
+        blackout = availability.add_blackout(authz.current_user_id(), start, end, data.get('reason'))
+    except availability.InvalidAvailability as exc:
+        return jsonify({'error': exc.message}), 400
+    return jsonify(blackout.to_dict()), 201
+
+
+@bp.delete('/availability/blackouts/<int:blackout_id>')
+@authz.role_required('teacher')
+def delete_blackout(blackout_id):
+    blackout = db.session.get(TeacherBlackout, blackout_id)
+    if not blackout or blackout.teacher_id != authz.current_user_id():
+        return jsonify({'error': '停约日期不存在'}), 404
+    availability.remove_blackout(blackout)
+    return jsonify({'message': '已删除'})
 
 
 @bp.get('/booked-slots/<int:teacher_id>')
@@ -29,7 +120,7 @@ def get_booked_slots(teacher_id):
     booked_appointments = Appointment.query.filter(
         Appointment.teacher_id == teacher_id,
         Appointment.appointment_date == target_date,
-        Appointment.status.in_(['pending', 'approved'])
+        Appointment.status.in_(booking.ACTIVE_STATUSES)
     ).all()
     
     booked_slots = [apt.time_slot for apt in booked_appointments]
@@ -46,7 +137,7 @@ def get_booked_slots(teacher_id):
 def book_slot():
     """创建预约"""
     data = request.get_json(silent=True) or {}
-    current_user_id = int(get_jwt_identity())
+    current_user_id = authz.current_user_id()
     
     # 验证必填字段
     required_fields = ['teacher_id', 'appointment_date', 'time_slot', 'appointment_type']
@@ -59,31 +150,30 @@ def book_slot():
     except ValueError:
         return jsonify({'error': '日期格式错误'}), 400
     
-    # 检查时间段是否已被预约
-    existing = Appointment.query.filter(
-        Appointment.teacher_id == data['teacher_id'],
-        Appointment.appointment_date == appointment_date,
-        Appointment.time_slot == data['time_slot'],
-        Appointment.status.in_(['pending', 'approved'])
-    ).first()
-    
-    if existing:
+    try:
+        teacher_id = int(data['teacher_id'])
+    except (TypeError, ValueError):
+        return jsonify({'error': '老师参数无效'}), 400
+
+    interval = availability.parse_slot(data['time_slot']) if isinstance(data['time_slot'], str) else None
+    if interval is None:
+        return jsonify({'error': '时间段格式错误，应为HH:MM-HH:MM'}), 400
+
+    # 插入与冲突检查是同一条语句：并发预约同一时间段时只有一个能成功
+    try:
+        appointment = booking.book(
+            student_id=current_user_id,
+            teacher_id=teacher_id,
+            appointment_date=appointment_date,
+            time_slot=availability.slot_label(interval),
+            appointment_type=data['appointment_type'],
+            reason=data.get('reason', ''),
+        )
+    except booking.SlotUnavailable:
+        return jsonify({'error': '老师在该时间段不接受预约'}), 409
+    except booking.SlotTaken:
         return jsonify({'error': '该时间段已被预约'}), 409
     
-    # 创建预约
-    appointment = Appointment(
-        student_id=current_user_id,
-        teacher_id=data['teacher_id'],
-        appointment_date=appointment_date,
-        time_slot=data['time_slot'],
-        appointment_type=data['appointment_type'],
-        reason=data.get('reason', ''),
-        status='pending'
-    )
-    
-    db.session.add(appointment)
-    db.session.commit()
-    
     return jsonify({
         'message': '预约创建成功',
         'appointment': appointment.to_dict()
@@ -94,16 +184,11 @@ def book_slot():
 @jwt_required()
 def get_appointments():
     """获取当前用户的预约列表"""
-    current_user_id = int(get_jwt_identity())
-    user = User.query.get(current_user_id)
-    
-    if not user:
-        return jsonify({'error': '用户不存在'}), 404
-    
+    current_user_id = authz.current_user_id()
     status = request.args.get('status')
     
     # 根据用户角色返回不同的预约列表
-    if user.role == 'teacher':
+    if authz.current_role() == 'teacher':
         query = Appointment.query.filter_by(teacher_id=current_user_id)
     else:
         query = Appointment.query.filter_by(student_id=current_user_id)
@@ -122,7 +207,7 @@ def get_appointments():
 @jwt_required()
 def update_appointment(appointment_id):
     """更新预约状态（老师确认/拒绝，学生取消）"""
-    current_user_id = int(get_jwt_identity())
+    current_user_id = authz.current_user_id()
     data = request.get_json(silent=True) or {}
     
     appointment = Appointment.query.get(appointment_id)
@@ -130,9 +215,6 @@ def update_appointment(appointment_id):
     if not appointment:
         return jsonify({'error': '预约不存在'}), 404
     
-    # 获取当前用户
-    user = User.query.get(current_user_id)
-    
     # 权限验证
     is_teacher = appointment.teacher_id == current_user_id
     is_student = appointment.student_id == current_user_id
@@ -149,9 +231,10 @@ def update_appointment(appointment_id):
             if new_status != 'cancelled':
                 return jsonify({'error': '学生只能取消预约'}), 403
         
-        appointment.status = new_status
-    
-    db.session.commit()
+        try:
+            booking.set_status(appointment, new_status)
+        except booking.SlotTaken:
+            return jsonify({'error': '该时间段已被其他预约占用'}), 409
     
     return jsonify({
         'message': '预约状态已更新',
@@ -1,48 +1,85 @@
 ﻿import mimetypes
-import os
-from flask import Blueprint, jsonify, send_file, current_app, url_for
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from functools import partial
+from urllib.parse import quote
+import click
+from flask import Blueprint, Response, jsonify, request, url_for
+from flask_jwt_extended import jwt_required
+from sqlalchemy import func, or_
+from sqlalchemy.orm import selectinload
 from ..extensions import db, csrf
-from ..models import User
+from ..models import Application, Appointment, DocumentText, User
 from ..models.document import Document
+from ..services import document_previews, document_storage, document_text, storage_quota, student_search
+from ..services.authz import get_current_user, role_required
+from ..services.conditional import conditional, make_validator, table_validator
+from ..services.pagination import parse_limit
+from ..services.zip_stream import ZipEntry, iter_zip, unique_arcname
+from ..tasks.document_previews import preview_or_enqueue
 
 bp = Blueprint("users", __name__, url_prefix="/api/users")
 
+# ``sort`` query values accepted by the roster; all but document_count are User columns.
+ROSTER_SORTS = ("name", "grade", "class_name", "document_count", "created_at")
+ROSTER_PAGE_SIZE = 50
+ROSTER_MAX_PAGE_SIZE = 200
+# Related collections the student detail endpoint can embed via ``include=``.
+STUDENT_INCLUDES = ("documents", "appointments", "applications")
+DOCUMENT_SEARCH_LIMIT = 50
+DOCUMENT_SEARCH_MAX_LIMIT = 200
+# Leading slice of extracted text loaded per hit to build its snippet.
+SNIPPET_SCAN_CHARS = 20_000
+
+
+def roster_validator():
+    documents = Document.query.join(User, User.id == Document.user_id).filter(User.role == "student")
+    doc_count, doc_latest = documents.with_entities(
+        func.count(Document.id), func.max(Document.updated_at)
+    ).one()
+    # Each page/sort/filter combination is a different representation.
+    return table_validator(
+        User.query.filter_by(role="student"),
+        User.updated_at,
+        doc_count,
+        doc_latest,
+        request.query_string.decode("latin-1"),
+    )
 
-def get_current_user() -> User | None:
-    ident = get_jwt_identity()
-    if ident is None:
-        return None
-    try:
-        user_id = int(ident)
-    except (TypeError, ValueError):
-        return None
-    return User.query.get(user_id)
 
+def student_documents_validator(student_id: int):
+    student_updated = db.session.query(User.updated_at).filter(User.id == student_id).scalar()
+    return table_validator(
+        Document.query.filter_by(user_id=student_id),
+        Document.updated_at,
+        student_id,
+        student_updated,
+    )
 
-def resolve_document_path(path: str | None) -> str | None:
-    """Resolve legacy/relocated document path to an existing file."""
-    if not path:
-        return None
-    if os.path.exists(path):
-        return path
 
-    basename = os.path.basename(path)
-    if not basename:
+def parse_student_includes() -> set[str] | None:
+    """``include=`` values for the detail endpoint; None if any is unknown."""
+    raw = request.args.get("include")
+    if raw is None:
+        return {"documents"}
+    includes = {part.strip() for part in raw.split(",") if part.strip()}
+    if not includes <= set(STUDENT_INCLUDES):
         return None
-
-    candidate = os.path.join(current_app.instance_path, "uploads", basename)
-    if os.path.exists(candidate):
-        return candidate
-    return None
+    return includes
 
 
-def ensure_teacher(user: User | None):
-    if not user:
-        return jsonify({"message": "未找到用户"}), 404
-    if user.role != "teacher":
-        return jsonify({"message": "权限不足，仅教师可访问"}), 403
-    return None
+def student_detail_validator(student_id: int):
+    includes = parse_student_includes()
+    if includes is None or "applications" in includes:
+        # Applications carry no updated_at, so a status change could not be detected.
+        return None
+    documents = student_documents_validator(student_id)
+    parts = [documents.etag, ",".join(sorted(includes))]
+    latest = [documents.last_modified]
+    if "appointments" in includes:
+        appointments = table_validator(Appointment.query.filter_by(student_id=student_id), Appointment.updated_at)
+        parts.append(appointments.etag)
+        latest.append(appointments.last_modified)
+    latest = [value for value in latest if value]
+    return make_validator(*parts, last_modified=max(latest) if latest else None)
 
 
 def serialize_student(student: User) -> dict:
@@ -57,6 +94,28 @@ def serialize_student(student: User) -> dict:
     }
 
 
+def roster_prefix_filter(keyword: str):
+    """``LIKE`` prefix match for databases without a full-text index."""
+    pattern = keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    columns = (User.name, User.email, User.student_id, User.grade, User.class_name)
+    return or_(*(column.ilike(pattern, escape="\\") for column in columns))
+
+
+def roster_payload(rows, total: int, page: int, page_size: int) -> dict:
+    students_data = []
+    for student, count in rows:
+        payload = serialize_student(student)
+        payload["document_count"] = count
+        students_data.append(payload)
+    return {
+        "students": students_data,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "pages": (total + page_size - 1) // page_size,
+    }
+
+
 def serialize_document(doc: Document) -> dict:
     return {
         "id": doc.id,
@@ -69,6 +128,21 @@ def serialize_document(doc: Document) -> dict:
     }
 
 
+def serialize_application(application: Application) -> dict:
+    school = application.school
+    return {
+        "id": application.id,
+        "status": application.status,
+        "school": {
+            "id": school.id,
+            "name": school.name,
+            "city": school.city,
+            "country": school.country,
+        } if school else None,
+        "created_at": application.created_at.isoformat() if application.created_at else None,
+    }
+
+
 def serialize_teacher_document(doc: Document, student_id: int) -> dict:
     payload = serialize_document(doc)
     payload["view_url"] = url_for(
@@ -81,6 +155,11 @@ def serialize_teacher_document(doc: Document, student_id: int) -> dict:
         student_id=student_id,
         document_id=doc.id,
     )
+    payload["preview_url"] = url_for(
+        "users.preview_student_document",
+        student_id=student_id,
+        document_id=doc.id,
+    ) if document_previews.supports(doc) else None
     return payload
 
 
@@ -130,8 +209,6 @@ def profile_get():
 @csrf.exempt
 def profile_update():
     """Self profile update only. User id always comes from JWT identity."""
-    from flask import request
-
     user = get_current_user()
     if not user:
         return jsonify({"message": "未找到用户"}), 404
@@ -163,65 +240,130 @@ def profile_update():
 
 
 @bp.get("/students")
-@jwt_required()
+@role_required("teacher")
 @csrf.exempt
+@conditional(roster_validator, private=True)
 def get_students():
-    """Teacher gets all student records."""
-    current_user = get_current_user()
-    deny = ensure_teacher(current_user)
-    if deny:
-        return deny
-
-    students = User.query.filter_by(role="student").order_by(User.created_at.desc()).all()
-
-    students_data = []
-    for student in students:
-        payload = serialize_student(student)
-        payload["document_count"] = Document.query.filter_by(user_id=student.id).count()
-        students_data.append(payload)
+    """Teacher gets one page of the student roster with document counts.
+
+    Query args: ``page``, ``page_size``, ``sort`` (see ``ROSTER_SORTS``),
+    ``order`` (``asc``/``desc``), ``grade`` and ``class_name`` filters, and
+    ``q`` for a prefix search over name (incl. pinyin/initials), email,
+    student id, grade and class. Searches sort by relevance by default.
+    """
+    keyword = (request.args.get("q") or "").strip()
+    sort = request.args.get("sort") or ("relevance" if keyword else "created_at")
+    order = request.args.get("order", "desc")
+    valid_sorts = ROSTER_SORTS + (("relevance",) if keyword else ())
+    if sort not in valid_sorts or order not in ("asc", "desc"):
+        return jsonify({"message": "排序参数无效"}), 400
+    try:
+        page = max(int(request.args.get("page", 1)), 1)
+    except (TypeError, ValueError):
+        return jsonify({"message": "页码无效"}), 400
+    page_size = parse_limit(request.args.get("page_size"), default=ROSTER_PAGE_SIZE, maximum=ROSTER_MAX_PAGE_SIZE)
+
+    students = User.query.filter(User.role == "student")
+    grade = (request.args.get("grade") or "").strip()
+    if grade:
+        students = students.filter(User.grade == grade)
+    class_name = (request.args.get("class_name") or "").strip()
+    if class_name:
+        students = students.filter(User.class_name == class_name)
+
+    matches = None
+    if keyword:
+        matches = student_search.matches(keyword)
+        if matches is None:
+            students = students.filter(roster_prefix_filter(keyword))
+        else:
+            students = students.join(matches, matches.c.user_id == User.id)
+
+    document_count = func.count(Document.id).label("document_count")
+    if sort == "relevance" and matches is not None:
+        total = students.order_by(None).count()
+        rows = (
+            students.outerjoin(Document, Document.user_id == User.id)
+            .with_entities(User, document_count)
+            .group_by(User.id, matches.c.rank)
+            .order_by(matches.c.rank, User.id)
+            .offset((page - 1) * page_size)
+            .limit(page_size)
+            .all()
+        )
+        return jsonify(roster_payload(rows, total, page, page_size))
+
+    if sort == "relevance":
+        sort = "name"
+        order = "asc"
+    total = students.order_by(None).count()
+
+    sort_column = document_count if sort == "document_count" else getattr(User, sort)
+    direction = sort_column.asc() if order == "asc" else sort_column.desc()
+    tiebreak = User.id.asc() if order == "asc" else User.id.desc()
+    rows = (
+        students.outerjoin(Document, Document.user_id == User.id)
+        .with_entities(User, document_count)
+        .group_by(User.id)
+        .order_by(direction, tiebreak)
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+        .all()
+    )
 
-    return jsonify({"students": students_data, "total": len(students_data)})
+    return jsonify(roster_payload(rows, total, page, page_size))
 
 
 @bp.get("/students/<int:student_id>")
-@jwt_required()
+@role_required("teacher")
 @csrf.exempt
+@conditional(student_detail_validator, private=True)
 def get_student_detail(student_id: int):
-    """Teacher gets one student's basic info plus document list for detail modal."""
-    current_user = get_current_user()
-    deny = ensure_teacher(current_user)
-    if deny:
-        return deny
-
-    student = User.query.get(student_id)
+    """Teacher gets one student's basic info plus the related collections for the detail modal.
+
+    ``include`` is a comma-separated subset of ``STUDENT_INCLUDES`` (default
+    ``documents``). Each included collection is loaded with one batched query.
+    """
+    includes = parse_student_includes()
+    if includes is None:
+        return jsonify({"message": f"include 仅支持: {', '.join(STUDENT_INCLUDES)}"}), 400
+
+    options = []
+    if "documents" in includes:
+        options.append(selectinload(User.documents))
+    if "appointments" in includes:
+        options.append(selectinload(User.appointments_as_student).joinedload(Appointment.teacher))
+    if "applications" in includes:
+        options.append(selectinload(User.applications).joinedload(Application.school))
+
+    student = User.query.options(*options).filter_by(id=student_id).first()
     if not student or student.role != "student":
         return jsonify({"message": "未找到该学生"}), 404
 
-    documents = (
-        Document.query.filter_by(user_id=student_id)
-        .order_by(Document.created_at.desc())
-        .all()
-    )
-
-    return jsonify(
-        {
-            "student": serialize_student(student),
-            "documents": [serialize_teacher_document(doc, student_id) for doc in documents],
-            "document_count": len(documents),
-        }
-    )
+    payload = {"student": serialize_student(student)}
+    if "documents" in includes:
+        documents = sorted(student.documents, key=lambda doc: (doc.created_at, doc.id), reverse=True)
+        payload["documents"] = [serialize_teacher_document(doc, student_id) for doc in documents]
+        payload["document_count"] = len(documents)
+    if "appointments" in includes:
+        appointments = sorted(
+            student.appointments_as_student,
+            key=lambda item: (item.appointment_date, item.time_slot),
+            reverse=True,
+        )
+        payload["appointments"] = [item.to_dict() for item in appointments]
+    if "applications" in includes:
+        applications = sorted(student.applications, key=lambda item: (item.created_at, item.id), reverse=True)
+        payload["applications"] = [serialize_application(item) for item in applications]
+    return jsonify(payload)
 
 
 @bp.get("/students/<int:student_id>/documents")
-@jwt_required()
+@role_required("teacher")
 @csrf.exempt
+@conditional(student_documents_validator, private=True)
 def get_student_documents(student_id: int):
     """Teacher-only endpoint for one student's document list."""
-    current_user = get_current_user()
-    deny = ensure_teacher(current_user)
-    if deny:
-        return deny
-
     student = User.query.get(student_id)
     if not student or student.role != "student":
         return jsonify({"message": "未找到该学生"}), 404
@@ -241,16 +383,66 @@ def get_student_documents(student_id: int):
     )
 
 
+@bp.get("/students/documents/search")
+@role_required("teacher")
+@csrf.exempt
+def search_student_documents():
+    """Teacher searches the text of student uploads, e.g. ``q=IELTS``.
+
+    Results are ranked by the full-text index (document name weighs more than
+    its content) and filtered by ``grade``/``class_name``; each hit carries
+    the student and a snippet of the matching text.
+    """
+    keyword = (request.args.get("q") or "").strip()
+    if not keyword:
+        return jsonify({"message": "请输入搜索关键词"}), 400
+    limit = parse_limit(request.args.get("limit"), default=DOCUMENT_SEARCH_LIMIT, maximum=DOCUMENT_SEARCH_MAX_LIMIT)
+
+    query = (
+        db.session.query(Document, User, func.substr(DocumentText.content, 1, SNIPPET_SCAN_CHARS))
+        .join(User, User.id == Document.user_id)
+        .outerjoin(DocumentText, DocumentText.document_id == Document.id)
+        .filter(User.role == "student")
+    )
+    grade = (request.args.get("grade") or "").strip()
+    if grade:
+        query = query.filter(User.grade == grade)
+    class_name = (request.args.get("class_name") or "").strip()
+    if class_name:
+        query = query.filter(User.class_name == class_name)
+
+    matches = document_text.matches(keyword)
+    if matches is None:
+        pattern = "%" + keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        query = query.filter(
+            or_(
+                Document.name.ilike(pattern, escape="\\"),
+                DocumentText.content.ilike(pattern, escape="\\"),
+            )
+        )
+        ordering = (Document.created_at.desc(), Document.id.desc())
+    else:
+        query = query.join(matches, matches.c.document_id == Document.id)
+        ordering = (matches.c.rank, Document.id.desc())
+    total = query.with_entities(func.count(Document.id)).order_by(None).scalar()
+    rows = query.order_by(*ordering).limit(limit).all()
+
+    results = [
+        {
+            "document": serialize_teacher_document(doc, student.id),
+            "student": serialize_student(student),
+            "snippet": document_text.snippet(content, keyword),
+        }
+        for doc, student, content in rows
+    ]
+    return jsonify({"query": keyword, "results": results, "total": total})
+
+
 @bp.get("/students/<int:student_id>/documents/<int:document_id>/view")
-@jwt_required()
+@role_required("teacher")
 @csrf.exempt
 def view_student_document(student_id: int, document_id: int):
     """Teacher views a student's document inline."""
-    current_user = get_current_user()
-    deny = ensure_teacher(current_user)
-    if deny:
-        return deny
-
     student = User.query.get(student_id)
     if not student or student.role != "student":
         return jsonify({"message": "未找到该学生"}), 404
@@ -259,33 +451,47 @@ def view_student_document(student_id: int, document_id: int):
     if not doc:
         return jsonify({"message": "文档不存在"}), 404
 
-    resolved_path = resolve_document_path(doc.file_path)
-    if not resolved_path:
+    mime_type, _ = mimetypes.guess_type(doc.original_name or doc.name or "")
+    try:
+        return document_storage.send_document(
+            doc.file_path,
+            as_attachment=False,
+            download_name=doc.original_name or doc.name,
+            mimetype=mime_type or "application/octet-stream",
+        )
+    except FileNotFoundError:
         return jsonify({"message": "文件不存在"}), 404
 
-    if doc.file_path != resolved_path:
-        doc.file_path = resolved_path
-        db.session.commit()
 
-    mime_type, _ = mimetypes.guess_type(doc.original_name or doc.name or "")
-    return send_file(
-        resolved_path,
-        as_attachment=False,
-        download_name=doc.original_name or doc.name,
-        mimetype=mime_type or "application/octet-stream",
-    )
+@bp.get("/students/<int:student_id>/documents/<int:document_id>/preview")
+@role_required("teacher")
+@csrf.exempt
+def preview_student_document(student_id: int, document_id: int):
+    """Teacher skims a student's document via its preview."""
+    student = User.query.get(student_id)
+    if not student or student.role != "student":
+        return jsonify({"message": "未找到该学生"}), 404
+
+    doc = Document.query.filter_by(id=document_id, user_id=student_id).first()
+    if not doc:
+        return jsonify({"message": "文档不存在"}), 404
+    if not document_previews.supports(doc):
+        return jsonify({"message": "该文件类型不支持预览"}), 404
+
+    try:
+        response = preview_or_enqueue(doc)
+    except document_previews.PreviewFailed:
+        return jsonify({"message": "该文件无法生成预览"}), 422
+    if response is None:
+        return jsonify({"message": "预览生成中，请稍后重试"}), 202
+    return response
 
 
 @bp.get("/students/<int:student_id>/documents/<int:document_id>/download")
-@jwt_required()
+@role_required("teacher")
 @csrf.exempt
 def download_student_document(student_id: int, document_id: int):
     """Teacher downloads a student's document."""
-    current_user = get_current_user()
-    deny = ensure_teacher(current_user)
-    if deny:
-        return deny
-
     student = User.query.get(student_id)
     if not student or student.role != "student":
         return jsonify({"message": "未找到该学生"}), 404
@@ -294,18 +500,191 @@ def download_student_document(student_id: int, document_id: int):
     if not doc:
         return jsonify({"message": "文档不存在"}), 404
 
-    resolved_path = resolve_document_path(doc.file_path)
-    if not resolved_path:
+    mime_type, _ = mimetypes.guess_type(doc.original_name or doc.name or "")
+    try:
+        return document_storage.send_document(
+            doc.file_path,
+            as_attachment=True,
+            download_name=doc.original_name or doc.name,
+            mimetype=mime_type or "application/octet-stream",
+        )
+    except FileNotFoundError:
         return jsonify({"message": "文件不存在"}), 404
 
-    if doc.file_path != resolved_path:
-        doc.file_path = resolved_path
-        db.session.commit()
 
-    mime_type, _ = mimetypes.guess_type(doc.original_name or doc.name or "")
-    return send_file(
-        resolved_path,
-        as_attachment=True,
-        download_name=doc.original_name or doc.name,
-        mimetype=mime_type or "application/octet-stream",
+def zip_response(entries: list[ZipEntry], filename: str) -> Response:
+    response = Response(iter_zip(entries), mimetype="application/zip", direct_passthrough=True)
+    response.headers["Content-Disposition"] = (
+        f"attachment; filename=documents.zip; filename*=UTF-8''{quote(filename)}"
     )
+    return response
+
+
+def document_zip_entries(rows) -> list[ZipEntry]:
+    """``(Document, folder)`` rows -> archive entries with unique member names."""
+    used: set[str] = set()
+    entries = []
+    backend = document_storage.storage()
+    for doc, folder in rows:
+        name = doc.original_name or doc.name
+        arcname = unique_arcname(f"{folder}/{name}" if folder else name, used)
+        opener = partial(document_storage.open_document, doc.file_path, backend)
+        entries.append(ZipEntry(arcname, opener, doc.created_at, doc.file_size))
+    return entries
+
+
+@bp.get("/students/<int:student_id>/documents/export")
+@role_required("teacher")
+@csrf.exempt
+def export_student_documents(student_id: int):
+    """Teacher downloads a student's documents as one streamed ZIP.
+
+    ``ids`` (comma-separated document ids) limits the archive to a selection.
+    """
+    student = User.query.get(student_id)
+    if not student or student.role != "student":
+        return jsonify({"message": "未找到该学生"}), 404
+
+    query = Document.query.filter_by(user_id=student_id)
+    raw_ids = (request.args.get("ids") or "").strip()
+    if raw_ids:
+        try:
+            ids = {int(part) for part in raw_ids.split(",") if part.strip()}
+        except ValueError:
+            return jsonify({"message": "文档编号无效"}), 400
+        query = query.filter(Document.id.in_(ids))
+    documents = query.order_by(Document.created_at, Document.id).all()
+    if not documents:
+        return jsonify({"message": "没有可导出的文档"}), 404
+
+    entries = document_zip_entries((doc, None) for doc in documents)
+    label = student.student_id or str(student.id)
+    return zip_response(entries, f"{label}_{student.name}_documents.zip")
+
+
+@bp.get("/students/export")
+@role_required("teacher")
+@csrf.exempt
+def export_class_documents():
+    """Teacher downloads every document of one class as a streamed ZIP, one folder per student."""
+    class_name = (request.args.get("class_name") or "").strip()
+    if not class_name:
+        return jsonify({"message": "请指定班级"}), 400
+    grade = (request.args.get("grade") or "").strip()
+
+    query = (
+        db.session.query(Document, User)
+        .join(User, User.id == Document.user_id)
+        .filter(User.role == "student", User.class_name == class_name)
+    )
+    if grade:
+        query = query.filter(User.grade == grade)
+    rows = query.order_by(User.name, User.id, Document.created_at, Document.id).all()
+    if not rows:
+        return jsonify({"message": "没有可导出的文档"}), 404
+
+    entries = document_zip_entries(
+        (doc, f"{student.student_id or student.id}_{student.name}") for doc, student in rows
+    )
+    label = f"{grade}_{class_name}" if grade else class_name
+    return zip_response(entries, f"{label}_documents.zip")
+
+
+def serialize_usage(user: User) -> dict:
+    return {
+        "id": user.id,
+        "name": user.name,
+        "email": user.email,
+        "role": user.role,
+        "grade": user.grade,
+        "class_name": user.class_name,
+        **storage_quota.usage_payload(user),
+    }
+
+
+@bp.get("/storage-usage")
+@role_required("teacher")
+@csrf.exempt
+def get_storage_usage():
+    """Teacher sees storage usage per user, heaviest first.
+
+    Query args: ``role`` (default ``student``; ``all`` for everyone),
+    ``page``, ``page_size``, plus ``grade`` / ``class_name`` filters.
+    Usage comes from the denormalized counters, so this never scans documents.
+    """
+    role = request.args.get("role", "student")
+    if role not in ("student", "teacher", "all"):
+        return jsonify({"message": "角色参数无效"}), 400
+    try:
+        page = max(int(request.args.get("page", 1)), 1)
+    except (TypeError, ValueError):
+        return jsonify({"message": "页码无效"}), 400
+    page_size = parse_limit(request.args.get("page_size"), default=ROSTER_PAGE_SIZE, maximum=ROSTER_MAX_PAGE_SIZE)
+
+    users = User.query
+    if role != "all":
+        users = users.filter(User.role == role)
+    grade = (request.args.get("grade") or "").strip()
+    if grade:
+        users = users.filter(User.grade == grade)
+    class_name = (request.args.get("class_name") or "").strip()
+    if class_name:
+        users = users.filter(User.class_name == class_name)
+
+    total, used = users.with_entities(func.count(User.id), func.coalesce(func.sum(User.storage_used), 0)).one()
+    rows = (
+        users.order_by(User.storage_used.desc(), User.id.asc())
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+        .all()
+    )
+    return jsonify(
+        {
+            "users": [serialize_usage(user) for user in rows],
+            "total": total,
+            "total_used": int(used),
+            "page": page,
+            "page_size": page_size,
+            "pages": (total + page_size - 1) // page_size,
+        }
+    )
+
+
+@bp.put("/<int:user_id>/storage-quota")
+@role_required("teacher")
+@csrf.exempt
+def set_storage_quota(user_id: int):
+    """Teacher sets a student's quota in bytes; ``null`` restores the role default.
+
+    Only student quotas can be changed here, so a teacher cannot lift their
+    own (or a colleague's) limit.
+    """
+    user = db.session.get(User, user_id)
+    if not user or user.role != "student":
+        return jsonify({"message": "未找到该学生"}), 404
+
+    data = request.get_json(silent=True) or {}
+    if "quota" not in data:
+        return jsonify({"message": "缺少 quota 字段"}), 400
+    quota = data["quota"]
+    if quota is not None and (isinstance(quota, bool) or not isinstance(quota, int) or quota < 0):
+        return jsonify({"message": "quota 需为非负整数（字节）或 null"}), 400
+
+    user.storage_quota = quota
+    db.session.commit()
+    return jsonify(serialize_usage(user))
+
+
+@bp.cli.command("reconcile-usage")
+@click.option("--batch-size", default=500, show_default=True, help="Users recomputed per query.")
+def reconcile_usage_command(batch_size: int):
+    """Recompute every user's storage usage from their documents."""
+    result = storage_quota.reconcile(batch_size=batch_size)
+    print(f"Checked {result['checked']} users, corrected {len(result['corrected'])}: {result['corrected']}")
+
+
+@bp.cli.command("reindex")
+def reindex_students_command():
+    """Rebuild the student roster search index from existing rows."""
+    count = student_search.rebuild_index()
+    print(f"Indexed {count} students.")
@@ -0,0 +1,7 @@
+"""Celery entry point: ``celery -A app.celery_worker.celery worker``."""
+import os
+
+from . import create_app
+
+flask_app = create_app(os.getenv("FLASK_ENV", "production"))
+celery = flask_app.extensions["celery"]
@@ -9,6 +9,14 @@ load_dotenv(dotenv_path=ROOT_DIR / ".env", override=False)
 load_dotenv(dotenv_path=BACKEND_DIR / ".env", override=False)
 
 
+def _optional_int(name: str, default: int | None) -> int | None:
+    """Integer setting where an empty value means "no limit"."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return int(value) if value.strip() else None
+
+
 class BaseConfig:
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key")
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///app.db")
@@ -26,9 +34,68 @@ class BaseConfig:
     # SocketIO
     SOCKETIO_MESSAGE_QUEUE = os.getenv("REDIS_URL", None)
 
+    # Cache (Flask-Caching): SimpleCache is per-process, so multi-worker
+    # deployments should use RedisCache for invalidation to reach every worker.
+    CACHE_TYPE = os.getenv("CACHE_TYPE", "SimpleCache")
+    CACHE_DEFAULT_TIMEOUT = int(os.getenv("CACHE_DEFAULT_TIMEOUT", "300"))
+    CACHE_DIR = os.getenv("CACHE_DIR", str(BACKEND_DIR / "instance" / "cache"))
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    CACHE_KEY_PREFIX = "abd:"
+
     # Celery
     CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", os.getenv("REDIS_URL", "redis://localhost:6379/0"))
     CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    # Eager mode runs tasks inline, so local development needs no broker or worker.
+    CELERY_ALWAYS_EAGER = os.getenv("CELERY_ALWAYS_EAGER", "true").lower() in {"1", "true", "yes"}
+    # Periodic tasks, run by `celery -A app.celery_worker.celery beat`
+    CELERYBEAT_SCHEDULE = {
+        "process-storage-deletions": {
+            "task": "app.tasks.storage_cleanup.process_storage_deletions",
+            "schedule": 300.0,
+        },
+        "sweep-orphan-files": {
+            "task": "app.tasks.storage_cleanup.sweep_orphan_files",
+            "schedule": 24 * 3600.0,
+        },
+    }
+
+    # File delivery: inline | x-accel (nginx) | x-sendfile (Apache/lighttpd)
+    FILE_DELIVERY_MODE = os.getenv("FILE_DELIVERY_MODE", "inline").lower()
+    X_ACCEL_REDIRECT_PREFIX = os.getenv("X_ACCEL_REDIRECT_PREFIX", "/_protected")
+    # Internal locations for storage roots moved outside the instance folder
+    X_ACCEL_NAMESPACE_PREFIXES = {
+        "documents": os.getenv("X_ACCEL_DOCUMENTS_PREFIX") or None,
+        "news": os.getenv("X_ACCEL_NEWS_PREFIX") or None,
+        "previews": os.getenv("X_ACCEL_PREVIEWS_PREFIX") or None,
+    }
+
+    # Upload storage: local | s3 (AWS or an S3-compatible server such as MinIO)
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local").lower()
+    # Local backend. Document.file_path holds a key relative to this root;
+    # unset means <instance>/uploads and <instance>/news_uploads.
+    DOCUMENT_STORAGE_ROOT = os.getenv("DOCUMENT_STORAGE_ROOT") or None
+    NEWS_STORAGE_ROOT = os.getenv("NEWS_STORAGE_ROOT") or None
+    # Generated document previews (derived data, safe to delete); default <instance>/previews
+    PREVIEW_STORAGE_ROOT = os.getenv("PREVIEW_STORAGE_ROOT") or None
+    # S3 backend: one bucket, "documents/", "news/" and "previews/" prefixes
+    S3_BUCKET = os.getenv("S3_BUCKET", "abd-uploads")
+    S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+    S3_ACCESS_KEY_ID = os.getenv("S3_ACCESS_KEY_ID") or None
+    S3_SECRET_ACCESS_KEY = os.getenv("S3_SECRET_ACCESS_KEY") or None
+    S3_REGION = os.getenv("S3_REGION") or None
+    # Redirect downloads to presigned URLs instead of proxying the bytes
+    STORAGE_PRESIGNED_REDIRECTS = os.getenv("STORAGE_PRESIGNED_REDIRECTS", "false").lower() in {"1", "true", "yes"}
+    STORAGE_PRESIGNED_EXPIRES = int(os.getenv("STORAGE_PRESIGNED_EXPIRES", "300"))
+    # Resumable uploads (POST/PATCH /api/documents/uploads)
+    UPLOAD_MAX_FILE_SIZE = int(os.getenv("UPLOAD_MAX_FILE_SIZE", str(500 * 1024 * 1024)))
+    UPLOAD_MAX_PENDING_BYTES = int(os.getenv("UPLOAD_MAX_PENDING_BYTES", str(1024 * 1024 * 1024)))
+    UPLOAD_MAX_CHUNK_SIZE = int(os.getenv("UPLOAD_MAX_CHUNK_SIZE", str(16 * 1024 * 1024)))
+    UPLOAD_SESSION_TTL_HOURS = int(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24"))
+    # Storage quota per role in bytes (User.storage_quota overrides); empty means unlimited
+    STORAGE_QUOTAS = {
+        "student": _optional_int("STORAGE_QUOTA_STUDENT", 1024 * 1024 * 1024),
+        "teacher": _optional_int("STORAGE_QUOTA_TEACHER", None),
+    }
 
     # Other
     JSON_SORT_KEYS = False
@@ -40,10 +107,20 @@ class DevelopmentConfig(BaseConfig):
 
 class ProductionConfig(BaseConfig):
     DEBUG = False
+    CELERY_ALWAYS_EAGER = os.getenv("CELERY_ALWAYS_EAGER", "false").lower() in {"1", "true", "yes"}
+
+
+class TestingConfig(BaseConfig):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    CACHE_TYPE = "NullCache"
+    CELERY_ALWAYS_EAGER = True
 
 
 def get_config(name: str | None):
     env = name or os.getenv("FLASK_ENV", "development").lower()
     if env == "production":
         return ProductionConfig
+    if env == "testing":
+        return TestingConfig
     return DevelopmentConfig
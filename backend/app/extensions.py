@@ -1,17 +1,47 @@
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from flask_wtf.csrf import CSRFProtect
 from flask_socketio import SocketIO
+from flask_caching import Cache
+
+
+
+class VerifiedJWTManager(JWTManager):
+    """``JWTManager`` that reuses claims already verified for this exact token.
+
+    ``POST /api/batch`` verifies its token once and puts ``(token, claims)`` on
+    ``g.verified_jwt`` of every sub-request, so ``jwt_required`` in the
+    sub-views skips decoding and checking the signature again.
+
+    flask_jwt_extended has no public hook that can skip a decode (its loaders
+    run around it), so this overrides the method every decode goes through.
+    The package is pinned to an exact version in requirements.txt for that
+    reason; ``test_batch_verifies_the_token_once`` counts PyJWT decodes and
+    fails if an upgrade stops routing through the override.
+    """
+
+    def _decode_jwt_from_config(self, encoded_token, *args, **kwargs):
+        verified = g.get("verified_jwt") if has_app_context() else None
+        if verified is not None and verified[0] == encoded_token:
+            return verified[1]
+        return super()._decode_jwt_from_config(encoded_token, *args, **kwargs)
+
+
+if not callable(getattr(JWTManager, "_decode_jwt_from_config", None)):
+    raise ImportError("flask_jwt_extended no longer has JWTManager._decode_jwt_from_config; see VerifiedJWTManager")
+
 
 # Flask extensions instances
 
 db = SQLAlchemy()
 migrate = Migrate()
-jwt = JWTManager()
+jwt = VerifiedJWTManager()
 cors = CORS()
 csrf = CSRFProtect()
+cache = Cache()
 # 使用最通用的 "threading"，避免在 CLI 环境（如 flask db ...）初始化时因缺少异步后端而报错。
 socketio = SocketIO(async_mode="threading", manage_session=False)
 
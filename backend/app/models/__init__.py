@@ -1,17 +1,29 @@
 from .user import User
 from .document import Document
+from .document_blob import DocumentBlob
+from .document_text import DocumentText
 from .school import School
 from .application import Application
 from .message import Message
 from .appointment import Appointment
 from .news import News
+from .upload_session import UploadSession
+from .storage_deletion import StorageDeletion
+from .availability import SlotTemplate, TeacherBlackout, TeacherWorkingHours
 
 __all__ = [
     "User",
     "Document",
+    "DocumentBlob",
+    "DocumentText",
     "School",
     "Application",
     "Message",
     "Appointment",
     "News",
+    "UploadSession",
+    "StorageDeletion",
+    "TeacherWorkingHours",
+    "SlotTemplate",
+    "TeacherBlackout",
 ]
@@ -4,6 +4,16 @@ from ..extensions import db
 
 class Appointment(db.Model):
     __tablename__ = 'appointments'
+    __table_args__ = (
+        # 同一老师同一时间段只能有一个有效（pending/approved）预约，由数据库保证
+        db.Index(
+            'uq_appointments_active_slot',
+            'teacher_id', 'appointment_date', 'time_slot',
+            unique=True,
+            sqlite_where=db.text("status IN ('pending', 'approved')"),
+            postgresql_where=db.text("status IN ('pending', 'approved')"),
+        ),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
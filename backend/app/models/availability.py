@@ -0,0 +1,58 @@
+from datetime import datetime
+from ..extensions import db
+
+
+def _hhmm(value) -> str | None:
+    return value.strftime("%H:%M") if value else None
+
+
+class TeacherWorkingHours(db.Model):
+    """One window of a teacher's weekly working hours (several per weekday allowed)."""
+
+    __tablename__ = "teacher_working_hours"
+
+    id = db.Column(db.Integer, primary_key=True)
+    teacher_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False, index=True)
+    weekday = db.Column(db.SmallInteger, nullable=False)  # 0 = Monday ... 6 = Sunday
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)
+
+    def to_dict(self) -> dict:
+        return {"weekday": self.weekday, "start": _hhmm(self.start_time), "end": _hhmm(self.end_time)}
+
+
+class SlotTemplate(db.Model):
+    """A bookable slot a teacher offers; working hours decide on which days it applies."""
+
+    __tablename__ = "slot_template"
+    __table_args__ = (db.UniqueConstraint("teacher_id", "start_time", "end_time", name="uq_slot_template_teacher_slot"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    teacher_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False, index=True)
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)
+
+    def to_dict(self) -> dict:
+        return {"start": _hhmm(self.start_time), "end": _hhmm(self.end_time)}
+
+
+class TeacherBlackout(db.Model):
+    """Dates (inclusive range) on which a teacher takes no appointments."""
+
+    __tablename__ = "teacher_blackout"
+    __table_args__ = (db.Index("ix_teacher_blackout_teacher_dates", "teacher_id", "start_date", "end_date"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    teacher_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=False)
+    reason = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "start_date": self.start_date.isoformat(),
+            "end_date": self.end_date.isoformat(),
+            "reason": self.reason,
+        }
@@ -0,0 +1,15 @@
+from datetime import datetime
+from ..extensions import db
+
+
+class DocumentBlob(db.Model):
+    """One stored file shared by every document with the same content."""
+
+    __tablename__ = "document_blob"
+
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), nullable=False, unique=True)
+    storage_key = db.Column(db.String(1024), nullable=False)  # key in the documents storage namespace
+    size = db.Column(db.BigInteger, nullable=False, default=0)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)  # documents pointing at this blob
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,25 @@
+from datetime import datetime
+from ..extensions import db
+from ..services.document_text import register_index_listeners
+from .document import Document
+
+
+class DocumentText(db.Model):
+    """Text extracted from an uploaded document for full-text search."""
+
+    __tablename__ = "document_text"
+
+    document_id = db.Column(db.Integer, db.ForeignKey("document.id", ondelete="CASCADE"), primary_key=True)
+    status = db.Column(db.String(16), nullable=False)  # done | failed | unsupported
+    content = db.Column(db.Text, nullable=False, default="")
+    error = db.Column(db.String(255))
+    extracted_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    document = db.relationship(
+        "Document",
+        backref=db.backref("text", uselist=False, cascade="all, delete-orphan"),
+    )
+
+
+# Keep the full-text index (document_fts / document_search) in sync with this table.
+register_index_listeners(Document, DocumentText)
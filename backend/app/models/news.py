@@ -1,10 +1,17 @@
 from datetime import datetime
 
 from ..extensions import db
+from ..services.news_images import variant_urls
+from ..services.news_search import register_index_listeners
+from .user import User
 
 
 class News(db.Model):
     __tablename__ = "news"
+    __table_args__ = (
+        # Supports the (created_at DESC, id DESC) keyset used by paginated listing.
+        db.Index("ix_news_created_at_id", "created_at", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
@@ -15,6 +22,15 @@ class News(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
+    # created_by has no FK constraint in the schema, so the join is declared explicitly.
+    # "selectin" resolves the authors of a whole result list in one extra query.
+    author = db.relationship(
+        "User",
+        primaryjoin="foreign(News.created_by) == User.id",
+        lazy="selectin",
+        viewonly=True,
+    )
+
     def to_dict(self, include_author: bool = True, include_content: bool = True) -> dict:
         data = {
             "id": self.id,
@@ -28,13 +44,13 @@ class News(db.Model):
         }
         if include_content:
             data["content"] = self.content
+        else:
+            # List cards use a small derivative instead of the full-size cover.
+            data["cover_variants"] = variant_urls(self.cover_image)
         if include_author:
-            # Local import avoids circular import issues during migrations.
-            try:
-                from .user import User
-
-                author = User.query.get(self.created_by)
-                data["author_name"] = author.name if author else None
-            except Exception:
-                data["author_name"] = None
+            data["author_name"] = self.author.name if self.author else None
         return data
+
+
+# Keep the full-text index (news_fts / news_search) in sync with this table.
+register_index_listeners(News, User)
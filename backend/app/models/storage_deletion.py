@@ -0,0 +1,16 @@
+from datetime import datetime
+from ..extensions import db
+
+
+class StorageDeletion(db.Model):
+    """A stored object queued for removal once the transaction that orphaned it commits."""
+
+    __tablename__ = "storage_deletion"
+
+    id = db.Column(db.Integer, primary_key=True)
+    namespace = db.Column(db.String(32), nullable=False)  # storage namespace (documents, news, previews)
+    key = db.Column(db.String(1024), nullable=False)  # storage key, or a legacy absolute path
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.String(255))
+    not_before = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)  # retry backoff
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
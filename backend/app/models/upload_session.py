@@ -0,0 +1,29 @@
+from datetime import datetime
+from ..extensions import db
+
+
+class UploadSession(db.Model):
+    """State of one resumable (chunked) document upload."""
+
+    __tablename__ = "upload_session"
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex, also the partial file name
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=False)
+    file_type = db.Column(db.String(32), nullable=False)
+    category = db.Column(db.String(64), nullable=False, default="general")
+    total_size = db.Column(db.BigInteger, nullable=False)
+    received = db.Column(db.BigInteger, nullable=False, default=0)  # bytes written so far (= next offset)
+    checksum = db.Column(db.String(64))  # expected SHA-256 hex, optional
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def to_dict(self) -> dict:
+        return {
+            "upload_id": self.id,
+            "filename": self.filename,
+            "size": self.total_size,
+            "offset": self.received,
+            "expires_at": self.expires_at.isoformat() if self.expires_at else None,
+        }
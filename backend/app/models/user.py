@@ -1,9 +1,16 @@
 from datetime import datetime
 from ..extensions import db
 from werkzeug.security import generate_password_hash, check_password_hash
+from ..services.student_search import register_index_listeners
 
 
 class User(db.Model):
+    __table_args__ = (
+        # Teacher roster: role filter plus grade/class filters and default ordering.
+        db.Index("ix_user_role_grade_class", "role", "grade", "class_name"),
+        db.Index("ix_user_role_created_at", "role", "created_at"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(255), unique=True, nullable=False, index=True)
     name = db.Column(db.String(128), nullable=False, default="User")
@@ -12,7 +19,11 @@ class User(db.Model):
     student_id = db.Column(db.String(32))
     grade = db.Column(db.String(16))
     class_name = db.Column(db.String(32))
+    # Bytes uploaded (sum of document sizes), maintained by services/storage_quota.py.
+    storage_used = db.Column(db.BigInteger, nullable=False, default=0, server_default="0")
+    storage_quota = db.Column(db.BigInteger)  # per-user override; NULL uses the role default
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def set_password(self, password: str) -> None:
         self.password_hash = generate_password_hash(password)
@@ -22,3 +33,6 @@ class User(db.Model):
 
     def __repr__(self) -> str:
         return f"<User {self.id} {self.email}>"
+
+
+register_index_listeners(User)
@@ -0,0 +1,69 @@
+"""Request-scoped identity helpers and role checks.
+
+``role_required`` authorizes from the signed JWT claims written by
+``auth.login`` / ``auth.refresh`` and never touches the database. A role
+change therefore takes effect when the access token is next refreshed.
+
+``current_user`` is loaded lazily: the first access in a request runs one
+query and the result (including "not found") is kept on ``g``, so handlers
+and helpers can use it freely. It is a proxy; test it with ``not
+current_user`` rather than ``is None``.
+"""
+from functools import wraps
+
+from flask import g, jsonify
+from flask_jwt_extended import get_jwt, get_jwt_identity, verify_jwt_in_request
+from werkzeug.local import LocalProxy
+
+from ..extensions import db
+
+ROLE_LABELS = {"teacher": "教师", "student": "学生"}
+_MISSING = object()
+
+
+def current_user_id() -> int | None:
+    try:
+        ident = get_jwt_identity()
+    except RuntimeError:
+        return None
+    try:
+        return int(ident) if ident is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def current_role() -> str | None:
+    claims = get_jwt() or {}
+    return claims.get("role")
+
+
+def get_current_user():
+    """The ``User`` behind the request's token, or None. At most one query per request."""
+    from ..models import User
+
+    user = g.get("_current_user", _MISSING)
+    if user is _MISSING:
+        user_id = current_user_id()
+        user = db.session.get(User, user_id) if user_id is not None else None
+        g._current_user = user
+    return user
+
+
+current_user = LocalProxy(get_current_user)
+
+
+def role_required(*roles: str):
+    """``jwt_required()`` plus a role check against the token's ``role`` claim."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            verify_jwt_in_request()
+            if current_role() not in roles:
+                labels = "/".join(ROLE_LABELS.get(role, role) for role in roles)
+                return jsonify({"message": f"权限不足，仅{labels}可访问"}), 403
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,337 @@
+"""Free appointment slots computed from teachers' availability.
+
+A teacher's availability is three kinds of rows:
+
+- ``SlotTemplate``: the slots they offer (``09:00-10:00`` ...); teachers
+  without templates offer ``DEFAULT_SLOTS``, the grid the booking form has
+  always shown.
+- ``TeacherWorkingHours``: weekly windows; a template slot is offered on a
+  day only if it fits inside one of that weekday's windows. Teachers without
+  working hours are treated as available all day, every day.
+- ``TeacherBlackout``: inclusive date ranges with nothing offered.
+
+``free_slots`` answers for many teachers and a whole date range at once: the
+rows of all four tables for the requested teachers are read with one
+set-based query each (active appointments through the partial index
+``uq_appointments_active_slot``), and everything else is interval arithmetic
+on minutes since midnight. A booked slot removes every offered slot it
+overlaps, so legacy ``time_slot`` strings that do not match a template still
+block correctly.
+
+Results are cached per teacher and date range under a per-teacher
+generation number, which ``invalidate`` bumps whenever that teacher's
+appointments or availability change. Cached entries hold the free slots
+regardless of the clock; slots that have already started are filtered out
+on every read.
+"""
+import re
+import uuid
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import select
+
+from ..extensions import cache, db
+from . import booking
+
+DEFAULT_SLOTS = ("09:00-10:00", "10:00-11:00", "11:00-12:00", "14:00-15:00", "15:00-16:00", "16:00-17:00")
+# Longest date range one request may ask for, in days.
+MAX_RANGE_DAYS = 62
+MAX_TEACHERS = 100
+SLOT_PATTERN = re.compile(r"^\s*(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*$")
+MAX_WORKING_HOURS = 50
+MAX_SLOT_TEMPLATES = 48
+GENERATION_KEY = "availability:generation:{0}"
+RESULT_KEY = "availability:{0}:{1}:{2}:{3}"
+
+Interval = tuple[int, int]
+
+
+class InvalidAvailability(Exception):
+    """Rejected availability input; ``message`` is shown to the client."""
+
+    def __init__(self, message: str) -> None:
+        super().__init__(message)
+        self.message = message
+
+
+def minutes(value) -> int:
+    return value.hour * 60 + value.minute
+
+
+def slot_label(interval: Interval) -> str:
+    start, end = interval
+    return f"{start // 60:02d}:{start % 60:02d}-{end // 60:02d}:{end % 60:02d}"
+
+
+def parse_slot(value: str | None) -> Interval | None:
+    """``"09:00-10:00"`` -> ``(540, 600)``; None for anything else."""
+    match = SLOT_PATTERN.match(value or "")
+    if not match:
+        return None
+    sh, sm, eh, em = (int(part) for part in match.groups())
+    start, end = sh * 60 + sm, eh * 60 + em
+    if sh > 23 or eh > 24 or sm > 59 or em > 59 or end > 24 * 60 or start >= end:
+        return None
+    return start, end
+
+
+def merge(intervals) -> list[Interval]:
+    """Sorted, non-overlapping union of ``intervals`` (touching ones are joined)."""
+    merged: list[list[int]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def subtract(windows: list[Interval], busy: list[Interval]) -> list[Interval]:
+    """``windows`` minus ``busy``; both must be merged (see ``merge``)."""
+    free: list[Interval] = []
+    index = 0
+    for start, end in windows:
+        while index < len(busy) and busy[index][1] <= start:
+            index += 1
+        cursor = start
+        probe = index
+        while probe < len(busy) and busy[probe][0] < end:
+            if busy[probe][0] > cursor:
+                free.append((cursor, busy[probe][0]))
+            cursor = max(cursor, busy[probe][1])
+            probe += 1
+        if cursor < end:
+            free.append((cursor, end))
+    return free
+
+
+def fits(slot: Interval, free: list[Interval]) -> bool:
+    """Whether ``slot`` lies inside one interval of the merged ``free`` list."""
+    position = bisect_right(free, (slot[0], 24 * 60 + 1)) - 1
+    return position >= 0 and free[position][0] <= slot[0] and slot[1] <= free[position][1]
+
+
+class TeacherRules:
+    """One teacher's availability rows, in minutes."""
+
+    def __init__(self) -> None:
+        self.slots: list[Interval] = []
+        self.hours: dict[int, list[Interval]] = {}
+        self.blackouts: list[tuple[date, date]] = []
+
+    def offered(self, day: date) -> list[Interval]:
+        if any(start <= day <= end for start, end in self.blackouts):
+            return []
+        slots = self.slots or [parse_slot(value) for value in DEFAULT_SLOTS]
+        if not self.hours:
+            return sorted(slots)
+        windows = merge(self.hours.get(day.weekday(), []))
+        return sorted(slot for slot in slots if fits(slot, windows))
+
+
+def load_rules(teacher_ids: list[int], start: date, end: date) -> dict[int, TeacherRules]:
+    """teacher -> ``TeacherRules`` with the blackouts overlapping ``[start, end]``."""
+    from ..models import SlotTemplate, TeacherBlackout, TeacherWorkingHours
+
+    rules = {teacher_id: TeacherRules() for teacher_id in teacher_ids}
+    for row in db.session.execute(
+        select(SlotTemplate.teacher_id, SlotTemplate.start_time, SlotTemplate.end_time).where(
+            SlotTemplate.teacher_id.in_(teacher_ids)
+        )
+    ):
+        rules[row.teacher_id].slots.append((minutes(row.start_time), minutes(row.end_time)))
+    for row in db.session.execute(
+        select(
+            TeacherWorkingHours.teacher_id,
+            TeacherWorkingHours.weekday,
+            TeacherWorkingHours.start_time,
+            TeacherWorkingHours.end_time,
+        ).where(TeacherWorkingHours.teacher_id.in_(teacher_ids))
+    ):
+        interval = (minutes(row.start_time), minutes(row.end_time))
+        rules[row.teacher_id].hours.setdefault(row.weekday, []).append(interval)
+    for row in db.session.execute(
+        select(TeacherBlackout.teacher_id, TeacherBlackout.start_date, TeacherBlackout.end_date).where(
+            TeacherBlackout.teacher_id.in_(teacher_ids),
+            TeacherBlackout.start_date <= end,
+            TeacherBlackout.end_date >= start,
+        )
+    ):
+        rules[row.teacher_id].blackouts.append((row.start_date, row.end_date))
+    return rules
+
+
+def load(teacher_ids: list[int], start: date, end: date):
+    """``(rules, booked)`` for ``teacher_ids``: teacher -> ``TeacherRules`` and (teacher, date) -> intervals."""
+    from ..models import Appointment
+
+    rules = load_rules(teacher_ids, start, end)
+    booked: dict[tuple[int, date], list[Interval]] = {}
+    # The literal predicate (not a bound IN list) matches the index's, so SQLite can use the partial index.
+    for row in db.session.execute(
+        select(Appointment.teacher_id, Appointment.appointment_date, Appointment.time_slot).where(
+            Appointment.teacher_id.in_(teacher_ids),
+            Appointment.appointment_date.between(start, end),
+            booking.ACTIVE_CLAUSE,
+        )
+    ):
+        interval = parse_slot(row.time_slot)
+        if interval is not None:
+            booked.setdefault((row.teacher_id, row.appointment_date), []).append(interval)
+    return rules, booked
+
+
+def offers(teacher_id: int, day: date, time_slot: str) -> bool:
+    """Whether the teacher's availability includes exactly this slot on ``day`` (bookings aside)."""
+    interval = parse_slot(time_slot)
+    if interval is None:
+        return False
+    return interval in load_rules([teacher_id], day, day)[teacher_id].offered(day)
+
+
+def compute(teacher_ids: list[int], start: date, end: date) -> dict[int, dict[str, list[str]]]:
+    """teacher -> ISO date -> free slot labels, straight from the database."""
+    rules, booked = load(teacher_ids, start, end)
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    result: dict[int, dict[str, list[str]]] = {}
+    for teacher_id in teacher_ids:
+        calendar = {}
+        for day in days:
+            offered = rules[teacher_id].offered(day)
+            busy = merge(booked.get((teacher_id, day), []))
+            if busy:
+                free = subtract(merge(offered), busy)
+                offered = [slot for slot in offered if fits(slot, free)]
+            calendar[day.isoformat()] = [slot_label(slot) for slot in offered]
+        result[teacher_id] = calendar
+    return result
+
+
+def _generations(teacher_ids: list[int]) -> dict[int, str]:
+    keys = [GENERATION_KEY.format(teacher_id) for teacher_id in teacher_ids]
+    found = dict(zip(teacher_ids, cache.get_many(*keys)))
+    fresh = {teacher_id: uuid.uuid4().hex for teacher_id, value in found.items() if value is None}
+    if fresh:
+        cache.set_many({GENERATION_KEY.format(t): value for t, value in fresh.items()}, timeout=0)
+    return {**found, **fresh}
+
+
+def drop_started(calendar: dict[str, list[str]], now: datetime) -> dict[str, list[str]]:
+    today = now.date().isoformat()
+    current = now.hour * 60 + now.minute
+    return {
+        day: slots if day > today else [slot for slot in slots if parse_slot(slot)[0] > current]
+        for day, slots in calendar.items()
+        if day >= today
+    }
+
+
+def free_slots(teacher_ids: list[int], start: date, end: date, now: datetime | None = None):
+    """teacher -> ISO date -> free slots not yet started, for the dates of ``[start, end]`` from today on."""
+    now = now or datetime.now()
+    generations = _generations(teacher_ids)
+    keys = {
+        teacher_id: RESULT_KEY.format(teacher_id, generations[teacher_id], start.isoformat(), end.isoformat())
+        for teacher_id in teacher_ids
+    }
+    result = {t: value for t, value in zip(teacher_ids, cache.get_many(*keys.values())) if value is not None}
+    missing = [teacher_id for teacher_id in teacher_ids if teacher_id not in result]
+    if missing:
+        computed = compute(missing, start, end)
+        cache.set_many({keys[teacher_id]: computed[teacher_id] for teacher_id in missing})
+        result.update(computed)
+    return {teacher_id: drop_started(result[teacher_id], now) for teacher_id in teacher_ids}
+
+
+def invalidate(*teacher_ids: int) -> None:
+    """Retire every cached range of these teachers (call after the change commits)."""
+    cache.set_many({GENERATION_KEY.format(t): uuid.uuid4().hex for t in teacher_ids}, timeout=0)
+
+
+def _clock(value: int) -> time:
+    return time(value // 60, value % 60)
+
+
+def _window(start, end) -> Interval:
+    interval = parse_slot(f"{start}-{end}")
+    if interval is None or interval[1] >= 24 * 60:
+        raise InvalidAvailability("时间格式错误，应为HH:MM且开始早于结束")
+    return interval
+
+
+def rules_payload(teacher_id: int) -> dict:
+    from ..models import SlotTemplate, TeacherBlackout, TeacherWorkingHours
+
+    hours = TeacherWorkingHours.query.filter_by(teacher_id=teacher_id).order_by(
+        TeacherWorkingHours.weekday, TeacherWorkingHours.start_time
+    )
+    slots = SlotTemplate.query.filter_by(teacher_id=teacher_id).order_by(SlotTemplate.start_time)
+    blackouts = TeacherBlackout.query.filter(
+        TeacherBlackout.teacher_id == teacher_id, TeacherBlackout.end_date >= date.today()
+    ).order_by(TeacherBlackout.start_date)
+    return {
+        "working_hours": [row.to_dict() for row in hours],
+        "slot_templates": [slot_label((minutes(row.start_time), minutes(row.end_time))) for row in slots],
+        "default_slots": list(DEFAULT_SLOTS),
+        "blackouts": [row.to_dict() for row in blackouts],
+    }
+
+
+def replace_rules(teacher_id: int, working_hours=None, slot_templates=None) -> None:
+    """Replace the teacher's working hours and/or slot templates (None leaves a kind untouched) and commit."""
+    from ..models import SlotTemplate, TeacherWorkingHours
+
+    hours: list[tuple[int, Interval]] = []
+    if working_hours is not None:
+        if not isinstance(working_hours, list) or len(working_hours) > MAX_WORKING_HOURS:
+            raise InvalidAvailability("working_hours 须为列表")
+        for item in working_hours:
+            if not isinstance(item, dict) or item.get("weekday") not in range(7):
+                raise InvalidAvailability("weekday 须为 0（周一）到 6（周日）")
+            hours.append((item["weekday"], _window(item.get("start"), item.get("end"))))
+
+    slots: set[Interval] = set()
+    if slot_templates is not None:
+        if not isinstance(slot_templates, list) or len(slot_templates) > MAX_SLOT_TEMPLATES:
+            raise InvalidAvailability("slot_templates 须为列表")
+        for value in slot_templates:
+            interval = parse_slot(value) if isinstance(value, str) else None
+            if interval is None or interval[1] >= 24 * 60:
+                raise InvalidAvailability(f"时间段格式错误: {value}")
+            slots.add(interval)
+        ordered = sorted(slots)
+        if any(previous[1] > current[0] for previous, current in zip(ordered, ordered[1:])):
+            raise InvalidAvailability("时间段不能重叠")
+
+    if working_hours is not None:
+        TeacherWorkingHours.query.filter_by(teacher_id=teacher_id).delete(synchronize_session=False)
+        for weekday, (start, end) in hours:
+            db.session.add(
+                TeacherWorkingHours(teacher_id=teacher_id, weekday=weekday, start_time=_clock(start), end_time=_clock(end))
+            )
+    if slot_templates is not None:
+        SlotTemplate.query.filter_by(teacher_id=teacher_id).delete(synchronize_session=False)
+        for start, end in sorted(slots):
+            db.session.add(SlotTemplate(teacher_id=teacher_id, start_time=_clock(start), end_time=_clock(end)))
+    db.session.commit()
+    invalidate(teacher_id)
+
+
+def add_blackout(teacher_id: int, start: date, end: date, reason: str | None = None):
+    from ..models import TeacherBlackout
+
+    if end < start:
+        raise InvalidAvailability("结束日期不能早于开始日期")
+    blackout = TeacherBlackout(teacher_id=teacher_id, start_date=start, end_date=end, reason=(reason or "")[:255] or None)
+    db.session.add(blackout)
+    db.session.commit()
+    invalidate(teacher_id)
+    return blackout
+
+
+def remove_blackout(blackout) -> None:
+    teacher_id = blackout.teacher_id
+    db.session.delete(blackout)
+    db.session.commit()
+    invalidate(teacher_id)
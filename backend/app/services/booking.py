@@ -0,0 +1,87 @@
+"""Appointment booking.
+
+At most one *active* (``pending`` / ``approved``) appointment may hold a
+teacher's slot. The database enforces that with the partial unique index
+``uq_appointments_active_slot`` on ``(teacher_id, appointment_date,
+time_slot)``; booking is a single ``INSERT ... ON CONFLICT DO NOTHING``
+against that index, so concurrent requests cannot both win no matter how
+they interleave. Other dialects fall back to a plain INSERT inside a
+savepoint and treat the unique violation the same way.
+
+Every committed change retires the teacher's cached free slots
+(``availability.invalidate``).
+"""
+from sqlalchemy import insert, text
+from sqlalchemy.exc import IntegrityError
+
+from ..extensions import db
+from . import availability
+from .news_search import dialect_name
+
+ACTIVE_STATUSES = ("pending", "approved")
+SLOT_COLUMNS = ("teacher_id", "appointment_date", "time_slot")
+ACTIVE_CLAUSE = text("status IN ('pending', 'approved')")
+
+
+class SlotTaken(Exception):
+    """The slot already has an active appointment."""
+
+
+class SlotUnavailable(Exception):
+    """The teacher does not offer the slot on that day (see ``availability``)."""
+
+
+def _conflict_insert(table, values: dict):
+    name = dialect_name()
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return (
+        dialect_insert(table)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=list(SLOT_COLUMNS), index_where=ACTIVE_CLAUSE)
+        .returning(table.c.id)
+    )
+
+
+def book(**values):
+    """Insert a pending appointment and commit it.
+
+    Raises ``SlotUnavailable`` for slots outside the teacher's availability and
+    ``SlotTaken`` on conflict.
+    """
+    from ..models import Appointment
+
+    if not availability.offers(values["teacher_id"], values["appointment_date"], values["time_slot"]):
+        raise SlotUnavailable()
+    values.setdefault("status", "pending")
+    table = Appointment.__table__
+    stmt = _conflict_insert(table, values)
+    if stmt is not None:
+        appointment_id = db.session.execute(stmt).scalar()
+    else:
+        try:
+            with db.session.begin_nested():
+                appointment_id = db.session.execute(insert(table).values(**values).returning(table.c.id)).scalar()
+        except IntegrityError:
+            appointment_id = None
+    if appointment_id is None:
+        db.session.rollback()
+        raise SlotTaken()
+    db.session.commit()
+    availability.invalidate(values["teacher_id"])
+    return db.session.get(Appointment, appointment_id)
+
+
+def set_status(appointment, status: str) -> None:
+    """Change an appointment's status and commit; reactivating onto a taken slot raises ``SlotTaken``."""
+    appointment.status = status
+    try:
+        db.session.commit()
+    except IntegrityError as exc:
+        db.session.rollback()
+        raise SlotTaken() from exc
+    availability.invalidate(appointment.teacher_id)
@@ -0,0 +1,363 @@
+"""Resumable document uploads (tus-style create / PATCH at offset / complete).
+
+Each session owns a partial file under ``<local documents root>/.partial/<id>``
+(local scratch space even when documents are stored in S3; with the local
+backend, finishing is a rename on the same filesystem).
+Chunks are streamed from the request body straight into that file at the
+session's current offset; the running size lives in ``UploadSession.received``
+and the SHA-256 is updated chunk by chunk. Hash state cannot be stored in the
+database, so it is kept per process and rebuilt from the partial file only
+when a chunk lands on a different worker (or after a restart).
+
+If the connection drops mid-chunk, the bytes that did arrive are kept and
+the client resumes from the offset reported by ``GET``.
+
+A chunk first claims the session with a lock file next to the partial file
+and re-reads the committed offset; only then is the file truncated and
+written. A stale retry of a chunk that already landed therefore fails the
+offset check without touching bytes the database has counted. Completing
+takes the same lock, so a double or retried ``complete`` cannot store the
+file twice.
+
+Partial files are scratch space on the node that created the session: run
+several app servers only with sticky sessions (or a shared ``.partial``
+directory). A chunk or ``complete`` that reaches a node without the partial
+file gets 410 and the client starts over.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, update
+from sqlalchemy.exc import InvalidRequestError
+from werkzeug.exceptions import ClientDisconnected
+
+from ..extensions import db
+from . import document_blobs, document_storage, storage_cleanup, storage_quota
+
+PARTIAL_SUBDIR = ".partial"
+CHUNK_SIZE = 64 * 1024
+LOCK_SUFFIX = ".lock"
+# Writers touch their lock while streaming; one left alone this long belongs to a dead process.
+LOCK_STALE_SECONDS = 300
+LOCK_TOUCH_BLOCKS = 64
+CHECKSUM_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+MISSING_PARTIAL_MESSAGE = "上传数据不在此服务器上，请重新上传"
+
+_hashers: dict[str, tuple[int, "hashlib._Hash"]] = {}
+_hashers_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    """Client-facing upload failure; ``status`` is the HTTP status to answer with."""
+
+    def __init__(self, message: str, status: int = 400) -> None:
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def partial_path(upload_id: str) -> str:
+    return os.path.join(document_storage.storage_root(), PARTIAL_SUBDIR, upload_id)
+
+
+def lock_path(upload_id: str) -> str:
+    return partial_path(upload_id) + LOCK_SUFFIX
+
+
+@contextmanager
+def _write_lock(upload_id: str):
+    """Exclusive right to write this session's partial file (one host's workers share it)."""
+    path = lock_path(upload_id)
+    for attempt in range(2):
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileNotFoundError as exc:
+            # No .partial directory: the session was created on another node.
+            raise UploadError(MISSING_PARTIAL_MESSAGE, 410) from exc
+        except FileExistsError:
+            try:
+                stale = time.time() - os.path.getmtime(path) > LOCK_STALE_SECONDS
+            except FileNotFoundError:
+                stale = True
+            if attempt or not stale:
+                raise UploadError("该上传正被其他请求写入", 409)
+            _remove(path)
+    try:
+        yield path
+    finally:
+        _remove(path)
+
+
+def _reload(session) -> None:
+    """Re-read the committed session once the lock is held."""
+    try:
+        db.session.refresh(session)
+    except InvalidRequestError as exc:
+        # Deleted by a request that held the lock before us (completed or aborted).
+        raise UploadError("上传已完成或已取消", 409) from exc
+
+
+@contextmanager
+def _claim(session):
+    """Lock ``session``, re-read it and make sure its partial file is on this node."""
+    with _write_lock(session.id) as lock:
+        _reload(session)
+        if not os.path.exists(partial_path(session.id)):
+            raise UploadError(MISSING_PARTIAL_MESSAGE, 410)
+        yield lock
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _expiry() -> datetime:
+    return datetime.utcnow() + timedelta(hours=current_app.config["UPLOAD_SESSION_TTL_HOURS"])
+
+
+def _forget_hasher(upload_id: str) -> None:
+    with _hashers_lock:
+        _hashers.pop(upload_id, None)
+
+
+def _hasher_for(session):
+    with _hashers_lock:
+        cached = _hashers.pop(session.id, None)
+    if cached and cached[0] == session.received:
+        return cached[1]
+
+    hasher = hashlib.sha256()
+    remaining = session.received
+    with open(partial_path(session.id), "rb") as fh:
+        while remaining > 0:
+            block = fh.read(min(CHUNK_SIZE, remaining))
+            if not block:
+                raise UploadError("上传数据已损坏，请重新上传", 410)
+            hasher.update(block)
+            remaining -= len(block)
+    return hasher
+
+
+def pending_bytes(user_id: int) -> int:
+    from ..models import UploadSession
+
+    total = (
+        db.session.query(func.coalesce(func.sum(UploadSession.total_size), 0))
+        .filter(UploadSession.user_id == user_id, UploadSession.expires_at > datetime.utcnow())
+        .scalar()
+    )
+    return int(total or 0)
+
+
+def create_session(user_id: int, filename: str, file_type: str, size, category: str = "general",
+                   checksum: str | None = None):
+    from ..models import UploadSession, User
+
+    config = current_app.config
+    try:
+        size = int(size)
+    except (TypeError, ValueError) as exc:
+        raise UploadError("文件大小无效") from exc
+    if size <= 0:
+        raise UploadError("文件大小无效")
+    if size > config["UPLOAD_MAX_FILE_SIZE"]:
+        raise UploadError("文件超过单个文件大小上限", 413)
+    pending = pending_bytes(user_id)
+    if pending + size > config["UPLOAD_MAX_PENDING_BYTES"]:
+        raise UploadError("未完成的上传过多，请先完成或取消其他上传", 413)
+    try:
+        # Unfinished uploads count against the quota too, so parallel sessions cannot overshoot it.
+        storage_quota.check(db.session.get(User, user_id), pending + size)
+    except storage_quota.QuotaExceeded as exc:
+        raise UploadError(exc.message, 413) from exc
+    if checksum is not None:
+        checksum = str(checksum).strip().lower()
+        if not CHECKSUM_PATTERN.match(checksum):
+            raise UploadError("checksum 需为 SHA-256 十六进制字符串")
+
+    session = UploadSession(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        filename=filename,
+        file_type=file_type,
+        category=category or "general",
+        total_size=size,
+        received=0,
+        checksum=checksum,
+        expires_at=_expiry(),
+    )
+    path = partial_path(session.id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+    db.session.add(session)
+    db.session.commit()
+    return session
+
+
+def get_session(upload_id: str, user_id: int):
+    """The caller's unexpired session, or None."""
+    from ..models import UploadSession
+
+    session = db.session.get(UploadSession, upload_id)
+    if not session or session.user_id != user_id or session.expires_at <= datetime.utcnow():
+        return None
+    return session
+
+
+def append_chunk(session, offset: int, stream, length: int | None) -> int:
+    """Write the request body at ``offset``. Returns the new offset."""
+    from ..models import UploadSession
+
+    if length is not None and length > current_app.config["UPLOAD_MAX_CHUNK_SIZE"]:
+        raise UploadError("单个分片过大", 413)
+
+    # Committed state only; a request that lost the race sees the winner's offset here.
+    with _claim(session) as lock:
+        if offset != session.received:
+            raise UploadError(f"偏移量不匹配，当前为 {session.received}", 409)
+        remaining = session.total_size - session.received
+        if length is not None and length > remaining:
+            raise UploadError("数据超出声明的文件大小", 413)
+
+        hasher = _hasher_for(session)
+        written = 0
+        blocks = 0
+        disconnected = None
+        try:
+            with open(partial_path(session.id), "r+b") as out:
+                # Drop bytes a failed earlier attempt may have left past the offset.
+                out.truncate(offset)
+                out.seek(offset)
+                while True:
+                    try:
+                        block = stream.read(CHUNK_SIZE)
+                    except ClientDisconnected as exc:
+                        disconnected = exc
+                        break
+                    if not block:
+                        break
+                    if written + len(block) > remaining:
+                        raise UploadError("数据超出声明的文件大小", 413)
+                    out.write(block)
+                    hasher.update(block)
+                    written += len(block)
+                    blocks += 1
+                    if blocks % LOCK_TOUCH_BLOCKS == 0:
+                        os.utime(lock)
+        except Exception:
+            _forget_hasher(session.id)
+            raise
+
+        new_offset = offset + written
+        # Compare-and-set as a backstop: the offset cannot have moved while the lock was held.
+        result = db.session.execute(
+            update(UploadSession)
+            .where(UploadSession.id == session.id, UploadSession.received == offset)
+            .values(received=new_offset, expires_at=_expiry(), updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        if result.rowcount != 1:
+            _forget_hasher(session.id)
+            raise UploadError("该上传正被其他请求写入", 409)
+        db.session.refresh(session)
+
+        with _hashers_lock:
+            _hashers[session.id] = (new_offset, hasher)
+    if disconnected is not None:
+        raise disconnected
+    return new_offset
+
+
+def finalize(session):
+    """Turn a fully received session into a ``Document``. Returns ``(document, sha256)``."""
+    from ..models import Document, User
+
+    with _claim(session):
+        if session.received != session.total_size:
+            raise UploadError(f"上传未完成（{session.received}/{session.total_size}）", 409)
+
+        digest = _hasher_for(session).hexdigest()
+        if session.checksum and digest != session.checksum:
+            abort(session)
+            raise UploadError("校验和不匹配，请重新上传", 422)
+
+        redundant_key = stored_key = None
+        blob = document_blobs.reference_existing(digest)
+        if blob is None:
+            stored_key = document_storage.new_key(session.file_type)
+            document_storage.storage().put_file(stored_key, partial_path(session.id))
+            blob, redundant_key = document_blobs.claim(digest, stored_key, session.total_size)
+        try:
+            storage_quota.charge(db.session.get(User, session.user_id), session.total_size)
+        except storage_quota.QuotaExceeded as exc:
+            db.session.rollback()
+            if stored_key:
+                document_storage.delete_key(stored_key)
+            abort(session)
+            raise UploadError(exc.message, 413) from exc
+
+        document = Document(
+            user_id=session.user_id,
+            name=session.filename,
+            original_name=session.filename,
+            file_path=blob.storage_key,
+            blob=blob,
+            file_size=session.total_size,
+            file_type=session.file_type,
+            category=session.category,
+        )
+        upload_id = session.id
+        db.session.add(document)
+        db.session.delete(session)
+        # Content that was already stored leaves either the partial file or a fresh copy unused.
+        storage_cleanup.schedule("documents", redundant_key)
+        db.session.commit()
+        _forget_hasher(upload_id)
+        if os.path.exists(partial_path(upload_id)):
+            os.remove(partial_path(upload_id))
+        return document, digest
+
+
+def abort(session) -> None:
+    _forget_hasher(session.id)
+    _remove(partial_path(session.id))
+    _remove(lock_path(session.id))
+    db.session.delete(session)
+    db.session.commit()
+
+
+def purge_expired(batch_size: int = 200, now: datetime | None = None) -> int:
+    """Delete expired sessions and their partial files. Returns sessions removed."""
+    from ..models import UploadSession
+
+    now = now or datetime.utcnow()
+    removed = 0
+    while True:
+        sessions = (
+            UploadSession.query.filter(UploadSession.expires_at <= now)
+            .order_by(UploadSession.expires_at)
+            .limit(batch_size)
+            .all()
+        )
+        if not sessions:
+            break
+        for session in sessions:
+            _forget_hasher(session.id)
+            _remove(partial_path(session.id))
+            _remove(lock_path(session.id))
+            db.session.delete(session)
+        db.session.commit()
+        removed += len(sessions)
+    return removed
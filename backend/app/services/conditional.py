@@ -0,0 +1,88 @@
+"""Conditional GET support (ETag / Last-Modified).
+
+Endpoints opt in with ``@conditional(validator_fn)``. The validator function
+receives the view arguments and returns a :class:`Validator` built from cheap
+aggregate queries (row count, max ``updated_at``) or ``None`` to skip
+validation. A matching ``If-None-Match`` / ``If-Modified-Since`` is answered
+with ``304 Not Modified`` before the view runs, so the body is never built.
+"""
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import Response, g, request
+from sqlalchemy import func
+
+# Browsers may keep the payload but must revalidate it on every use.
+PUBLIC_CACHE_CONTROL = "no-cache"
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+
+@dataclass(frozen=True)
+class Validator:
+    etag: str
+    last_modified: datetime | None = None
+
+
+def make_validator(*parts, last_modified: datetime | None = None) -> Validator:
+    """Hash arbitrary parts (counts, timestamps, filters) into a weak ETag."""
+    raw = "|".join("" if p is None else (p.isoformat() if isinstance(p, datetime) else str(p)) for p in parts)
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+    return Validator(etag=digest, last_modified=last_modified)
+
+
+def table_validator(query, updated_column, *extra) -> Validator:
+    """Validator from ``COUNT(*)`` and ``MAX(updated_column)`` over ``query``'s rows."""
+    count, latest = query.with_entities(func.count(), func.max(updated_column)).order_by(None).one()
+    return make_validator(count, latest, *extra, last_modified=latest)
+
+
+def _to_http_datetime(value: datetime) -> datetime:
+    # Stored timestamps are naive UTC (datetime.utcnow); HTTP dates have second precision.
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+
+def is_not_modified(validator: Validator) -> bool:
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(validator.etag)
+    if request.if_modified_since and validator.last_modified:
+        return _to_http_datetime(validator.last_modified) <= request.if_modified_since
+    return False
+
+
+def apply_validator(response: Response, validator: Validator, private: bool) -> Response:
+    response.set_etag(validator.etag, weak=True)
+    if validator.last_modified:
+        response.last_modified = _to_http_datetime(validator.last_modified)
+    response.headers["Cache-Control"] = PRIVATE_CACHE_CONTROL if private else PUBLIC_CACHE_CONTROL
+    if private:
+        response.vary.add("Authorization")
+    # Tell the global no-store hook to leave this response alone.
+    g.conditional_response = True
+    return response
+
+
+def conditional(validator_fn, private: bool = False):
+    """Answer 304 when the client's copy is current; otherwise tag the response."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            validator = validator_fn(**kwargs)
+            if validator is None:
+                return view(*args, **kwargs)
+
+            if is_not_modified(validator):
+                return apply_validator(Response(status=304), validator, private)
+
+            response = view(*args, **kwargs)
+            if not isinstance(response, Response) or response.status_code != 200:
+                return response
+            return apply_validator(response, validator, private)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,189 @@
+"""Content deduplication for document files.
+
+Uploads are hashed (SHA-256) while they stream into storage. The first copy
+of some content becomes a ``DocumentBlob``; later documents with the same
+hash point at that blob (``Document.blob_id``, with ``file_path`` set to the
+blob's key) and the copy just written is deleted again.
+
+``ref_count`` is only changed by single-statement UPDATEs, and a blob row is
+removed with ``DELETE ... WHERE ref_count <= 0``, so a concurrent upload
+either sees the blob and keeps it alive or finds it gone and stores its own
+copy. Stored files are queued for deletion (``storage_cleanup``) in the
+transaction that drops the last reference, so they go only once it commits.
+
+Documents created before deduplication have no blob and own their file;
+``flask documents dedupe`` links them up.
+"""
+import hashlib
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+
+from ..extensions import db
+from . import document_storage, storage_cleanup
+
+CHUNK_SIZE = 64 * 1024
+
+
+class HashingReader:
+    """Wraps a stream and hashes every byte read through it."""
+
+    def __init__(self, stream) -> None:
+        self.stream = stream
+        self.hasher = hashlib.sha256()
+
+    def read(self, size=-1):
+        chunk = self.stream.read(size)
+        self.hasher.update(chunk)
+        return chunk
+
+    def hexdigest(self) -> str:
+        return self.hasher.hexdigest()
+
+
+def hash_stored(key: str) -> tuple[str, int]:
+    """``(sha256, size)`` of a stored document, read chunk by chunk."""
+    hasher = hashlib.sha256()
+    size = 0
+    with document_storage.open_document(key) as source:
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            size += len(chunk)
+    return hasher.hexdigest(), size
+
+
+def reference_existing(digest: str):
+    """Add a reference to the blob holding ``digest``; None if there is none."""
+    from ..models import DocumentBlob
+
+    blob = DocumentBlob.query.filter_by(sha256=digest).first()
+    if blob is None:
+        return None
+    result = db.session.execute(
+        update(DocumentBlob).where(DocumentBlob.id == blob.id).values(ref_count=DocumentBlob.ref_count + 1)
+    )
+    # Zero rows: the last reference was released (and the row deleted) meanwhile.
+    return blob if result.rowcount == 1 else None
+
+
+def claim(digest: str, key: str, size: int):
+    """Blob for ``digest`` with one more reference, for a copy just stored at ``key``.
+
+    Returns ``(blob, redundant_key)``. When the content was already stored,
+    ``redundant_key`` is ``key`` and should be deleted after commit;
+    otherwise ``key`` becomes the new blob's file and ``redundant_key`` is
+    None. Call before adding other rows: losing the race for a new hash
+    rolls the session back.
+    """
+    from ..models import DocumentBlob
+
+    blob = reference_existing(digest)
+    if blob is not None:
+        return blob, key
+
+    blob = DocumentBlob(sha256=digest, storage_key=key, size=size, ref_count=1)
+    db.session.add(blob)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        # Another upload inserted the same hash first; share its blob.
+        db.session.rollback()
+        blob = reference_existing(digest)
+        if blob is None:
+            raise
+        return blob, key
+    return blob, None
+
+
+def release(blob_id: int | None, key: str | None) -> str | None:
+    """Drop one reference; returns the key to delete after commit, if any.
+
+    Documents without a blob own their file, so their key is always returned.
+    """
+    from ..models import DocumentBlob
+
+    if blob_id is None:
+        return key
+    db.session.execute(
+        update(DocumentBlob).where(DocumentBlob.id == blob_id).values(ref_count=DocumentBlob.ref_count - 1)
+    )
+    storage_key = db.session.execute(
+        select(DocumentBlob.storage_key).where(DocumentBlob.id == blob_id)
+    ).scalar()
+    result = db.session.execute(
+        delete(DocumentBlob).where(DocumentBlob.id == blob_id, DocumentBlob.ref_count <= 0)
+    )
+    return storage_key if result.rowcount else None
+
+
+def delete_document(document) -> None:
+    """Delete ``document`` and, once nothing else references it, queue its stored file.
+
+    The owner's storage usage is reduced and the file queued for deletion
+    (``storage_cleanup``) in the same transaction; a worker removes it.
+    """
+    from .storage_quota import uncharge
+
+    blob_id, key = document.blob_id, document.file_path
+    user_id, size = document.user_id, document.file_size or 0
+    db.session.delete(document)
+    db.session.flush()
+    storage_cleanup.schedule("documents", release(blob_id, key))
+    uncharge(user_id, size)
+    db.session.commit()
+
+
+def deduplicate_existing(batch_size: int = 200, dry_run: bool = False) -> dict:
+    """Link documents without a blob to shared blobs, queueing duplicate files for deletion.
+
+    Each document is committed on its own, together with the deletion of the
+    duplicate it no longer points at. Legacy absolute paths are skipped (run
+    ``reconcile-paths`` first) and unreadable files are reported by id.
+    """
+    from ..models import Document, DocumentBlob
+
+    result = {"linked": 0, "duplicates": 0, "bytes_freed": 0, "missing": [], "legacy": []}
+    seen: set[str] = set()
+    last_id = 0
+    while True:
+        documents = (
+            Document.query.filter(Document.id > last_id, Document.blob_id.is_(None))
+            .order_by(Document.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not documents:
+            break
+        last_id = documents[-1].id
+
+        for document in documents:
+            if document_storage.is_legacy_path(document.file_path):
+                result["legacy"].append(document.id)
+                continue
+            try:
+                digest, size = hash_stored(document.file_path)
+            except FileNotFoundError:
+                result["missing"].append(document.id)
+                continue
+
+            if dry_run:
+                duplicate = digest in seen or DocumentBlob.query.filter_by(sha256=digest).first() is not None
+                seen.add(digest)
+            else:
+                blob, redundant = claim(digest, document.file_path, size)
+                document = db.session.get(Document, document.id)
+                document.blob = blob
+                document.file_path = blob.storage_key
+                duplicate = redundant is not None
+                if duplicate and redundant != blob.storage_key:
+                    storage_cleanup.schedule("documents", redundant)
+                db.session.commit()
+
+            result["linked"] += 1
+            if duplicate:
+                result["duplicates"] += 1
+                result["bytes_freed"] += size
+    return result
@@ -0,0 +1,189 @@
+"""Lightweight previews of uploaded documents.
+
+A preview is derived purely from file content, so it is stored in the
+``previews`` storage namespace under the SHA-256 of that content
+(``ab/cd/<digest>.webp``): documents sharing a blob share one preview, and
+re-uploading a file never renders it twice. Rows not yet linked to a blob
+(``flask documents dedupe``) use ``document-<id>`` instead.
+
+- photos: downscaled WebP
+- PDF: the first page's largest embedded image as WebP (scanned certificates
+  and transcripts are one image per page); pages without one get a text
+  preview. Rasterizing vector pages needs a PDF renderer, which pypdf is not.
+- TXT / DOCX: escaped HTML of the leading text
+
+Previews are generated in the background after upload
+(``tasks/document_previews.py``); the preview endpoints answer 202 until the
+preview exists. A render that fails (corrupt, encrypted or missing file)
+leaves a ``<stem>.failed`` marker instead, so the endpoints answer 422 rather
+than queueing the same render on every poll; ``flask documents previews
+--retry-failed`` tries those again.
+"""
+import html
+import io
+
+from flask import current_app, g
+
+from ..extensions import db
+from . import document_storage, document_text
+from .file_delivery import send_from_storage
+from .storage import fanout_key, get_storage
+
+IMAGE_TYPES = {"png", "jpg", "jpeg", "gif"}
+TEXT_TYPES = {"txt", "docx"}
+PREVIEWABLE_TYPES = IMAGE_TYPES | TEXT_TYPES | {"pdf"}
+# Longest edge of image previews, in px.
+PREVIEW_MAX_SIZE = 1280
+PREVIEW_QUALITY = 80
+# Characters of text rendered into HTML previews.
+PREVIEW_TEXT_CHARS = 5000
+# extension -> served mimetype, in lookup order
+FORMATS = {"webp": "image/webp", "html": "text/html; charset=utf-8"}
+FAILED_EXTENSION = "failed"
+# Previews never change for a given key; let browsers keep them.
+CACHE_CONTROL = "private, max-age=86400"
+# HTML previews are inert: no scripts, no remote loads, no sniffing.
+HTML_POLICY = "default-src 'none'; style-src 'unsafe-inline'; sandbox"
+HTML_TEMPLATE = (
+    '<!doctype html><html><head><meta charset="utf-8">'
+    "<style>body{margin:1.5em;font:14px/1.6 sans-serif;color:#222}"
+    "pre{white-space:pre-wrap;word-break:break-word;font:inherit}</style>"
+    "</head><body><pre>{body}</pre></body></html>"
+)
+
+
+class PreviewFailed(Exception):
+    """Rendering this document's preview failed before; it will not be retried on request."""
+
+
+def storage():
+    return get_storage("previews")
+
+
+def supports(document) -> bool:
+    return (document.file_type or "").lower() in PREVIEWABLE_TYPES
+
+
+def preview_stem(document) -> str:
+    return document.blob.sha256 if document.blob is not None else f"document-{document.id}"
+
+
+def preview_key(document, extension: str) -> str:
+    return fanout_key(f"{preview_stem(document)}.{extension}")
+
+
+def find_preview(document, backend=None) -> tuple[str, str] | None:
+    """``(key, mimetype)`` of the stored preview, or None if there is none yet."""
+    backend = backend or storage()
+    for extension, mimetype in FORMATS.items():
+        key = preview_key(document, extension)
+        if backend.exists(key):
+            return key, mimetype
+    return None
+
+
+def has_failed(document, backend=None) -> bool:
+    return (backend or storage()).exists(preview_key(document, FAILED_EXTENSION))
+
+
+def render_image(image) -> bytes:
+    from PIL import ImageOps
+
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((PREVIEW_MAX_SIZE, PREVIEW_MAX_SIZE))
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="WEBP", quality=PREVIEW_QUALITY)
+    return buffer.getvalue()
+
+
+def render_text(value: str) -> bytes:
+    value = value.strip()
+    if len(value) > PREVIEW_TEXT_CHARS:
+        value = value[:PREVIEW_TEXT_CHARS] + "…"
+    return HTML_TEMPLATE.replace("{body}", html.escape(value)).encode("utf-8")
+
+
+def render_pdf(source) -> tuple[str, bytes]:
+    from pypdf import PdfReader
+
+    page = PdfReader(source).pages[0]
+    largest = None
+    for embedded in page.images:
+        image = embedded.image
+        if largest is None or image.width * image.height > largest.width * largest.height:
+            largest = image
+    if largest is not None:
+        return "webp", render_image(largest)
+    return "html", render_text(page.extract_text() or "")
+
+
+def render(document, source) -> tuple[str, bytes]:
+    """``(extension, bytes)`` of the preview for ``document`` read from ``source``."""
+    from PIL import Image
+
+    file_type = document.file_type.lower()
+    if file_type in IMAGE_TYPES:
+        with Image.open(source) as opened:
+            opened.load()
+            return "webp", render_image(opened)
+    if file_type == "pdf":
+        return render_pdf(source)
+    return "html", render_text(document_text.EXTRACTORS[file_type](source))
+
+
+def generate_preview(document_id: int, retry_failed: bool = False) -> str | None:
+    """Render and store a document's preview unless it exists; returns its key.
+
+    A failed render stores the failure marker; later calls skip the document
+    unless ``retry_failed`` is set.
+    """
+    from ..models import Document
+
+    document = db.session.get(Document, document_id)
+    if document is None or not supports(document):
+        return None
+
+    backend = storage()
+    existing = find_preview(document, backend)
+    if existing is not None:
+        return existing[0]
+    failed_key = preview_key(document, FAILED_EXTENSION)
+    if backend.exists(failed_key):
+        if not retry_failed:
+            return None
+        backend.delete(failed_key)
+
+    try:
+        with document_storage.spooled_copy(document.file_path) as source:
+            extension, data = render(document, source)
+    except Exception as exc:  # missing, undecodable, truncated or encrypted files
+        current_app.logger.warning("preview failed for document %s: %s", document_id, exc)
+        backend.put(failed_key, io.BytesIO(str(exc)[:255].encode("utf-8", "replace")))
+        return None
+
+    key = preview_key(document, extension)
+    backend.put(key, io.BytesIO(data))
+    return key
+
+
+def send_preview(document):
+    """Response serving the stored preview, or None if it is not ready."""
+    backend = storage()
+    found = find_preview(document, backend)
+    if found is None:
+        return None
+    key, mimetype = found
+    try:
+        response = send_from_storage(backend, key, mimetype=mimetype)
+    except FileNotFoundError:
+        return None
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    response.vary.add("Authorization")
+    response.headers["X-Content-Type-Options"] = "nosniff"
+    if mimetype.startswith("text/html"):
+        response.headers["Content-Security-Policy"] = HTML_POLICY
+    # Tell the global no-store hook to leave this response alone.
+    g.conditional_response = True
+    return response
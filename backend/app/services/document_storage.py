@@ -0,0 +1,170 @@
+"""Where uploaded documents live.
+
+``Document.file_path`` stores a *storage key*: a POSIX path inside the
+``documents`` storage namespace (``services/storage.py``), i.e. relative to
+``DOCUMENT_STORAGE_ROOT`` on the local backend or under ``documents/`` in the
+bucket. Resolving a key is pure string work, so views never stat the
+filesystem or rewrite rows to find a file; moving the upload directory only
+needs the config changed.
+
+Rows written before keys existed hold absolute paths. They are still served
+as-is until ``flask documents reconcile-paths`` rewrites them in bulk.
+"""
+import os
+import posixpath
+import shutil
+import tempfile
+import uuid
+
+from sqlalchemy import select, update
+
+from ..extensions import db
+from .file_delivery import send_from_storage, send_stored_file
+from .storage import fanout_key, get_storage, local_root
+
+
+def storage():
+    return get_storage("documents")
+
+
+def storage_root() -> str:
+    """Local directory for the ``documents`` namespace (also used for upload scratch space)."""
+    return local_root("documents")
+
+
+def is_legacy_path(value: str | None) -> bool:
+    """True for absolute paths stored before storage keys (POSIX or Windows style)."""
+    if not value:
+        return False
+    return os.path.isabs(value) or value.startswith(("/", "\\")) or (len(value) > 2 and value[1] == ":")
+
+
+def path_for_key(key: str | None) -> str | None:
+    """Local-backend path for ``key``; None for empty keys or keys escaping the root."""
+    if not key:
+        return None
+    if is_legacy_path(key):
+        return key
+    normalized = posixpath.normpath(key)
+    if normalized.startswith("../") or normalized in ("..", "."):
+        return None
+    return os.path.join(storage_root(), *normalized.split("/"))
+
+
+def new_key(extension: str) -> str:
+    name = uuid.uuid4().hex
+    return fanout_key(f"{name}.{extension}" if extension else name)
+
+
+def save_upload(file_storage, extension: str, limit: int | None = None) -> tuple[str, int, str]:
+    """Stream an uploaded file into storage under a fresh key, hashing it on the way.
+
+    Returns ``(key, size, sha256)``. With ``limit``, the write is abandoned
+    (``QuotaExceeded``) as soon as the stream passes that many bytes.
+    """
+    from .document_blobs import HashingReader
+    from .storage_quota import QuotaLimitedReader
+
+    key = new_key(extension)
+    reader = HashingReader(QuotaLimitedReader(file_storage.stream, limit))
+    size = storage().put(key, reader)
+    return key, size, reader.hexdigest()
+
+
+def send_document(key: str | None, mimetype: str | None = None, as_attachment: bool = False,
+                  download_name: str | None = None):
+    """Response for a stored document; raises FileNotFoundError if it is gone."""
+    if is_legacy_path(key):
+        return send_stored_file(key, mimetype=mimetype, as_attachment=as_attachment, download_name=download_name)
+    return send_from_storage(storage(), key, mimetype=mimetype, as_attachment=as_attachment,
+                             download_name=download_name)
+
+
+def open_document(key: str | None, backend=None):
+    """Readable binary file object for a stored document.
+
+    Pass ``backend`` when opening outside the app context (e.g. in a streamed body).
+    """
+    if is_legacy_path(key):
+        return open(key, "rb")
+    return (backend or storage()).open(key)
+
+
+def spooled_copy(key: str | None, max_memory: int = 8 * 1024 * 1024):
+    """Seekable temporary copy of a stored document (for readers needing random access)."""
+    spool = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    with open_document(key) as source:
+        shutil.copyfileobj(source, spool, 64 * 1024)
+    spool.seek(0)
+    return spool
+
+
+def delete_key(key: str | None) -> bool:
+    if is_legacy_path(key):
+        try:
+            os.remove(key)
+        except FileNotFoundError:
+            return False
+        return True
+    try:
+        return storage().delete(key)
+    except FileNotFoundError:
+        return False
+
+
+def key_for_legacy_path(path: str, root: str) -> str | None:
+    """Storage key for a legacy absolute path, or None if the file cannot be found.
+
+    Paths under the current root map directly. Paths from another machine or an
+    older instance folder fall back to a file with the same name in the root,
+    which is where uploads have always been written.
+    """
+    real_root = os.path.realpath(root)
+    real = os.path.realpath(path)
+    if os.path.commonpath([real_root, real]) == real_root and os.path.isfile(real):
+        return os.path.relpath(real, real_root).replace(os.sep, "/")
+
+    basename = path.replace("\\", "/").rsplit("/", 1)[-1]
+    if basename and os.path.isfile(os.path.join(real_root, basename)):
+        return basename
+    return None
+
+
+def reconcile_legacy_paths(batch_size: int = 500, dry_run: bool = False) -> dict:
+    """Rewrite absolute ``Document.file_path`` values as storage keys.
+
+    Only meaningful for the local backend: legacy files are matched against
+    the local root. Returns counts plus the ids whose files could not be found; those rows are
+    left untouched so nothing is lost.
+    """
+    from ..models import Document
+
+    root = storage_root()
+    result = {"converted": 0, "missing": []}
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(Document.id, Document.file_path)
+            .where(Document.id > last_id)
+            .order_by(Document.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        changes = []
+        for doc_id, file_path in rows:
+            if not is_legacy_path(file_path):
+                continue
+            key = key_for_legacy_path(file_path, root)
+            if key is None:
+                result["missing"].append(doc_id)
+                continue
+            changes.append({"id": doc_id, "file_path": key})
+
+        result["converted"] += len(changes)
+        if changes and not dry_run:
+            db.session.execute(update(Document), changes)
+            db.session.commit()
+    return result
@@ -0,0 +1,293 @@
+"""Text extracted from uploaded documents, and its full-text index.
+
+After an upload commits, ``tasks/document_text.py`` extracts the text of
+PDF, DOCX and TXT files into ``DocumentText`` (eagerly in local development,
+on a worker in production). Documents sharing a blob reuse the text already
+extracted for that content. Other types are recorded as ``unsupported``.
+
+The index follows ``news_search``: an FTS5 table ``document_fts(name,
+content)`` on SQLite, a ``document_search`` tsvector table with a GIN index
+on PostgreSQL, both fed pre-tokenized text (CJK bigrams) so Chinese matches
+without a segmenter. It is kept in sync from the flush that writes
+``DocumentText`` or renames a ``Document``.
+"""
+import re
+import zipfile
+from datetime import datetime
+from xml.etree import ElementTree
+
+from flask import current_app
+from sqlalchemy import DDL, Float, Integer, event, false, literal, select, text
+
+from ..extensions import db
+from . import document_storage
+from .news_search import dialect_name, index_text, parse_query, to_fts5_query, to_tsquery
+
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_UNSUPPORTED = "unsupported"
+
+# Column weights for bm25: document name, extracted text.
+FTS_WEIGHTS = (4.0, 1.0)
+# Extracted text is capped; certificates and transcripts fit easily.
+MAX_TEXT_CHARS = 200_000
+WHITESPACE = re.compile(r"\s+")
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+SQLITE_CREATE_INDEX = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS document_fts "
+    "USING fts5(name, content, tokenize='unicode61 remove_diacritics 2')"
+)
+POSTGRES_CREATE_INDEX = (
+    "CREATE TABLE IF NOT EXISTS document_search ("
+    "document_id INTEGER PRIMARY KEY REFERENCES document(id) ON DELETE CASCADE, "
+    "document tsvector NOT NULL)"
+)
+POSTGRES_CREATE_GIN = (
+    "CREATE INDEX IF NOT EXISTS ix_document_search_document ON document_search USING GIN (document)"
+)
+
+
+def extract_pdf(source) -> str:
+    from pypdf import PdfReader
+
+    parts: list[str] = []
+    length = 0
+    for page in PdfReader(source).pages:
+        page_text = page.extract_text() or ""
+        parts.append(page_text)
+        length += len(page_text)
+        if length >= MAX_TEXT_CHARS:
+            break
+    return "\n".join(parts)
+
+
+def extract_docx(source) -> str:
+    """Paragraph text from ``word/document.xml`` (python-docx is not needed for this)."""
+    parts: list[str] = []
+    length = 0
+    with zipfile.ZipFile(source) as archive, archive.open("word/document.xml") as xml:
+        for _event, element in ElementTree.iterparse(xml, events=("end",)):
+            if element.tag == WORD_NAMESPACE + "t" and element.text:
+                parts.append(element.text)
+                length += len(element.text)
+            elif element.tag == WORD_NAMESPACE + "p":
+                parts.append("\n")
+                element.clear()
+            elif element.tag in (WORD_NAMESPACE + "tab", WORD_NAMESPACE + "br"):
+                parts.append(" ")
+            if length >= MAX_TEXT_CHARS:
+                break
+    return "".join(parts)
+
+
+def extract_txt(source) -> str:
+    raw = source.read(MAX_TEXT_CHARS * 4)
+    for encoding in ("utf-8-sig", "gb18030"):
+        try:
+            return raw.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return raw.decode("utf-8", errors="replace")
+
+
+EXTRACTORS = {"pdf": extract_pdf, "docx": extract_docx, "txt": extract_txt}
+
+
+def normalize(value: str) -> str:
+    return WHITESPACE.sub(" ", value).strip()[:MAX_TEXT_CHARS]
+
+
+def _shared_text(document):
+    """Text already extracted for another document with the same blob."""
+    from ..models import Document, DocumentText
+
+    if document.blob_id is None:
+        return None
+    return (
+        DocumentText.query.join(Document, Document.id == DocumentText.document_id)
+        .filter(
+            Document.blob_id == document.blob_id,
+            Document.id != document.id,
+            DocumentText.status == STATUS_DONE,
+        )
+        .first()
+    )
+
+
+def extract_document(document_id: int) -> str | None:
+    """Extract and index one document's text. Returns the resulting status."""
+    from ..models import Document, DocumentText
+
+    document = db.session.get(Document, document_id)
+    if document is None:
+        return None
+
+    record = db.session.get(DocumentText, document_id) or DocumentText(document_id=document_id)
+    extractor = EXTRACTORS.get((document.file_type or "").lower())
+    content, error = "", None
+    if extractor is None:
+        status = STATUS_UNSUPPORTED
+    else:
+        shared = _shared_text(document)
+        if shared is not None:
+            status, content = STATUS_DONE, shared.content
+        else:
+            try:
+                with document_storage.spooled_copy(document.file_path) as source:
+                    content = normalize(extractor(source))
+                status = STATUS_DONE
+            except FileNotFoundError:
+                status, error = STATUS_FAILED, "file missing"
+            except Exception as exc:  # malformed or encrypted files
+                current_app.logger.warning("text extraction failed for document %s: %s", document_id, exc)
+                status, error = STATUS_FAILED, str(exc)[:255]
+
+    record.status = status
+    record.content = content
+    record.error = error
+    record.extracted_at = datetime.utcnow()
+    db.session.add(record)
+    db.session.commit()
+    return status
+
+
+def create_index(connection) -> None:
+    name = dialect_name(connection)
+    if name == "sqlite":
+        connection.execute(text(SQLITE_CREATE_INDEX))
+    elif name == "postgresql":
+        connection.execute(text(POSTGRES_CREATE_INDEX))
+        connection.execute(text(POSTGRES_CREATE_GIN))
+
+
+def remove_entry(connection, document_id: int) -> None:
+    name = dialect_name(connection)
+    if name == "sqlite":
+        connection.execute(text("DELETE FROM document_fts WHERE rowid = :id"), {"id": document_id})
+    elif name == "postgresql":
+        connection.execute(text("DELETE FROM document_search WHERE document_id = :id"), {"id": document_id})
+
+
+def upsert_entry(connection, document_id: int, name: str | None, content: str | None) -> None:
+    dialect = dialect_name(connection)
+    if dialect not in {"sqlite", "postgresql"}:
+        return
+
+    remove_entry(connection, document_id)
+    params = {"id": document_id, "name": index_text(name), "content": index_text(content)}
+    if dialect == "sqlite":
+        connection.execute(
+            text("INSERT INTO document_fts(rowid, name, content) VALUES (:id, :name, :content)"),
+            params,
+        )
+    else:
+        connection.execute(
+            text(
+                "INSERT INTO document_search(document_id, document) VALUES (:id, "
+                "setweight(to_tsvector('simple', :name), 'A') || "
+                "setweight(to_tsvector('simple', :content), 'B'))"
+            ),
+            params,
+        )
+
+
+def matches(keyword: str):
+    """Subquery ``(document_id, rank)`` of the documents matching ``keyword``; lower rank is better.
+
+    Callers join it so filters, counting, ordering and LIMIT run in SQL.
+    Returns None when there is no full-text index.
+    """
+    terms = parse_query(keyword)
+    name = dialect_name()
+    if name not in {"sqlite", "postgresql"}:
+        return None
+    if not terms:
+        empty = select(literal(None, Integer).label("document_id"), literal(0.0, Float).label("rank")).where(false())
+        return empty.subquery("document_matches")
+
+    if name == "sqlite":
+        weights = ", ".join(str(w) for w in FTS_WEIGHTS)
+        # bm25() only works in the FTS query itself; LIMIT -1 keeps SQLite from flattening it into the join.
+        stmt = text(
+            f"SELECT rowid AS document_id, bm25(document_fts, {weights}) AS rank "
+            "FROM document_fts WHERE document_fts MATCH :document_q LIMIT -1"
+        ).bindparams(document_q=to_fts5_query(terms))
+    else:
+        stmt = text(
+            "SELECT document_id, -ts_rank(document, to_tsquery('simple', :document_q)) AS rank "
+            "FROM document_search WHERE document @@ to_tsquery('simple', :document_q)"
+        ).bindparams(document_q=to_tsquery(terms))
+    return stmt.columns(document_id=Integer, rank=Float).subquery("document_matches")
+
+
+def snippet(content: str | None, keyword: str, width: int = 60) -> str:
+    """A window of ``content`` around the first query word found in it."""
+    content = content or ""
+    lowered = content.lower()
+    for word in sorted(keyword.lower().split(), key=len, reverse=True):
+        position = lowered.find(word)
+        if position >= 0:
+            start = max(position - width, 0)
+            end = min(position + len(word) + width, len(content))
+            return ("…" if start else "") + content[start:end] + ("…" if end < len(content) else "")
+    return content[: width * 2] + ("…" if len(content) > width * 2 else "")
+
+
+def rebuild_index(batch_size: int = 500) -> int:
+    """Rebuild the index from stored ``DocumentText`` rows. Returns rows indexed."""
+    from ..models import Document, DocumentText
+
+    connection = db.session.connection()
+    create_index(connection)
+    if dialect_name(connection) == "sqlite":
+        connection.execute(text("DELETE FROM document_fts"))
+    elif dialect_name(connection) == "postgresql":
+        connection.execute(text("DELETE FROM document_search"))
+
+    count = 0
+    rows = db.session.execute(
+        select(DocumentText.document_id, Document.name, DocumentText.content)
+        .join(Document, Document.id == DocumentText.document_id)
+        .order_by(DocumentText.document_id)
+        .execution_options(yield_per=batch_size)
+    )
+    for document_id, name, content in rows:
+        upsert_entry(connection, document_id, name, content)
+        count += 1
+    db.session.commit()
+    return count
+
+
+def register_index_listeners(document_model, text_model) -> None:
+    """Keep the index in sync from inside the flush that writes either table."""
+
+    def text_upsert(mapper, connection, target):
+        name = connection.execute(
+            select(document_model.name).where(document_model.id == target.document_id)
+        ).scalar()
+        upsert_entry(connection, target.document_id, name, target.content)
+
+    def text_delete(mapper, connection, target):
+        remove_entry(connection, target.document_id)
+
+    def document_renamed(mapper, connection, target):
+        if not db.inspect(target).attrs.name.history.has_changes():
+            return
+        content = connection.execute(
+            select(text_model.content).where(text_model.document_id == target.id)
+        ).first()
+        if content is not None:
+            upsert_entry(connection, target.id, target.name, content[0])
+
+    event.listen(text_model, "after_insert", text_upsert)
+    event.listen(text_model, "after_update", text_upsert)
+    event.listen(text_model, "after_delete", text_delete)
+    event.listen(document_model, "after_update", document_renamed)
+
+    table = text_model.__table__
+    event.listen(table, "after_create", DDL(SQLITE_CREATE_INDEX).execute_if(dialect="sqlite"))
+    event.listen(table, "after_create", DDL(POSTGRES_CREATE_INDEX).execute_if(dialect="postgresql"))
+    event.listen(table, "after_create", DDL(POSTGRES_CREATE_GIN).execute_if(dialect="postgresql"))
+    event.listen(table, "before_drop", DDL("DROP TABLE IF EXISTS document_fts").execute_if(dialect="sqlite"))
+    event.listen(table, "before_drop", DDL("DROP TABLE IF EXISTS document_search").execute_if(dialect="postgresql"))
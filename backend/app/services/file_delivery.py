@@ -0,0 +1,165 @@
+"""Send stored files to the client, optionally offloading the transfer.
+
+``FILE_DELIVERY_MODE`` selects how bytes leave the server once a view has
+done its authorization checks:
+
+* ``inline`` (default): Flask streams the file itself. Range / If-Range
+  requests are answered by Werkzeug, so resumable downloads work.
+* ``x-accel``: nginx ``X-Accel-Redirect``. The header carries
+  ``X_ACCEL_REDIRECT_PREFIX`` + the path relative to the instance folder,
+  which must map to an ``internal`` nginx location. A storage root set
+  outside the instance folder needs its own location in
+  ``X_ACCEL_NAMESPACE_PREFIXES``; ``validate_config`` refuses to start
+  without one rather than silently streaming through the worker.
+* ``x-sendfile``: Apache mod_xsendfile / lighttpd ``X-Sendfile`` with the
+  absolute path.
+
+In both offload modes the front server reads the file and handles Range
+itself; the worker returns immediately with an empty body.
+
+``send_from_storage`` serves a storage key: local keys take the path above,
+remote ones (S3) are either redirected to a presigned URL
+(``STORAGE_PRESIGNED_REDIRECTS``) or proxied chunk by chunk. The proxy
+answers conditional and Range / If-Range requests like the inline mode and
+fetches only the requested bytes from the backend.
+"""
+import mimetypes
+import os
+import posixpath
+import unicodedata
+import zlib
+from urllib.parse import quote
+
+from flask import current_app, redirect, request, send_file
+from werkzeug.utils import send_file as werkzeug_send_file
+
+from .storage import NAMESPACE_ROOTS, local_root
+
+
+def _is_within(root: str, path: str) -> bool:
+    return os.path.commonpath([root, path]) == root
+
+
+def _internal_locations() -> list[tuple[str, str]]:
+    """``(filesystem root, internal URI prefix)`` pairs, most specific first."""
+    config = current_app.config
+    locations = [
+        (os.path.realpath(local_root(namespace)), prefix)
+        for namespace, prefix in (config.get("X_ACCEL_NAMESPACE_PREFIXES") or {}).items()
+        if prefix
+    ]
+    locations.append((os.path.realpath(current_app.instance_path), config.get("X_ACCEL_REDIRECT_PREFIX", "/_protected")))
+    return locations
+
+
+def _internal_uri(path: str) -> str | None:
+    """nginx internal URI for ``path``, or None if no internal location covers it."""
+    real = os.path.realpath(path)
+    for root, prefix in _internal_locations():
+        if _is_within(root, real):
+            relative = os.path.relpath(real, root).replace(os.sep, "/")
+            return f"{prefix.rstrip('/')}/{quote(relative)}"
+    return None
+
+
+def validate_config(app) -> None:
+    """Fail at startup when x-accel is on but a local storage root has no internal location."""
+    if app.config.get("FILE_DELIVERY_MODE") != "x-accel" or app.config.get("STORAGE_BACKEND", "local") == "s3":
+        return
+    with app.app_context():
+        locations = _internal_locations()
+        for namespace, (setting, _) in NAMESPACE_ROOTS.items():
+            root = os.path.realpath(local_root(namespace))
+            if not any(_is_within(location, root) for location, _ in locations):
+                raise RuntimeError(
+                    f"FILE_DELIVERY_MODE=x-accel: {setting} ({root}) is outside the instance folder; "
+                    f'set X_ACCEL_NAMESPACE_PREFIXES["{namespace}"] (X_ACCEL_{namespace.upper()}_PREFIX) '
+                    "to its nginx internal location"
+                )
+
+
+def send_stored_file(
+    path: str,
+    mimetype: str | None = None,
+    as_attachment: bool = False,
+    download_name: str | None = None,
+):
+    mode = current_app.config.get("FILE_DELIVERY_MODE", "inline")
+    internal_uri = _internal_uri(path) if mode == "x-accel" else None
+
+    if mode == "x-sendfile" or internal_uri:
+        # Let Werkzeug build the headers (type, RFC 5987 disposition) without
+        # opening the file. Validators and Range are left to the front server,
+        # which is the one producing the body.
+        response = werkzeug_send_file(
+            path,
+            request.environ,
+            mimetype=mimetype,
+            as_attachment=as_attachment,
+            download_name=download_name,
+            use_x_sendfile=True,
+            response_class=current_app.response_class,
+            conditional=False,
+        )
+        if internal_uri:
+            del response.headers["X-Sendfile"]
+            response.headers["X-Accel-Redirect"] = internal_uri
+        return response
+
+    return send_file(
+        path,
+        mimetype=mimetype,
+        as_attachment=as_attachment,
+        download_name=download_name,
+        conditional=True,
+    )
+
+
+def content_disposition(download_name: str, as_attachment: bool = False) -> str:
+    """``Content-Disposition`` value with an ASCII fallback and an RFC 5987 UTF-8 name."""
+    kind = "attachment" if as_attachment else "inline"
+    ascii_name = unicodedata.normalize("NFKD", download_name).encode("ascii", "ignore").decode("ascii")
+    ascii_name = ascii_name.replace("\\", "_").replace('"', "_").strip() or "download"
+    if ascii_name == download_name:
+        return f'{kind}; filename="{ascii_name}"'
+    return f"{kind}; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(download_name, safe='')}"
+
+
+def send_from_storage(
+    backend,
+    key: str,
+    mimetype: str | None = None,
+    as_attachment: bool = False,
+    download_name: str | None = None,
+):
+    """Serve ``key`` from a storage backend; raises FileNotFoundError if it is missing."""
+    path = backend.local_path(key)
+    if path is not None:
+        return send_stored_file(path, mimetype=mimetype, as_attachment=as_attachment, download_name=download_name)
+
+    download_name = download_name or posixpath.basename(key)
+    mimetype = mimetype or mimetypes.guess_type(download_name)[0] or "application/octet-stream"
+    config = current_app.config
+    if config.get("STORAGE_PRESIGNED_REDIRECTS"):
+        url = backend.presigned_url(
+            key,
+            expires_in=config.get("STORAGE_PRESIGNED_EXPIRES", 300),
+            download_name=download_name,
+            as_attachment=as_attachment,
+            mimetype=mimetype,
+        )
+        if url:
+            return redirect(url, code=302)
+
+    info = backend.stat(key)
+    response = current_app.response_class(backend.stream(key), mimetype=mimetype, direct_passthrough=True)
+    response.content_length = info.size
+    response.last_modified = info.modified
+    response.set_etag(f"{info.modified}-{info.size}-{zlib.adler32(key.encode('utf-8'))}")
+    response.headers["Content-Disposition"] = content_disposition(download_name, as_attachment)
+    response.make_conditional(request, accept_ranges=True, complete_length=info.size)
+    if response.status_code == 206:
+        # Werkzeug would skip through the full stream; ask the backend for the range instead.
+        content_range = response.content_range
+        response.response = backend.stream(key, start=content_range.start, stop=content_range.stop)
+    return response
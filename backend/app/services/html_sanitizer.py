@@ -0,0 +1,215 @@
+"""Single-pass sanitizer for news HTML.
+
+One run of the stdlib ``HTMLParser`` tokenizer produces everything the news
+blueprint needs: the sanitized markup, the plain-text rendering used for
+summaries and the first ``<img src>`` used as a fallback cover. Input can be
+fed in chunks, so large pasted documents are never re-scanned.
+
+Frontend still uses DOMPurify before rendering details; this is
+defense-in-depth.
+
+Character references are kept only when the source spelled out a complete,
+valid one (``&amp;``, ``&#33;``, ``&#x21;``); any other ``&`` is literal text
+and is escaped, so ``AT&T`` is not turned into ``AT&T;``.
+"""
+import re
+from dataclasses import dataclass
+from html import escape, unescape
+from html.entities import html5
+from html.parser import HTMLParser
+
+# Elements removed together with everything inside them.
+DROP_CONTENT_TAGS = {"script", "style", "iframe", "object", "noscript", "template"}
+# Elements removed on their own (void or never legitimate in an article).
+DROP_TAGS = {"embed", "base", "meta", "link", "frame", "frameset"}
+VOID_TAGS = {"area", "br", "col", "hr", "img", "input", "source", "track", "wbr"}
+URI_ATTRS = {"href", "src", "action", "formaction", "xlink:href"}
+UNSAFE_SCHEMES = ("javascript:", "vbscript:")
+# Block-level tags that separate words in the plain-text rendering.
+TEXT_BREAK_TAGS = {"br", "p", "div", "li", "tr", "td", "th", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote"}
+FEED_CHUNK_SIZE = 64 * 1024
+# An ampersand and, when present, the terminated reference that follows it.
+REFERENCE = re.compile(r"&(?:(#[0-9]{1,7}|#[xX][0-9a-fA-F]{1,6}|[a-zA-Z][a-zA-Z0-9]{0,31});)?")
+# A reference that may still be completed by the next chunk.
+PARTIAL_REFERENCE = re.compile(r"&#?[xX]?[a-zA-Z0-9]{0,32}")
+
+
+@dataclass(frozen=True)
+class SanitizedHTML:
+    html: str
+    text: str
+    cover_image: str | None
+
+
+def _is_unsafe_uri(value: str) -> bool:
+    # Browsers ignore whitespace/control characters inside the scheme.
+    compact = "".join(ch for ch in value if ch > " ").lower()
+    return compact.startswith(UNSAFE_SCHEMES)
+
+
+def _is_known_reference(ref: str) -> bool:
+    if not ref.startswith("#"):
+        return ref + ";" in html5
+    code = int(ref[2:], 16) if ref[1:2] in ("x", "X") else int(ref[1:])
+    return 0 < code <= 0x10FFFF and not 0xD800 <= code <= 0xDFFF
+
+
+def _escape_reference(match) -> str:
+    if match.group(1) and _is_known_reference(match.group(1)):
+        return match.group()
+    return "&amp;" + match.group()[1:]
+
+
+class _SanitizingParser(HTMLParser):
+    def __init__(self, text_limit: int | None) -> None:
+        super().__init__(convert_charrefs=False)
+        self.out: list[str] = []
+        self.text: list[str] = []
+        self.text_length = 0
+        self.text_limit = text_limit
+        self.cover_image: str | None = None
+        self.drop_stack: list[str] = []
+        # Elements emitted and not yet closed; a parent's end tag also ends a dropped child.
+        self.open_tags: list[str] = []
+        # Tail of the last chunk that could be the start of a reference.
+        self.pending = ""
+
+    def feed(self, data):
+        data = self.pending + data
+        start = data.rfind("&")
+        if start != -1 and PARTIAL_REFERENCE.fullmatch(data, start):
+            data, self.pending = data[:start], data[start:]
+        else:
+            self.pending = ""
+        # The tokenizer would report ``&T`` as the entity ``T``; escape bare ampersands first.
+        super().feed(REFERENCE.sub(_escape_reference, data))
+
+    # -- helpers -----------------------------------------------------------
+    def _add_text(self, value: str) -> None:
+        if self.text_limit is not None:
+            remaining = self.text_limit - self.text_length
+            if remaining <= 0:
+                return
+            value = value[:remaining]
+        self.text.append(value)
+        self.text_length += len(value)
+
+    def _render_tag(self, tag: str, attrs, self_closing: bool) -> str:
+        parts = [tag]
+        for name, value in attrs:
+            if name.startswith("on"):
+                continue
+            if value is None:
+                parts.append(name)
+                continue
+            if name in URI_ATTRS and _is_unsafe_uri(value):
+                value = "#"
+            elif tag == "img" and name == "src" and self.cover_image is None:
+                self.cover_image = value.strip() or None
+            parts.append(f'{name}="{escape(value, quote=True)}"')
+        return "<" + " ".join(parts) + (" />" if self_closing else ">")
+
+    # -- HTMLParser callbacks ----------------------------------------------
+    def handle_starttag(self, tag, attrs):
+        if self.drop_stack:
+            if tag == self.drop_stack[-1]:
+                self.drop_stack.append(tag)
+            return
+        if tag in DROP_CONTENT_TAGS:
+            self.drop_stack.append(tag)
+            return
+        if tag in DROP_TAGS:
+            return
+        if tag in TEXT_BREAK_TAGS:
+            self._add_text(" ")
+        self.out.append(self._render_tag(tag, attrs, self_closing=False))
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if self.drop_stack or tag in DROP_CONTENT_TAGS or tag in DROP_TAGS:
+            return
+        if tag in TEXT_BREAK_TAGS:
+            self._add_text(" ")
+        self.out.append(self._render_tag(tag, attrs, self_closing=True))
+
+    def handle_endtag(self, tag):
+        if self.drop_stack:
+            if tag == self.drop_stack[-1]:
+                self.drop_stack.pop()
+                return
+            if tag not in self.open_tags:
+                return
+            # An unclosed dropped element ends with its parent, as browsers would close it.
+            self.drop_stack.clear()
+        if tag in DROP_CONTENT_TAGS or tag in DROP_TAGS or tag in VOID_TAGS:
+            return
+        if tag in self.open_tags:
+            del self.open_tags[len(self.open_tags) - 1 - self.open_tags[::-1].index(tag):]
+        if tag in TEXT_BREAK_TAGS:
+            self._add_text(" ")
+        self.out.append(f"</{tag}>")
+
+    def handle_data(self, data):
+        if self.drop_stack:
+            return
+        # Character references arrive separately (convert_charrefs=False), so this is literal text.
+        self.out.append(escape(data, quote=False))
+        self._add_text(data)
+
+    def handle_entityref(self, name):
+        if self.drop_stack:
+            return
+        ref = f"&{name};"
+        self.out.append(ref)
+        self._add_text(unescape(ref))
+
+    def handle_charref(self, name):
+        if self.drop_stack:
+            return
+        ref = f"&#{name};"
+        self.out.append(ref)
+        self._add_text(unescape(ref))
+
+    # Comments, doctypes and processing instructions are dropped.
+    def handle_comment(self, data):
+        pass
+
+    def handle_decl(self, decl):
+        pass
+
+    def handle_pi(self, data):
+        pass
+
+    def unknown_decl(self, data):
+        pass
+
+    def close(self):
+        if self.pending:
+            super().feed(REFERENCE.sub(_escape_reference, self.pending))
+            self.pending = ""
+        # Input still unparsed at the end is an unterminated tag, comment or
+        # declaration; drop it instead of letting the tokenizer emit it as text.
+        if self.rawdata.startswith("<"):
+            self.rawdata = ""
+        super().close()
+
+
+def sanitize(content: str | None, text_limit: int | None = None) -> SanitizedHTML:
+    """Sanitize ``content`` and extract its plain text and cover in one pass.
+
+    ``text_limit`` caps the raw plain text collected (before whitespace is
+    collapsed), which is all a summary needs.
+    """
+    parser = _SanitizingParser(text_limit)
+    content = content or ""
+    for start in range(0, len(content), FEED_CHUNK_SIZE):
+        parser.feed(content[start:start + FEED_CHUNK_SIZE])
+    parser.close()
+
+    text = " ".join("".join(parser.text).split())
+    return SanitizedHTML(
+        html="".join(parser.out).strip(),
+        text=text,
+        cover_image=parser.cover_image,
+    )
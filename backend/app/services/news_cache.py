@@ -0,0 +1,108 @@
+"""Object cache for news list/detail payloads.
+
+Backed by Flask-Caching, so the store is chosen with ``CACHE_TYPE``:
+``SimpleCache`` (in-process, default), ``FileSystemCache`` or ``RedisCache``.
+
+Detail payloads are keyed by id and deleted on write. A reader that missed
+just before a write can still store the old payload after the delete, so a
+detail entry only counts as a hit when its ``updated_at`` matches the row's.
+List payloads depend on every row, so they live under a generation number
+that each write bumps; stale generations simply expire (a racing reader
+stores under the retired generation).
+"""
+import hashlib
+import threading
+import uuid
+from datetime import datetime
+
+from ..extensions import cache
+
+LIST_GENERATION_KEY = "news:list:generation"
+
+
+class CacheStats:
+    """Per-process hit/miss counters, reported by ``GET /api/news/cache/stats``."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts: dict[str, int] = {}
+
+    def incr(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+stats = CacheStats()
+
+
+def _list_generation() -> str:
+    generation = cache.get(LIST_GENERATION_KEY)
+    if generation is None:
+        generation = uuid.uuid4().hex
+        cache.set(LIST_GENERATION_KEY, generation, timeout=0)
+    return generation
+
+
+def list_key(query_string: str) -> str:
+    digest = hashlib.sha1(query_string.encode("utf-8")).hexdigest()
+    return f"news:list:{_list_generation()}:{digest}"
+
+
+def detail_key(news_id: int) -> str:
+    return f"news:detail:{news_id}"
+
+
+def _get_or_build(kind: str, key: str, build, is_fresh=None):
+    payload = cache.get(key)
+    if payload is not None and (is_fresh is None or is_fresh(payload)):
+        stats.incr(f"{kind}_hits")
+        return payload
+
+    stats.incr(f"{kind}_misses")
+    payload = build()
+    if payload is not None:
+        cache.set(key, payload)
+    return payload
+
+
+def get_list(query_string: str, build):
+    """Return the cached list payload for these query args, building it on a miss."""
+    return _get_or_build("list", list_key(query_string), build)
+
+
+def get_detail(news_id: int, build, updated_at: datetime):
+    """Return the detail payload for the row last updated at ``updated_at``, building it on a miss."""
+    stamp = updated_at.isoformat()
+    return _get_or_build("detail", detail_key(news_id), build, lambda payload: payload.get("updated_at") == stamp)
+
+
+def invalidate(*news_ids: int | None) -> None:
+    """Drop these articles' detail entries and retire every cached list page."""
+    keys = [detail_key(news_id) for news_id in news_ids if news_id is not None]
+    if keys:
+        cache.delete_many(*keys)
+    cache.set(LIST_GENERATION_KEY, uuid.uuid4().hex, timeout=0)
+    stats.incr("invalidations")
+
+
+def report() -> dict:
+    counts = stats.snapshot()
+    result = {"backend": type(cache.cache).__name__, "invalidations": counts.get("invalidations", 0)}
+    for kind in ("list", "detail"):
+        hits = counts.get(f"{kind}_hits", 0)
+        misses = counts.get(f"{kind}_misses", 0)
+        total = hits + misses
+        result[kind] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 4) if total else None,
+        }
+    return result
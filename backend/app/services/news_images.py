@@ -0,0 +1,248 @@
+"""Content-addressed storage for news images.
+
+Uploads are named by the SHA-256 of their bytes and stored in the ``news``
+storage namespace (``services/storage.py``) under fanned-out keys
+(``ab/cd/abcd....png``). Re-uploading the same bytes returns the existing
+object. Public URLs stay flat (``/api/news/images/<name>``); the key is
+derived from the name. Legacy uuid-named uploads stay at the top level.
+
+Resized derivatives live next to their original as ``<stem>-<variant>.<ext>``
+and are produced in the background (see ``tasks/news_images.py``). Their
+names are deterministic, so list payloads can advertise them without touching
+storage; until a variant exists the original is served in its place.
+"""
+import hashlib
+import io
+import os
+import re
+import tempfile
+import time
+
+from sqlalchemy import select
+
+from ..extensions import db
+from .storage import LocalStorage, fanout_key, get_storage, local_root
+
+IMAGE_URL_PREFIX = "/api/news/images/"
+CHUNK_SIZE = 64 * 1024
+TEMP_PREFIX = ".upload-"
+HASHED_NAME_PATTERN = re.compile(r"^(?P<digest>[0-9a-f]{64})(?:-[a-z_]+)?\.[a-z0-9]+$")
+DIGEST_PATTERN = re.compile(r"[0-9a-f]{64}")
+IMAGE_REF_PATTERN = re.compile(re.escape(IMAGE_URL_PREFIX) + r"([A-Za-z0-9_.-]+)")
+# Images uploaded while an article is still being written are not referenced
+# yet; leave anything younger than this alone.
+GC_GRACE_SECONDS = 24 * 3600
+
+# name -> (max width in px, Pillow format, file extension, quality)
+VARIANTS = {
+    "thumb": (480, "JPEG", "jpg", 80),
+    "thumb_webp": (480, "WEBP", "webp", 75),
+    "webp": (1600, "WEBP", "webp", 80),
+}
+VARIANT_NAME_PATTERN = re.compile(
+    r"^(?P<stem>[A-Za-z0-9_]+)-(?P<variant>" + "|".join(VARIANTS) + r")\.[a-z0-9]+$"
+)
+
+
+def storage():
+    return get_storage("news")
+
+
+def upload_root() -> str:
+    """Local directory for the ``news`` namespace; also scratch space for uploads in progress."""
+    return local_root("news")
+
+
+def image_url(filename: str) -> str:
+    return f"{IMAGE_URL_PREFIX}{filename}"
+
+
+def key_for(filename: str) -> str:
+    """Storage key of a stored image name (hashed or legacy)."""
+    return fanout_key(filename) if HASHED_NAME_PATTERN.match(filename) else filename
+
+
+def path_for(filename: str) -> str:
+    """Local-backend path of a stored image name."""
+    return os.path.join(upload_root(), *key_for(filename).split("/"))
+
+
+def variant_name(filename: str, variant: str) -> str:
+    stem = filename.rsplit(".", 1)[0]
+    return f"{stem}-{variant}.{VARIANTS[variant][2]}"
+
+
+def split_variant(filename: str) -> tuple[str, str] | None:
+    """``(stem, variant)`` if ``filename`` names a derivative, else None."""
+    match = VARIANT_NAME_PATTERN.match(filename)
+    if not match:
+        return None
+    return match.group("stem"), match.group("variant")
+
+
+def filename_from_url(url: str | None) -> str | None:
+    """Stored image name behind a ``/api/news/images/...`` URL, else None."""
+    if not url or not url.startswith(IMAGE_URL_PREFIX):
+        return None
+    match = IMAGE_REF_PATTERN.fullmatch(url)
+    return match.group(1) if match else None
+
+
+def variant_urls(url: str | None) -> dict[str, str] | None:
+    """Derivative URLs for a locally stored image, computed without any I/O."""
+    filename = filename_from_url(url)
+    if not filename or split_variant(filename):
+        return None
+    return {variant: image_url(variant_name(filename, variant)) for variant in VARIANTS}
+
+
+def _find(prefix: str, stem: str) -> str | None:
+    for stored in storage().list(prefix + stem + "."):
+        name = stored.key.rsplit("/", 1)[-1]
+        if not split_variant(name):
+            return name
+    return None
+
+
+def find_original(stem: str) -> str | None:
+    """Name of the stored original whose name starts with ``stem.``."""
+    if DIGEST_PATTERN.fullmatch(stem):
+        return _find(f"{stem[:2]}/{stem[2:4]}/", stem)
+    return _find("", stem)
+
+
+def resolve_serving_key(filename: str) -> str | None:
+    """Key to serve for ``filename``; missing variants fall back to the original."""
+    backend = storage()
+    key = key_for(filename)
+    if backend.exists(key):
+        return key
+    parts = split_variant(filename)
+    if parts:
+        original = find_original(parts[0])
+        if original:
+            return key_for(original)
+    return None
+
+
+def generate_variants(filename: str) -> dict[str, str]:
+    """Write every missing derivative of ``filename``; returns variant -> name.
+
+    Formats Pillow cannot decode (e.g. HEIC without a plugin) are skipped.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    backend = storage()
+    created: dict[str, str] = {}
+    pending = {v: variant_name(filename, v) for v in VARIANTS if not backend.exists(key_for(variant_name(filename, v)))}
+    if not pending:
+        return created
+
+    try:
+        with backend.open(key_for(filename)) as source, Image.open(source) as opened:
+            image = ImageOps.exif_transpose(opened)
+            image.load()
+    except (FileNotFoundError, UnidentifiedImageError, OSError):
+        return created
+
+    for variant, name in pending.items():
+        width, fmt, _ext, quality = VARIANTS[variant]
+        derived = image.copy()
+        derived.thumbnail((width, width * 4))
+        if fmt == "JPEG" and derived.mode not in ("RGB", "L"):
+            derived = derived.convert("RGB")
+        buffer = io.BytesIO()
+        derived.save(buffer, format=fmt, quality=quality, optimize=True)
+        buffer.seek(0)
+        backend.put(key_for(name), buffer)
+        created[variant] = name
+    return created
+
+
+def iter_originals():
+    """Yield names of stored originals (no derivatives)."""
+    for name, _stored in iter_stored_images():
+        if not split_variant(name):
+            yield name
+
+
+def store_image(stream, ext: str) -> tuple[str, bool]:
+    """Stream ``stream`` into storage while hashing it.
+
+    The bytes are spooled to a local temp file first, since the key depends
+    on the hash. Returns ``(filename, created)``; ``created`` is False when
+    identical bytes were already stored (possibly under another extension).
+    """
+    backend = storage()
+    root = upload_root()
+    os.makedirs(root, exist_ok=True)
+    hasher = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(prefix=TEMP_PREFIX, dir=root)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                out.write(chunk)
+
+        digest = hasher.hexdigest()
+        existing = find_original(digest)
+        if existing:
+            # Refresh mtime so the GC grace period restarts for the re-used file.
+            backend.touch(key_for(existing))
+            return existing, False
+
+        filename = f"{digest}.{ext}"
+        backend.put_file(key_for(filename), tmp_path)
+        tmp_path = None
+        return filename, True
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def iter_stored_images():
+    """Yield ``(filename, StoredObject)`` for every stored image, hashed and legacy."""
+    for stored in storage().list():
+        yield stored.key.rsplit("/", 1)[-1], stored
+
+
+def referenced_images(batch_size: int = 200) -> set[str]:
+    """Names of images referenced by any article body or cover."""
+    from ..models import News
+
+    names: set[str] = set()
+    rows = db.session.execute(
+        select(News.content, News.cover_image).execution_options(yield_per=batch_size)
+    )
+    for content, cover_image in rows:
+        names.update(IMAGE_REF_PATTERN.findall(content or ""))
+        names.update(IMAGE_REF_PATTERN.findall(cover_image or ""))
+    return names
+
+
+def collect_garbage(grace_seconds: int = GC_GRACE_SECONDS, dry_run: bool = False) -> list[str]:
+    """Delete stored images no article references. Returns the removed names."""
+    referenced = referenced_images()
+    cutoff = time.time() - grace_seconds
+    removed = []
+    backend = storage()
+    originals: dict[str, str | None] = {}
+    for name, stored in iter_stored_images():
+        parts = split_variant(name)
+        if parts and parts[0] not in originals:
+            originals[parts[0]] = find_original(parts[0])
+        if name in referenced or (parts and originals[parts[0]] in referenced):
+            continue
+        if stored.modified > cutoff:
+            continue
+        if not dry_run:
+            backend.delete(stored.key)
+        removed.append(name)
+
+    # Partial uploads left behind by crashed workers.
+    if not dry_run:
+        LocalStorage(upload_root()).purge_temp(cutoff)
+    return removed
@@ -0,0 +1,279 @@
+"""News full-text search index.
+
+SQLite uses an FTS5 virtual table (``news_fts``), PostgreSQL uses a
+``news_search`` table holding a ``tsvector`` with a GIN index. Both are fed
+the same pre-tokenized text: latin words are kept as-is, CJK runs are split
+into overlapping bigrams so Chinese titles can be matched without a
+dictionary-based segmenter.
+
+The author's name is indexed with each article, so renaming a user
+re-indexes the articles they wrote and bumps their ``updated_at`` (the
+payloads carry the name, so ETags and cached entries must change too).
+"""
+import re
+from datetime import datetime
+
+from sqlalchemy import DDL, Float, Integer, event, false, literal, select, text, update
+
+from ..extensions import db
+from . import news_cache
+
+CJK_RANGES = (
+    ("\u3040", "\u30ff"),  # Hiragana / Katakana
+    ("\u3400", "\u4dbf"),  # CJK Extension A
+    ("\u4e00", "\u9fff"),  # CJK Unified Ideographs
+    ("\uac00", "\ud7af"),  # Hangul syllables
+    ("\uf900", "\ufaff"),  # CJK Compatibility Ideographs
+)
+WORD_PATTERN = re.compile(r"[^\W_]+")
+# Column weights for bm25: title, summary, author.
+FTS_WEIGHTS = (10.0, 3.0, 1.0)
+
+SQLITE_CREATE_INDEX = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS news_fts "
+    "USING fts5(title, summary, author, tokenize='unicode61 remove_diacritics 2')"
+)
+POSTGRES_CREATE_INDEX = (
+    "CREATE TABLE IF NOT EXISTS news_search ("
+    "news_id INTEGER PRIMARY KEY REFERENCES news(id) ON DELETE CASCADE, "
+    "document tsvector NOT NULL)"
+)
+POSTGRES_CREATE_GIN = (
+    "CREATE INDEX IF NOT EXISTS ix_news_search_document ON news_search USING GIN (document)"
+)
+
+
+def is_cjk(char: str) -> bool:
+    return any(lo <= char <= hi for lo, hi in CJK_RANGES)
+
+
+def _split_runs(word: str) -> list[tuple[bool, str]]:
+    """Split one word into alternating CJK / non-CJK runs."""
+    runs: list[tuple[bool, str]] = []
+    for char in word:
+        flag = is_cjk(char)
+        if runs and runs[-1][0] == flag:
+            runs[-1] = (flag, runs[-1][1] + char)
+        else:
+            runs.append((flag, char))
+    return runs
+
+
+def cjk_ngrams(run: str) -> list[str]:
+    """Overlapping bigrams plus the trailing character.
+
+    The trailing unigram makes every character the first character of some
+    token, so a one-character query can be answered with a prefix match.
+    """
+    if len(run) == 1:
+        return [run]
+    grams = [run[i:i + 2] for i in range(len(run) - 1)]
+    grams.append(run[-1])
+    return grams
+
+
+def tokenize(value: str | None) -> list[str]:
+    tokens: list[str] = []
+    for word in WORD_PATTERN.findall((value or "").lower()):
+        for cjk, run in _split_runs(word):
+            tokens.extend(cjk_ngrams(run) if cjk else [run])
+    return tokens
+
+
+def index_text(value: str | None) -> str:
+    return " ".join(tokenize(value))
+
+
+def parse_query(keyword: str | None) -> list[tuple[str, list[str]]]:
+    """Turn user input into search terms.
+
+    Returns ``(kind, tokens)`` pairs where kind is ``"prefix"`` (one token,
+    matched as a prefix) or ``"phrase"`` (adjacent CJK bigrams).
+    """
+    terms: list[tuple[str, list[str]]] = []
+    for word in WORD_PATTERN.findall((keyword or "").lower()):
+        for cjk, run in _split_runs(word):
+            if cjk and len(run) > 1:
+                terms.append(("phrase", [run[i:i + 2] for i in range(len(run) - 1)]))
+            else:
+                terms.append(("prefix", [run]))
+    return terms
+
+
+def to_fts5_query(terms: list[tuple[str, list[str]]]) -> str:
+    parts = []
+    for kind, tokens in terms:
+        if kind == "phrase":
+            parts.append('"' + " ".join(tokens) + '"')
+        else:
+            parts.append(f'"{tokens[0]}"*')
+    return " ".join(parts)
+
+
+def to_tsquery(terms: list[tuple[str, list[str]]]) -> str:
+    parts = []
+    for kind, tokens in terms:
+        if kind == "phrase":
+            parts.append("(" + " <-> ".join(tokens) + ")")
+        else:
+            parts.append(f"{tokens[0]}:*")
+    return " & ".join(parts)
+
+
+def dialect_name(bind=None) -> str:
+    bind = bind or db.engine
+    return bind.dialect.name
+
+
+def create_index(connection) -> None:
+    """Create the search index structures if they do not exist yet."""
+    name = dialect_name(connection)
+    if name == "sqlite":
+        connection.execute(text(SQLITE_CREATE_INDEX))
+    elif name == "postgresql":
+        connection.execute(text(POSTGRES_CREATE_INDEX))
+        connection.execute(text(POSTGRES_CREATE_GIN))
+
+
+def _author_name(connection, user_id: int | None) -> str:
+    from ..models import User
+
+    if user_id is None:
+        return ""
+    name = connection.execute(select(User.name).where(User.id == user_id)).scalar()
+    return name or ""
+
+
+def remove_entry(connection, news_id: int) -> None:
+    name = dialect_name(connection)
+    if name == "sqlite":
+        connection.execute(text("DELETE FROM news_fts WHERE rowid = :id"), {"id": news_id})
+    elif name == "postgresql":
+        connection.execute(text("DELETE FROM news_search WHERE news_id = :id"), {"id": news_id})
+
+
+def upsert_entry(connection, news, author_name: str | None = None) -> None:
+    name = dialect_name(connection)
+    if name not in {"sqlite", "postgresql"}:
+        return
+    if author_name is None:
+        author_name = _author_name(connection, news.created_by)
+
+    remove_entry(connection, news.id)
+    params = {
+        "id": news.id,
+        "title": index_text(news.title),
+        "summary": index_text(news.summary),
+        "author": index_text(author_name),
+    }
+    if name == "sqlite":
+        connection.execute(
+            text(
+                "INSERT INTO news_fts(rowid, title, summary, author) "
+                "VALUES (:id, :title, :summary, :author)"
+            ),
+            params,
+        )
+    else:
+        connection.execute(
+            text(
+                "INSERT INTO news_search(news_id, document) VALUES (:id, "
+                "setweight(to_tsvector('simple', :title), 'A') || "
+                "setweight(to_tsvector('simple', :summary), 'B') || "
+                "setweight(to_tsvector('simple', :author), 'C'))"
+            ),
+            params,
+        )
+
+
+def matches(keyword: str):
+    """Subquery ``(news_id, rank)`` of the articles matching ``keyword``; lower rank is better.
+
+    Callers join it to ``news`` so ordering and paging run in SQL. Returns
+    ``None`` when the database has no full-text index so the caller can fall
+    back to a plain ``LIKE`` filter.
+    """
+    terms = parse_query(keyword)
+    name = dialect_name()
+    if name not in {"sqlite", "postgresql"}:
+        return None
+    if not terms:
+        empty = select(literal(None, Integer).label("news_id"), literal(0.0, Float).label("rank")).where(false())
+        return empty.subquery("news_matches")
+
+    if name == "sqlite":
+        weights = ", ".join(str(w) for w in FTS_WEIGHTS)
+        # bm25() only works in the FTS query itself; LIMIT -1 keeps SQLite from flattening it into the join.
+        stmt = text(
+            f"SELECT rowid AS news_id, bm25(news_fts, {weights}) AS rank "
+            "FROM news_fts WHERE news_fts MATCH :news_q LIMIT -1"
+        ).bindparams(news_q=to_fts5_query(terms))
+    else:
+        stmt = text(
+            "SELECT news_id, -ts_rank(document, to_tsquery('simple', :news_q)) AS rank "
+            "FROM news_search WHERE document @@ to_tsquery('simple', :news_q)"
+        ).bindparams(news_q=to_tsquery(terms))
+    return stmt.columns(news_id=Integer, rank=Float).subquery("news_matches")
+
+
+def rebuild_index(batch_size: int = 500) -> int:
+    """Backfill the index from existing news rows. Returns rows indexed."""
+    from ..models import News, User
+
+    connection = db.session.connection()
+    create_index(connection)
+    if dialect_name(connection) == "sqlite":
+        connection.execute(text("DELETE FROM news_fts"))
+    elif dialect_name(connection) == "postgresql":
+        connection.execute(text("DELETE FROM news_search"))
+
+    authors = dict(db.session.execute(select(User.id, User.name)).all())
+    count = 0
+    rows = db.session.execute(
+        select(News).order_by(News.id).execution_options(yield_per=batch_size)
+    ).scalars()
+    for news in rows:
+        upsert_entry(connection, news, authors.get(news.created_by) or "")
+        count += 1
+    db.session.commit()
+    return count
+
+
+def register_index_listeners(news_model, user_model) -> None:
+    """Keep the index in sync from inside the flush that writes ``news`` or renames a ``user``."""
+
+    def after_upsert(mapper, connection, target):
+        upsert_entry(connection, target)
+
+    def after_delete(mapper, connection, target):
+        remove_entry(connection, target.id)
+
+    def author_renamed(mapper, connection, target):
+        if not db.inspect(target).attrs.name.history.has_changes():
+            return
+        rows = connection.execute(
+            select(news_model.id, news_model.title, news_model.summary).where(news_model.created_by == target.id)
+        ).all()
+        if not rows:
+            return
+        for row in rows:
+            upsert_entry(connection, row, target.name or "")
+        # Their payloads show the author name: move the ETags and drop cached lists and details.
+        connection.execute(
+            update(news_model.__table__)
+            .where(news_model.created_by == target.id)
+            .values(updated_at=datetime.utcnow())
+        )
+        news_cache.invalidate(*(row.id for row in rows))
+
+    event.listen(news_model, "after_insert", after_upsert)
+    event.listen(news_model, "after_update", after_upsert)
+    event.listen(news_model, "after_delete", after_delete)
+    event.listen(user_model, "after_update", author_renamed)
+
+    table = news_model.__table__
+    event.listen(table, "after_create", DDL(SQLITE_CREATE_INDEX).execute_if(dialect="sqlite"))
+    event.listen(table, "after_create", DDL(POSTGRES_CREATE_INDEX).execute_if(dialect="postgresql"))
+    event.listen(table, "after_create", DDL(POSTGRES_CREATE_GIN).execute_if(dialect="postgresql"))
+    event.listen(table, "before_drop", DDL("DROP TABLE IF EXISTS news_fts").execute_if(dialect="sqlite"))
+    event.listen(table, "before_drop", DDL("DROP TABLE IF EXISTS news_search").execute_if(dialect="postgresql"))
@@ -0,0 +1,79 @@
+"""Keyset (cursor) pagination helpers.
+
+Cursors are opaque to clients: URL-safe base64 of a small JSON object holding
+the sort key of the last row on the previous page.
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(payload: dict) -> str:
+    raw = json.dumps(payload, separators=(",", ":"), default=_json_default).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str | None) -> dict | None:
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor("invalid cursor") from exc
+    if not isinstance(payload, dict):
+        raise InvalidCursor("invalid cursor")
+    return payload
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"unsupported cursor value: {value!r}")
+
+
+def parse_limit(value, default: int = DEFAULT_PAGE_SIZE, maximum: int = MAX_PAGE_SIZE) -> int:
+    try:
+        limit = int(value) if value not in (None, "") else default
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def created_at_cursor(row) -> str:
+    return encode_cursor({"created_at": row.created_at, "id": row.id})
+
+
+def apply_created_at_keyset(query, model, cursor: dict | None):
+    """Order newest first by ``(created_at, id)`` and seek past ``cursor``."""
+    if cursor:
+        try:
+            created_at = datetime.fromisoformat(cursor["created_at"])
+            last_id = int(cursor["id"])
+        except (KeyError, TypeError, ValueError) as exc:
+            raise InvalidCursor("invalid cursor") from exc
+        query = query.filter(
+            or_(
+                model.created_at < created_at,
+                and_(model.created_at == created_at, model.id < last_id),
+            )
+        )
+    return query.order_by(model.created_at.desc(), model.id.desc())
+
+
+def fetch_page(query, limit: int, cursor_for) -> tuple[list, str | None]:
+    """Run ``query`` for one page; return rows and the cursor for the next one."""
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = cursor_for(rows[-1]) if has_more and rows else None
+    return rows, next_cursor
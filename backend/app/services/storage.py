@@ -1,3 +1,401 @@
-def save_file(file_bytes: bytes, filename: str) -> str:
-    """Stub file storage. Return a fake URL."""
-    return f"https://storage.local/{filename}"
+"""Blob storage for uploaded files.
+
+``get_storage(namespace)`` returns the backend for one kind of upload
+(``documents`` or ``news``), chosen with ``STORAGE_BACKEND``:
+
+* ``local`` (default): files under a directory per namespace
+  (``DOCUMENT_STORAGE_ROOT`` / ``NEWS_STORAGE_ROOT``, defaulting to
+  ``instance/uploads`` and ``instance/news_uploads``).
+* ``s3``: one bucket (``S3_BUCKET``) on AWS or any S3-compatible server such
+  as MinIO (``S3_ENDPOINT_URL``), with the namespace as key prefix.
+
+Keys are POSIX relative paths. ``fanout_key`` spreads new keys over two
+levels of directories (``ab/cd/abcd....pdf``) so no single directory (or
+listing prefix) grows unbounded. Every read and write is chunked or handed
+to the SDK's multipart transfer, so file size never dictates memory use.
+A missing or malformed key raises ``FileNotFoundError``.
+"""
+import os
+import posixpath
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+from flask import current_app
+
+CHUNK_SIZE = 64 * 1024
+TEMP_PREFIX = ".tmp-"
+# Temp-file prefixes left by interrupted writes (older releases used ".upload-").
+STALE_TEMP_PREFIXES = (TEMP_PREFIX, ".upload-")
+NAMESPACE_ROOTS = {
+    "documents": ("DOCUMENT_STORAGE_ROOT", "uploads"),
+    "news": ("NEWS_STORAGE_ROOT", "news_uploads"),
+    "previews": ("PREVIEW_STORAGE_ROOT", "previews"),
+}
+# Object headers S3Storage.touch re-applies when it copies an object onto itself.
+COPIED_HEADERS = ("ContentType", "ContentDisposition", "ContentEncoding", "ContentLanguage", "CacheControl")
+
+
+@dataclass(frozen=True)
+class StoredObject:
+    key: str
+    size: int
+    modified: float  # POSIX timestamp
+
+
+def normalize_key(key: str | None) -> str:
+    """Validated POSIX form of ``key``; raises FileNotFoundError for unusable keys."""
+    if not key or key.startswith(("/", "\\")):
+        raise FileNotFoundError(key)
+    normalized = posixpath.normpath(key.replace("\\", "/"))
+    if normalized in (".", "..") or normalized.startswith("../"):
+        raise FileNotFoundError(key)
+    return normalized
+
+
+def fanout_key(name: str) -> str:
+    """``abcdef.pdf`` -> ``ab/cd/abcdef.pdf``."""
+    return f"{name[:2]}/{name[2:4]}/{name}"
+
+
+class StorageBackend(ABC):
+    @abstractmethod
+    def put(self, key: str, stream) -> int:
+        """Store ``stream`` under ``key``; returns the number of bytes written."""
+
+    @abstractmethod
+    def put_file(self, key: str, path: str) -> None:
+        """Move a finished local file into storage under ``key``."""
+
+    @abstractmethod
+    def open(self, key: str):
+        """Readable binary file object; the caller closes it."""
+
+    def stream(self, key: str, chunk_size: int = CHUNK_SIZE, start: int = 0, stop: int | None = None):
+        """Yield the bytes of ``key`` from ``start`` up to ``stop`` (exclusive) in chunks."""
+        handle = self.open(key)
+        try:
+            if start:
+                handle.seek(start)
+            remaining = None if stop is None else stop - start
+            while remaining is None or remaining > 0:
+                chunk = handle.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+        finally:
+            handle.close()
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        """Remove ``key``; a missing key is not an error."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """Whether an object is stored under ``key``."""
+
+    @abstractmethod
+    def size(self, key: str) -> int:
+        """Size of the stored object in bytes."""
+
+    @abstractmethod
+    def stat(self, key: str) -> StoredObject:
+        """Size and modification time of ``key``."""
+
+    @abstractmethod
+    def touch(self, key: str) -> None:
+        """Refresh the modification time (restarts garbage-collection grace periods)."""
+
+    @abstractmethod
+    def list(self, prefix: str = ""):
+        """Yield ``StoredObject`` for every key starting with ``prefix``."""
+
+    def presigned_url(self, key: str, expires_in: int = 300, download_name: str | None = None,
+                      as_attachment: bool = False, mimetype: str | None = None) -> str | None:
+        """Time-limited direct URL, or None when the backend cannot issue one."""
+        return None
+
+    def local_path(self, key: str) -> str | None:
+        """Filesystem path for ``key`` when the backend is local, else None."""
+        return None
+
+    def purge_temp(self, cutoff: float) -> int:
+        """Remove temp files from interrupted writes older than ``cutoff``."""
+        return 0
+
+
+class LocalStorage(StorageBackend):
+    def __init__(self, root: str) -> None:
+        self.root = root
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, *normalize_key(key).split("/"))
+
+    def local_path(self, key: str) -> str | None:
+        return self.path(key)
+
+    def _write_temp(self, target: str) -> tuple[int, str]:
+        directory = os.path.dirname(target)
+        os.makedirs(directory, exist_ok=True)
+        return tempfile.mkstemp(prefix=TEMP_PREFIX, dir=directory)
+
+    def put(self, key: str, stream) -> int:
+        target = self.path(key)
+        fd, tmp_path = self._write_temp(target)
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp_path, target)
+            tmp_path = None
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return size
+
+    def put_file(self, key: str, path: str) -> None:
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(path, target)
+
+    def open(self, key: str):
+        return open(self.path(key), "rb")
+
+    def delete(self, key: str) -> bool:
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def exists(self, key: str) -> bool:
+        try:
+            return os.path.isfile(self.path(key))
+        except FileNotFoundError:
+            return False
+
+    def size(self, key: str) -> int:
+        return os.path.getsize(self.path(key))
+
+    def stat(self, key: str) -> StoredObject:
+        result = os.stat(self.path(key))
+        return StoredObject(key, result.st_size, result.st_mtime)
+
+    def touch(self, key: str) -> None:
+        os.utime(self.path(key))
+
+    def list(self, prefix: str = ""):
+        # Only walk the directory the prefix points into.
+        directory, _, name_prefix = prefix.rpartition("/")
+        base = os.path.join(self.root, *directory.split("/")) if directory else self.root
+        if not os.path.isdir(base):
+            return
+        for dirpath, dirnames, filenames in os.walk(base):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            relative_dir = os.path.relpath(dirpath, self.root).replace(os.sep, "/")
+            for name in filenames:
+                if name.startswith("."):
+                    continue
+                key = name if relative_dir == "." else f"{relative_dir}/{name}"
+                if not key.startswith(prefix):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(dirpath, name))
+                except FileNotFoundError:
+                    continue
+                yield StoredObject(key, stat.st_size, stat.st_mtime)
+            if name_prefix and dirpath == base:
+                # A partial name only matches files in ``base`` itself.
+                dirnames[:] = [d for d in dirnames if d.startswith(name_prefix)]
+
+    def purge_temp(self, cutoff: float) -> int:
+        removed = 0
+        if not os.path.isdir(self.root):
+            return removed
+        for dirpath, _dirnames, filenames in os.walk(self.root):
+            for name in filenames:
+                if not name.startswith(STALE_TEMP_PREFIXES):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    if os.path.getmtime(path) <= cutoff:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+        return removed
+
+
+class _CountingReader:
+    def __init__(self, stream) -> None:
+        self.stream = stream
+        self.count = 0
+
+    def read(self, size=-1):
+        chunk = self.stream.read(size)
+        self.count += len(chunk)
+        return chunk
+
+
+class S3Storage(StorageBackend):
+    """S3 / MinIO driver. ``boto3`` is imported lazily so local setups do not need it."""
+
+    def __init__(self, bucket: str, prefix: str = "", client=None, **client_options) -> None:
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self._client = client
+        self._client_options = client_options
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+            from botocore.config import Config
+
+            self._client = boto3.client(
+                "s3",
+                config=Config(signature_version="s3v4", s3={"addressing_style": "path"}),
+                **{k: v for k, v in self._client_options.items() if v},
+            )
+        return self._client
+
+    def _key(self, key: str) -> str:
+        return self.prefix + normalize_key(key)
+
+    def _missing(self, exc) -> bool:
+        error = getattr(exc, "response", {}).get("Error", {})
+        return error.get("Code") in {"404", "NoSuchKey", "NotFound"}
+
+    def put(self, key: str, stream) -> int:
+        reader = _CountingReader(stream)
+        # upload_fileobj switches to multipart for large bodies and reads in parts.
+        self.client.upload_fileobj(reader, self.bucket, self._key(key))
+        return reader.count
+
+    def put_file(self, key: str, path: str) -> None:
+        self.client.upload_file(path, self.bucket, self._key(key))
+        os.remove(path)
+
+    def _get(self, key: str, **options):
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(key), **options)["Body"]
+        except ClientError as exc:
+            if self._missing(exc):
+                raise FileNotFoundError(key) from exc
+            raise
+
+    def open(self, key: str):
+        return self._get(key)
+
+    def stream(self, key: str, chunk_size: int = CHUNK_SIZE, start: int = 0, stop: int | None = None):
+        if start or stop is not None:
+            # Only the requested bytes leave S3.
+            body = self._get(key, Range=f"bytes={start}-{'' if stop is None else stop - 1}")
+        else:
+            body = self._get(key)
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    def delete(self, key: str) -> bool:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+        return True
+
+    def _head(self, key: str) -> dict:
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as exc:
+            if self._missing(exc):
+                raise FileNotFoundError(key) from exc
+            raise
+
+    def exists(self, key: str) -> bool:
+        try:
+            self._head(key)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def size(self, key: str) -> int:
+        return int(self._head(key)["ContentLength"])
+
+    def stat(self, key: str) -> StoredObject:
+        head = self._head(key)
+        return StoredObject(key, int(head["ContentLength"]), head["LastModified"].timestamp())
+
+    def touch(self, key: str) -> None:
+        # S3 has no utime: copy the object onto itself. REPLACE is required for
+        # a self-copy and drops whatever is not passed again, so carry the headers over.
+        head = self._head(key)
+        headers = {name: head[name] for name in COPIED_HEADERS if head.get(name)}
+        full_key = self._key(key)
+        self.client.copy_object(
+            Bucket=self.bucket,
+            Key=full_key,
+            CopySource={"Bucket": self.bucket, "Key": full_key},
+            MetadataDirective="REPLACE",
+            Metadata=head.get("Metadata", {}),
+            **headers,
+        )
+
+    def list(self, prefix: str = ""):
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix + prefix):
+            for item in page.get("Contents", []):
+                yield StoredObject(
+                    item["Key"][len(self.prefix):],
+                    int(item["Size"]),
+                    item["LastModified"].timestamp(),
+                )
+
+    def presigned_url(self, key: str, expires_in: int = 300, download_name: str | None = None,
+                      as_attachment: bool = False, mimetype: str | None = None) -> str | None:
+        from .file_delivery import content_disposition
+
+        params = {"Bucket": self.bucket, "Key": self._key(key)}
+        if download_name:
+            params["ResponseContentDisposition"] = content_disposition(download_name, as_attachment)
+        if mimetype:
+            params["ResponseContentType"] = mimetype
+        return self.client.generate_presigned_url("get_object", Params=params, ExpiresIn=expires_in)
+
+
+def local_root(namespace: str) -> str:
+    setting, subdir = NAMESPACE_ROOTS[namespace]
+    return current_app.config.get(setting) or os.path.join(current_app.instance_path, subdir)
+
+
+def get_storage(namespace: str) -> StorageBackend:
+    config = current_app.config
+    if config.get("STORAGE_BACKEND", "local") != "s3":
+        # Cheap to build, and follows instance_path / root changes at runtime.
+        return LocalStorage(local_root(namespace))
+
+    backends = current_app.extensions.setdefault("storage", {})
+    if namespace not in backends:
+        # Namespaces share one client (and its connection pool).
+        shared_client = next((backend.client for backend in backends.values()), None)
+        backends[namespace] = S3Storage(
+            config["S3_BUCKET"],
+            prefix=namespace,
+            client=shared_client,
+            endpoint_url=config.get("S3_ENDPOINT_URL"),
+            aws_access_key_id=config.get("S3_ACCESS_KEY_ID"),
+            aws_secret_access_key=config.get("S3_SECRET_ACCESS_KEY"),
+            region_name=config.get("S3_REGION"),
+        )
+    return backends[namespace]
+
@@ -0,0 +1,188 @@
+"""Deferred deletion of stored files, and the orphan sweeper.
+
+Requests never delete committed files themselves. Whatever makes a stored
+object unreachable records it with ``schedule`` in the same transaction, so a
+failed commit queues nothing and the row keeps its file. After the commit a
+worker (``tasks/storage_cleanup.py``) runs ``process_pending``, which deletes
+the objects and drops their queue rows; failures are retried with backoff.
+
+``sweep`` reconciles storage with the database for what never reached the
+queue (a crash between writing a file and committing its row, files from
+before the queue existed). It walks each namespace in bounded batches and
+queues objects older than a grace period that no row references. News images
+are reconciled by ``news_images.collect_garbage``.
+"""
+import posixpath
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+
+from flask import current_app
+from sqlalchemy import func, or_, select
+
+from ..extensions import db
+from . import document_storage, news_images
+from .storage import LocalStorage, get_storage, local_root
+
+# Namespaces whose objects are owned by database rows (see ``referenced_keys``).
+SWEPT_NAMESPACES = ("documents", "previews")
+# Objects younger than this may belong to an upload still in flight.
+SWEEP_GRACE_SECONDS = 24 * 3600
+BATCH_SIZE = 200
+# Orphans queued per namespace per sweep, so one run stays bounded.
+SWEEP_LIMIT = 5000
+# Seconds before retry n (capped at the last value).
+RETRY_DELAYS = (60, 300, 1800, 3600)
+
+
+def schedule(namespace: str, key: str | None) -> None:
+    """Queue ``key`` for deletion when the current transaction commits."""
+    from ..models import StorageDeletion
+
+    if key:
+        db.session.add(StorageDeletion(namespace=namespace, key=key))
+
+
+def delete_object(namespace: str, key: str) -> bool:
+    if namespace == "documents":
+        return document_storage.delete_key(key)
+    return get_storage(namespace).delete(key)
+
+
+def preview_owner(stem: str) -> int | None:
+    """Document id of a ``document-<id>`` preview (rows without a blob); None for digests."""
+    prefix = "document-"
+    rest = stem[len(prefix):]
+    return int(rest) if stem.startswith(prefix) and rest.isdigit() else None
+
+
+def referenced_keys(namespace: str, keys: list[str]) -> set[str]:
+    """The subset of ``keys`` some row still points at."""
+    from ..models import Document, DocumentBlob
+
+    if not keys:
+        return set()
+    if namespace == "documents":
+        live = set(db.session.scalars(select(Document.file_path).where(Document.file_path.in_(keys))))
+        live.update(db.session.scalars(select(DocumentBlob.storage_key).where(DocumentBlob.storage_key.in_(keys))))
+        return live
+    if namespace == "previews":
+        stems = {key: posixpath.basename(key).rsplit(".", 1)[0] for key in keys}
+        digests = set(db.session.scalars(select(DocumentBlob.sha256).where(DocumentBlob.sha256.in_(stems.values()))))
+        ids = {preview_owner(stem) for stem in stems.values()} - {None}
+        owners = set()
+        if ids:
+            owners = set(
+                db.session.scalars(select(Document.id).where(Document.id.in_(ids), Document.blob_id.is_(None)))
+            )
+        return {key for key, stem in stems.items() if stem in digests or preview_owner(stem) in owners}
+    raise ValueError(f"unknown namespace: {namespace}")
+
+
+def has_legacy_paths() -> bool:
+    """Whether any document still holds an absolute path (see ``document_storage``)."""
+    from ..models import Document
+
+    legacy = or_(
+        func.substr(Document.file_path, 1, 1).in_(("/", "\\")),
+        func.substr(Document.file_path, 2, 1) == ":",
+    )
+    return db.session.query(Document.id).filter(legacy).first() is not None
+
+
+def process_pending(batch_size: int = BATCH_SIZE, now: datetime | None = None) -> dict:
+    """Delete queued objects that are due. Returns ``{deleted, kept, failed}`` counts.
+
+    Keys a row points at again (e.g. re-linked by ``flask documents dedupe``)
+    are dropped from the queue without touching the file.
+    """
+    from ..models import StorageDeletion
+
+    now = now or datetime.utcnow()
+    result = {"deleted": 0, "kept": 0, "failed": 0}
+    last_id = 0
+    while True:
+        rows = (
+            StorageDeletion.query.filter(StorageDeletion.id > last_id, StorageDeletion.not_before <= now)
+            .order_by(StorageDeletion.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        live: dict[str, set[str]] = {}
+        for namespace in {row.namespace for row in rows}:
+            if namespace in SWEPT_NAMESPACES:
+                live[namespace] = referenced_keys(namespace, [r.key for r in rows if r.namespace == namespace])
+
+        for row in rows:
+            if row.key in live.get(row.namespace, ()):
+                db.session.delete(row)
+                result["kept"] += 1
+                continue
+            try:
+                delete_object(row.namespace, row.key)
+            except Exception as exc:  # storage unavailable; retry later
+                current_app.logger.warning("could not delete %s/%s: %s", row.namespace, row.key, exc)
+                row.attempts += 1
+                row.last_error = str(exc)[:255]
+                row.not_before = now + timedelta(seconds=RETRY_DELAYS[min(row.attempts, len(RETRY_DELAYS)) - 1])
+                result["failed"] += 1
+                continue
+            db.session.delete(row)
+            result["deleted"] += 1
+        db.session.commit()
+    return result
+
+
+def sweep_orphans(
+    namespace: str,
+    grace_seconds: int = SWEEP_GRACE_SECONDS,
+    batch_size: int = BATCH_SIZE,
+    limit: int = SWEEP_LIMIT,
+    dry_run: bool = False,
+) -> list[str]:
+    """Queue unreferenced objects of ``namespace`` older than the grace period; returns their keys."""
+    from ..models import StorageDeletion
+
+    if namespace == "documents" and has_legacy_paths():
+        # Legacy rows may point at these files by absolute path; never guess.
+        current_app.logger.warning("skipping document sweep: run `flask documents reconcile-paths` first")
+        return []
+
+    cutoff = time.time() - grace_seconds
+    found: list[str] = []
+    listing = (stored for stored in get_storage(namespace).list() if stored.modified <= cutoff)
+    while len(found) < limit:
+        batch = [stored.key for stored in islice(listing, batch_size)]
+        if not batch:
+            break
+        live = referenced_keys(namespace, batch)
+        queued = set(
+            db.session.scalars(
+                select(StorageDeletion.key).where(StorageDeletion.namespace == namespace, StorageDeletion.key.in_(batch))
+            )
+        )
+        orphans = [key for key in batch if key not in live and key not in queued][: limit - len(found)]
+        if not dry_run:
+            for key in orphans:
+                schedule(namespace, key)
+            db.session.commit()
+        found.extend(orphans)
+
+    # Temp files of writes interrupted before their rename.
+    if not dry_run and current_app.config.get("STORAGE_BACKEND", "local") != "s3":
+        LocalStorage(local_root(namespace)).purge_temp(cutoff)
+    return found
+
+
+def sweep(grace_seconds: int = SWEEP_GRACE_SECONDS, limit: int = SWEEP_LIMIT, dry_run: bool = False) -> dict:
+    """Reconcile every upload namespace with the database; returns namespace -> orphan keys."""
+    result = {
+        namespace: sweep_orphans(namespace, grace_seconds=grace_seconds, limit=limit, dry_run=dry_run)
+        for namespace in SWEPT_NAMESPACES
+    }
+    result["news"] = news_images.collect_garbage(grace_seconds=grace_seconds, dry_run=dry_run)
+    return result
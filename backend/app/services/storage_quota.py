@@ -0,0 +1,135 @@
+"""Per-user storage quotas and the denormalized ``User.storage_used`` counter.
+
+A user's quota is ``User.storage_quota`` when set, otherwise the default for
+their role (``STORAGE_QUOTAS``); None means unlimited. Usage is the sum of
+``Document.file_size`` over the user's documents (what they uploaded, before
+deduplication), kept in ``User.storage_used``:
+
+* ``QuotaLimitedReader`` stops an upload as soon as it streams past the
+  remaining allowance, so an oversized file is never stored in full.
+* ``charge`` adds the size with a conditional UPDATE in the same transaction
+  as the new ``Document`` row; concurrent uploads cannot both squeeze under
+  the limit. ``uncharge`` runs in the delete transaction.
+* ``reconcile`` recomputes the counters from ``document`` in batches and
+  fixes any drift (run by ``flask users reconcile-usage`` or Celery).
+"""
+from flask import current_app
+from sqlalchemy import bindparam, case, func, select, update
+
+from ..extensions import db
+
+
+class QuotaExceeded(Exception):
+    def __init__(self, message: str = "存储空间不足，已超出配额") -> None:
+        super().__init__(message)
+        self.message = message
+
+
+def quota_for(user) -> int | None:
+    if user.storage_quota is not None:
+        return user.storage_quota
+    return current_app.config.get("STORAGE_QUOTAS", {}).get(user.role)
+
+
+def remaining(user) -> int | None:
+    quota = quota_for(user)
+    if quota is None:
+        return None
+    return max(quota - (user.storage_used or 0), 0)
+
+
+def check(user, size: int | None) -> None:
+    """Reject early when a declared size cannot fit (e.g. Content-Length)."""
+    allowance = remaining(user)
+    if allowance is not None and size is not None and size > allowance:
+        raise QuotaExceeded()
+
+
+class QuotaLimitedReader:
+    """Raises ``QuotaExceeded`` once more than ``limit`` bytes have been read."""
+
+    def __init__(self, stream, limit: int | None) -> None:
+        self.stream = stream
+        self.limit = limit
+        self.count = 0
+
+    def read(self, size=-1):
+        chunk = self.stream.read(size)
+        self.count += len(chunk)
+        if self.limit is not None and self.count > self.limit:
+            raise QuotaExceeded()
+        return chunk
+
+
+def charge(user, size: int) -> None:
+    """Add ``size`` to the user's usage, or raise if that would pass the quota."""
+    from ..models import User
+
+    quota = quota_for(user)
+    statement = update(User).where(User.id == user.id).values(storage_used=User.storage_used + size)
+    if quota is not None:
+        statement = statement.where(User.storage_used + size <= quota)
+    result = db.session.execute(statement.execution_options(synchronize_session=False))
+    if result.rowcount != 1:
+        raise QuotaExceeded()
+
+
+def uncharge(user_id: int, size: int) -> None:
+    from ..models import User
+
+    db.session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(storage_used=case((User.storage_used > size, User.storage_used - size), else_=0))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def usage_payload(user) -> dict:
+    quota = quota_for(user)
+    used = user.storage_used or 0
+    return {
+        "used": used,
+        "quota": quota,
+        "remaining": None if quota is None else max(quota - used, 0),
+        "percent": None if not quota else round(used * 100 / quota, 1),
+    }
+
+
+def reconcile(batch_size: int = 500) -> dict:
+    """Recompute ``storage_used`` from documents. Returns ``{"checked", "corrected"}``."""
+    from ..models import Document, User
+
+    result = {"checked": 0, "corrected": []}
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(User.id, User.storage_used, func.coalesce(func.sum(Document.file_size), 0))
+            .outerjoin(Document, Document.user_id == User.id)
+            .where(User.id > last_id)
+            .group_by(User.id, User.storage_used)
+            .order_by(User.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        result["checked"] += len(rows)
+
+        changes = [
+            {"user_id": user_id, "seen": stored, "actual": int(actual)}
+            for user_id, stored, actual in rows
+            if (stored or 0) != int(actual)
+        ]
+        if changes:
+            # Skip rows an upload or delete touched since they were read; the next run catches them.
+            table = User.__table__
+            db.session.execute(
+                update(table)
+                .where(table.c.id == bindparam("user_id"), table.c.storage_used == bindparam("seen"))
+                .values(storage_used=bindparam("actual")),
+                changes,
+            )
+            db.session.commit()
+            result["corrected"].extend(change["user_id"] for change in changes)
+    return result
@@ -0,0 +1,205 @@
+"""Student roster search index.
+
+Same layout as the news index (see ``news_search``): an FTS5 table
+``student_fts`` on SQLite, a ``student_search`` tsvector table with a GIN
+index on PostgreSQL. Only users with the ``student`` role are indexed.
+
+Three columns are kept per student:
+
+* ``name``: the name tokenized like news text (CJK bigrams + latin words).
+* ``pinyin``: for Chinese names, each syllable, the joined full pinyin and
+  the initials, so ``zhang``, ``zhangsan``, ``zhangs`` and ``zs`` all find
+  张三. Every reading of the surname is included (曾 -> ``zeng``/``ceng``).
+* ``ident``: email, student id, grade and class name.
+
+Every query term is matched as a prefix; ranking favours name hits over
+pinyin hits over identifier hits. ``matches`` is joined into the roster
+query, so there is no cap on the number of hits.
+"""
+from itertools import product
+
+from sqlalchemy import DDL, Float, Integer, event, false, literal, select, text
+
+from ..extensions import db
+from .news_search import dialect_name, index_text, is_cjk, parse_query, to_fts5_query, to_tsquery
+
+# Column weights for bm25: name, pinyin, ident.
+FTS_WEIGHTS = (10.0, 6.0, 3.0)
+# User columns the index is built from (role decides whether a row is indexed at all).
+INDEXED_COLUMNS = ("name", "email", "student_id", "grade", "class_name", "role")
+# Cap on joined spellings generated from heteronyms (多音字) in one name.
+MAX_PINYIN_SPELLINGS = 8
+
+SQLITE_CREATE_INDEX = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS student_fts "
+    "USING fts5(name, pinyin, ident, tokenize='unicode61 remove_diacritics 2')"
+)
+POSTGRES_CREATE_INDEX = (
+    'CREATE TABLE IF NOT EXISTS student_search ('
+    'user_id INTEGER PRIMARY KEY REFERENCES "user"(id) ON DELETE CASCADE, '
+    "document tsvector NOT NULL)"
+)
+POSTGRES_CREATE_GIN = (
+    "CREATE INDEX IF NOT EXISTS ix_student_search_document ON student_search USING GIN (document)"
+)
+
+
+def pinyin_text(name: str | None) -> str:
+    """Syllables, joined spellings and initials for the CJK part of ``name``."""
+    from pypinyin import Style, pinyin
+
+    chars = [ch for ch in (name or "") if is_cjk(ch)]
+    if not chars:
+        return ""
+    readings = pinyin("".join(chars), style=Style.NORMAL, heteronym=True, errors="ignore")
+    readings = [[r.lower() for r in options if r.isalpha()] for options in readings]
+    readings = [options for options in readings if options]
+    if not readings:
+        return ""
+
+    tokens: list[str] = []
+    for options in readings:
+        tokens.extend(options)
+    # Only the surname keeps all of its readings in joined spellings; given
+    # names would multiply quickly and their default reading is almost always right.
+    spellings = [readings[0]] + [options[:1] for options in readings[1:]]
+    for combo in list(product(*spellings))[:MAX_PINYIN_SPELLINGS]:
+        tokens.append("".join(combo))
+        tokens.append("".join(syllable[0] for syllable in combo))
+    return " ".join(dict.fromkeys(tokens))
+
+
+def ident_text(user) -> str:
+    return " ".join(
+        index_text(value) for value in (user.email, user.student_id, user.grade, user.class_name) if value
+    )
+
+
+def create_index(connection) -> None:
+    name = dialect_name(connection)
+    if name == "sqlite":
+        connection.execute(text(SQLITE_CREATE_INDEX))
+    elif name == "postgresql":
+        connection.execute(text(POSTGRES_CREATE_INDEX))
+        connection.execute(text(POSTGRES_CREATE_GIN))
+
+
+def remove_entry(connection, user_id: int) -> None:
+    name = dialect_name(connection)
+    if name == "sqlite":
+        connection.execute(text("DELETE FROM student_fts WHERE rowid = :id"), {"id": user_id})
+    elif name == "postgresql":
+        connection.execute(text("DELETE FROM student_search WHERE user_id = :id"), {"id": user_id})
+
+
+def upsert_entry(connection, user) -> None:
+    name = dialect_name(connection)
+    if name not in {"sqlite", "postgresql"}:
+        return
+
+    remove_entry(connection, user.id)
+    if user.role != "student":
+        return
+    params = {
+        "id": user.id,
+        "name": index_text(user.name),
+        "pinyin": pinyin_text(user.name),
+        "ident": ident_text(user),
+    }
+    if name == "sqlite":
+        connection.execute(
+            text(
+                "INSERT INTO student_fts(rowid, name, pinyin, ident) "
+                "VALUES (:id, :name, :pinyin, :ident)"
+            ),
+            params,
+        )
+    else:
+        connection.execute(
+            text(
+                "INSERT INTO student_search(user_id, document) VALUES (:id, "
+                "setweight(to_tsvector('simple', :name), 'A') || "
+                "setweight(to_tsvector('simple', :pinyin), 'B') || "
+                "setweight(to_tsvector('simple', :ident), 'C'))"
+            ),
+            params,
+        )
+
+
+def matches(keyword: str):
+    """Subquery ``(user_id, rank)`` of the students matching ``keyword``; lower rank is better.
+
+    Callers join it to ``user`` so filtering, counting, ordering and paging
+    all happen in SQL. Returns ``None`` when the database has no full-text
+    index so the caller can fall back to ``LIKE`` prefix filters.
+    """
+    terms = parse_query(keyword)
+    name = dialect_name()
+    if name not in {"sqlite", "postgresql"}:
+        return None
+    if not terms:
+        empty = select(literal(None, Integer).label("user_id"), literal(0.0, Float).label("rank")).where(false())
+        return empty.subquery("student_matches")
+
+    if name == "sqlite":
+        weights = ", ".join(str(w) for w in FTS_WEIGHTS)
+        # bm25() only works in the FTS query itself; LIMIT -1 keeps SQLite from flattening it into the join.
+        stmt = text(
+            f"SELECT rowid AS user_id, bm25(student_fts, {weights}) AS rank "
+            "FROM student_fts WHERE student_fts MATCH :student_q LIMIT -1"
+        ).bindparams(student_q=to_fts5_query(terms))
+    else:
+        stmt = text(
+            "SELECT user_id, -ts_rank(document, to_tsquery('simple', :student_q)) AS rank "
+            "FROM student_search WHERE document @@ to_tsquery('simple', :student_q)"
+        ).bindparams(student_q=to_tsquery(terms))
+    return stmt.columns(user_id=Integer, rank=Float).subquery("student_matches")
+
+
+def rebuild_index(batch_size: int = 500) -> int:
+    """Backfill the index from existing students. Returns rows indexed."""
+    from ..models import User
+
+    connection = db.session.connection()
+    create_index(connection)
+    if dialect_name(connection) == "sqlite":
+        connection.execute(text("DELETE FROM student_fts"))
+    elif dialect_name(connection) == "postgresql":
+        connection.execute(text("DELETE FROM student_search"))
+
+    count = 0
+    rows = db.session.execute(
+        select(User).where(User.role == "student").order_by(User.id).execution_options(yield_per=batch_size)
+    ).scalars()
+    for user in rows:
+        upsert_entry(connection, user)
+        count += 1
+    db.session.commit()
+    return count
+
+
+def register_index_listeners(user_model) -> None:
+    """Keep the index in sync from inside the flush that writes ``user``."""
+
+    def after_insert(mapper, connection, target):
+        upsert_entry(connection, target)
+
+    def after_update(mapper, connection, target):
+        # Usage counters and timestamps change on every upload; skip the pinyin and index rewrite for those.
+        attrs = db.inspect(target).attrs
+        if any(attrs[column].history.has_changes() for column in INDEXED_COLUMNS):
+            upsert_entry(connection, target)
+
+    def after_delete(mapper, connection, target):
+        remove_entry(connection, target.id)
+
+    event.listen(user_model, "after_insert", after_insert)
+    event.listen(user_model, "after_update", after_update)
+    event.listen(user_model, "after_delete", after_delete)
+
+    table = user_model.__table__
+    event.listen(table, "after_create", DDL(SQLITE_CREATE_INDEX).execute_if(dialect="sqlite"))
+    event.listen(table, "after_create", DDL(POSTGRES_CREATE_INDEX).execute_if(dialect="postgresql"))
+    event.listen(table, "after_create", DDL(POSTGRES_CREATE_GIN).execute_if(dialect="postgresql"))
+    event.listen(table, "before_drop", DDL("DROP TABLE IF EXISTS student_fts").execute_if(dialect="sqlite"))
+    event.listen(table, "before_drop", DDL("DROP TABLE IF EXISTS student_search").execute_if(dialect="postgresql"))
@@ -0,0 +1,117 @@
+"""Stream a ZIP archive while it is being written.
+
+``iter_zip`` yields archive bytes as each source file is read, so neither
+memory nor disk grows with the archive: the only buffer is the current
+chunk. Entries are stored uncompressed (uploads are mostly PDFs and images,
+already compressed) and use data descriptors, which is what lets
+``zipfile`` write to a non-seekable sink.
+
+Sources are opened lazily through each entry's ``opener`` (a local file or a
+storage-backend object), one at a time. Closing the generator (the WSGI
+server does this when the client goes away) stops at the current chunk and
+closes the open source.
+"""
+import io
+import os
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime
+from typing import IO, Callable
+
+CHUNK_SIZE = 64 * 1024
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+
+@dataclass(frozen=True)
+class ZipEntry:
+    arcname: str
+    opener: Callable[[], IO[bytes]]
+    modified: datetime | None = None
+    size: int | None = None
+
+    @classmethod
+    def for_path(cls, arcname: str, path: str, modified: datetime | None = None) -> "ZipEntry":
+        return cls(arcname, lambda: open(path, "rb"), modified)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable file object that hands written bytes back out."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        if chunks:
+            yield b"".join(chunks)
+
+
+def _zip_time(value: datetime | None) -> tuple:
+    if value is None or value.year < 1980:
+        return ZIP_EPOCH
+    return value.timetuple()[:6]
+
+
+def unique_arcname(name: str, used: set[str]) -> str:
+    """Make ``name`` safe as a ZIP member and distinct from names already in ``used``."""
+    parts = [part.replace("\\", "_").strip() for part in name.split("/")]
+    name = "/".join(part for part in parts if part and part not in (".", "..")) or "file"
+    candidate = name
+    stem, dot, ext = name.rpartition(".")
+    if not dot or "/" in ext:
+        stem, ext = name, ""
+    counter = 2
+    while candidate in used:
+        candidate = f"{stem} ({counter}).{ext}" if ext else f"{name} ({counter})"
+        counter += 1
+    used.add(candidate)
+    return candidate
+
+
+def _source_size(source) -> int | None:
+    try:
+        return os.fstat(source.fileno()).st_size
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+def iter_zip(entries, chunk_size: int = CHUNK_SIZE, missing_note: str = "missing_files.txt"):
+    """Yield a ZIP of ``entries`` (``ZipEntry`` items) chunk by chunk.
+
+    Files that have disappeared are skipped and listed in ``missing_note``.
+    """
+    sink = _ChunkSink()
+    missing: list[str] = []
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for entry in entries:
+            try:
+                source = entry.opener()
+            except (FileNotFoundError, IsADirectoryError, PermissionError):
+                missing.append(entry.arcname)
+                continue
+            with source:
+                info = zipfile.ZipInfo(entry.arcname, date_time=_zip_time(entry.modified))
+                info.compress_type = zipfile.ZIP_STORED
+                # Lets zipfile decide on ZIP64 per entry instead of forcing it.
+                size = _source_size(source)
+                info.file_size = size if size is not None else (entry.size or 0)
+                with archive.open(info, "w") as dest:
+                    while True:
+                        chunk = source.read(chunk_size)
+                        if not chunk:
+                            break
+                        dest.write(chunk)
+                        yield from sink.drain()
+            yield from sink.drain()
+
+        if missing:
+            archive.writestr(missing_note, "\n".join(missing) + "\n")
+    yield from sink.drain()
@@ -0,0 +1,34 @@
+from celery import shared_task
+from flask import current_app
+
+from ..services import document_previews
+
+
+@shared_task
+def generate_document_preview(document_id: int):
+    return document_previews.generate_preview(document_id)
+
+
+def enqueue_preview(document_id: int) -> None:
+    """Queue preview rendering; an unavailable broker must not fail the request."""
+    try:
+        generate_document_preview.delay(document_id)
+    except Exception:
+        current_app.logger.exception("could not queue preview for document %s", document_id)
+
+
+def preview_or_enqueue(document):
+    """Stored preview response; if missing, queue it and return None (or the fresh one in eager mode).
+
+    Raises ``PreviewFailed`` when rendering already failed, without queueing it again.
+    """
+    response = document_previews.send_preview(document)
+    if response is not None:
+        return response
+    if document_previews.has_failed(document):
+        raise document_previews.PreviewFailed()
+    enqueue_preview(document.id)
+    response = document_previews.send_preview(document)
+    if response is None and document_previews.has_failed(document):
+        raise document_previews.PreviewFailed()
+    return response
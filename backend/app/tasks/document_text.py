@@ -0,0 +1,17 @@
+from celery import shared_task
+from flask import current_app
+
+from ..services import document_text
+
+
+@shared_task
+def extract_document_text(document_id: int):
+    return document_text.extract_document(document_id)
+
+
+def enqueue_extraction(document_id: int) -> None:
+    """Queue text extraction; an unavailable broker must not fail the upload."""
+    try:
+        extract_document_text.delay(document_id)
+    except Exception:
+        current_app.logger.exception("could not queue text extraction for document %s", document_id)
@@ -0,0 +1,10 @@
+from celery import shared_task
+
+from ..services import chunked_uploads
+
+
+@shared_task
+def purge_expired_uploads():
+    removed = chunked_uploads.purge_expired()
+    print(f"Removed {removed} expired upload sessions")
+    return removed
@@ -0,0 +1,25 @@
+from celery import shared_task
+from flask import current_app
+
+from ..services import news_images
+
+
+@shared_task
+def gc_news_images():
+    removed = news_images.collect_garbage()
+    print(f"Removed {len(removed)} unreferenced news images")
+    return len(removed)
+
+
+@shared_task
+def generate_news_image_variants(filename: str):
+    created = news_images.generate_variants(filename)
+    return sorted(created)
+
+
+def enqueue_variants(filename: str) -> None:
+    """Queue derivative generation; an unavailable broker must not fail the upload."""
+    try:
+        generate_news_image_variants.delay(filename)
+    except Exception:
+        current_app.logger.exception("could not queue variants for %s", filename)
@@ -0,0 +1,25 @@
+from celery import shared_task
+from flask import current_app
+
+from ..services import storage_cleanup
+
+
+@shared_task
+def process_storage_deletions():
+    return storage_cleanup.process_pending()
+
+
+@shared_task
+def sweep_orphan_files():
+    counts = {namespace: len(keys) for namespace, keys in storage_cleanup.sweep().items()}
+    print(f"Queued orphaned files for deletion: {counts}")
+    storage_cleanup.process_pending()
+    return counts
+
+
+def enqueue_deletions() -> None:
+    """Run the deletion queue after a commit; an unavailable broker only delays it."""
+    try:
+        process_storage_deletions.delay()
+    except Exception:
+        current_app.logger.exception("could not queue storage deletions")
@@ -0,0 +1,10 @@
+from celery import shared_task
+
+from ..services import storage_quota
+
+
+@shared_task
+def reconcile_storage_usage():
+    result = storage_quota.reconcile()
+    print(f"Checked {result['checked']} users, corrected {len(result['corrected'])}")
+    return result
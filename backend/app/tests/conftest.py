@@ -1,13 +1,27 @@
 import pytest
+
 from app import create_app
+from app.tests.helpers import auth_headers
 
 
 @pytest.fixture()
-def app():
-    app = create_app("development")
+def app(tmp_path):
+    app = create_app("testing")
+    # Keep uploads out of the real backend/instance directory.
+    app.instance_path = str(tmp_path / "instance")
     yield app
 
 
 @pytest.fixture()
 def client(app):
     return app.test_client()
+
+
+@pytest.fixture()
+def teacher_headers(app):
+    return auth_headers(app, "teacher@test.com")
+
+
+@pytest.fixture()
+def student_headers(app):
+    return auth_headers(app, "student@test.com")
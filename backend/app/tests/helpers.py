@@ -0,0 +1,33 @@
+"""Helpers shared by test modules (import these, not ``conftest``)."""
+from contextlib import contextmanager
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models import User
+
+
+def auth_headers(app, email: str) -> dict:
+    with app.app_context():
+        user = User.query.filter_by(email=email).first()
+        claims = {"email": user.email, "role": user.role, "name": user.name}
+        token = create_access_token(identity=str(user.id), additional_claims=claims)
+    return {"Authorization": f"Bearer {token}"}
+
+
+@contextmanager
+def count_queries(app):
+    """Collect the SQL statements run on ``app``'s engine inside the block."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,37 @@
+from flask_jwt_extended import create_access_token, verify_jwt_in_request
+
+from app.services.authz import current_user, get_current_user
+from app.tests.helpers import count_queries
+
+
+def test_role_required_trusts_claims_without_a_user_lookup(app, client, teacher_headers, student_headers):
+    with count_queries(app) as statements:
+        res = client.get("/api/news/cache/stats", headers=teacher_headers)
+    assert res.status_code == 200
+    assert not [s for s in statements if 'FROM "user"' in s or "FROM user" in s]
+
+    denied = client.get("/api/news/cache/stats", headers=student_headers)
+    assert denied.status_code == 403
+    assert "教师" in denied.get_json()["message"]
+    assert client.get("/api/news/cache/stats").status_code == 401
+
+
+def test_current_user_is_loaded_once_per_request(app, teacher_headers):
+    with app.test_request_context(headers=teacher_headers):
+        verify_jwt_in_request()
+        with count_queries(app) as statements:
+            first = get_current_user()
+            assert current_user.email == "teacher@test.com"
+            assert get_current_user() is first
+        assert len(statements) == 1
+
+
+def test_current_user_caches_missing_users(app):
+    with app.app_context():
+        token = create_access_token(identity="999999", additional_claims={"role": "student"})
+    with app.test_request_context(headers={"Authorization": f"Bearer {token}"}):
+        verify_jwt_in_request()
+        with count_queries(app) as statements:
+            assert not current_user
+            assert get_current_user() is None
+        assert len(statements) == 1
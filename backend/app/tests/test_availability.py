@@ -0,0 +1,156 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.extensions import cache, db
+from app.models import Appointment, User
+from app.services import availability
+from app.tests.helpers import count_queries
+from app.tests.test_booking import book, teacher_id
+
+
+def next_monday() -> date:
+    today = date.today()
+    return today + timedelta(days=7 - today.weekday())
+
+
+@pytest.fixture()
+def cached_app(app):
+    # The testing config uses NullCache; switch this app to a real store.
+    cache.init_app(app, config={"CACHE_TYPE": "SimpleCache"})
+    yield app
+
+
+def slots(client, teacher: int, day: date, end: date | None = None) -> dict:
+    res = client.get(f"/api/schedule/slots?teacher_ids={teacher}&start={day}&end={end or day}")
+    assert res.status_code == 200
+    return res.get_json()["teachers"][0]["slots"]
+
+
+def test_interval_arithmetic():
+    assert availability.merge([(600, 660), (540, 600), (900, 960)]) == [(540, 660), (900, 960)]
+    assert availability.subtract([(540, 720)], [(570, 600), (660, 780)]) == [(540, 570), (600, 660)]
+    free = availability.subtract([(540, 720), (840, 1020)], [(600, 630)])
+    assert availability.fits((540, 600), free)
+    assert not availability.fits((600, 660), free)
+    assert availability.fits((900, 960), free)
+    assert availability.parse_slot("9:00-10:30") == (540, 630)
+    assert availability.parse_slot("10:00-09:00") is None
+
+
+def test_defaults_until_teacher_configures_availability(app, client, teacher_headers, student_headers):
+    teacher = teacher_id(app)
+    monday = next_monday()
+    assert slots(client, teacher, monday)[monday.isoformat()] == list(availability.DEFAULT_SLOTS)
+
+    res = client.put(
+        "/api/schedule/availability",
+        json={
+            "working_hours": [{"weekday": 0, "start": "09:00", "end": "12:00"}],
+            "slot_templates": ["09:00-09:30", "09:30-10:30", "10:30-11:30", "11:30-12:30"],
+        },
+        headers=teacher_headers,
+    )
+    assert res.status_code == 200
+    calendar = slots(client, teacher, monday, monday + timedelta(days=1))
+    # 11:30-12:30 runs past the working hours; Tuesday has none.
+    assert calendar == {
+        monday.isoformat(): ["09:00-09:30", "09:30-10:30", "10:30-11:30"],
+        (monday + timedelta(days=1)).isoformat(): [],
+    }
+
+    # A legacy hour-long booking (made before the templates) blocks every template slot it overlaps.
+    with app.app_context():
+        student = User.query.filter_by(email="student@test.com").first()
+        db.session.add(
+            Appointment(
+                student_id=student.id,
+                teacher_id=teacher,
+                appointment_date=monday,
+                time_slot="09:00-10:00",
+                appointment_type="选校咨询",
+            )
+        )
+        db.session.commit()
+    assert slots(client, teacher, monday)[monday.isoformat()] == ["10:30-11:30"]
+
+    blackout = client.post(
+        "/api/schedule/availability/blackouts",
+        json={"start_date": monday.isoformat(), "reason": "出差"},
+        headers=teacher_headers,
+    )
+    assert blackout.status_code == 201
+    assert slots(client, teacher, monday)[monday.isoformat()] == []
+    client.delete(f"/api/schedule/availability/blackouts/{blackout.get_json()['id']}", headers=teacher_headers)
+    assert slots(client, teacher, monday)[monday.isoformat()] == ["10:30-11:30"]
+
+
+def test_booking_is_limited_to_offered_slots(client, teacher_headers, student_headers):
+    teacher = teacher_id(client.application)
+    monday = next_monday()
+    client.put("/api/schedule/availability", json={"slot_templates": ["09:00-10:00"]}, headers=teacher_headers)
+
+    res = book(client, student_headers, teacher, appointment_date=monday.isoformat(), time_slot="03:00-04:00")
+    assert res.status_code == 409
+    assert book(client, student_headers, teacher, time_slot="nine").status_code == 400
+    # Slots are stored normalized, so "9:00-10:00" cannot bypass the unique index.
+    assert book(client, student_headers, teacher, appointment_date=monday.isoformat(), time_slot="9:00-10:00").status_code == 201
+    assert book(client, student_headers, teacher, appointment_date=monday.isoformat()).status_code == 409
+
+    tuesday = monday + timedelta(days=1)
+    client.post("/api/schedule/availability/blackouts", json={"start_date": tuesday.isoformat()}, headers=teacher_headers)
+    assert slots(client, teacher, tuesday)[tuesday.isoformat()] == []
+    assert book(client, student_headers, teacher, appointment_date=tuesday.isoformat()).status_code == 409
+
+
+def test_invalid_input_is_rejected(client, teacher_headers, student_headers):
+    bad_hours = {"working_hours": [{"weekday": 7, "start": "09:00", "end": "12:00"}]}
+    assert client.put("/api/schedule/availability", json=bad_hours, headers=teacher_headers).status_code == 400
+    overlapping = {"slot_templates": ["09:00-10:00", "09:30-10:30"]}
+    assert client.put("/api/schedule/availability", json=overlapping, headers=teacher_headers).status_code == 400
+    assert client.put("/api/schedule/availability", json={}, headers=student_headers).status_code == 403
+    assert client.get("/api/schedule/slots?end=2000-01-01").status_code == 400
+    assert client.get("/api/schedule/slots?teacher_ids=x").status_code == 400
+
+
+def test_many_teachers_and_days_in_a_fixed_number_of_queries(app, client):
+    with app.app_context():
+        for index in range(20):
+            db.session.add(User(email=f"t{index}@test.com", name=f"T{index}", role="teacher", password_hash="x"))
+        db.session.commit()
+        ids = [user.id for user in User.query.filter_by(role="teacher")]
+
+    monday = next_monday()
+    url = f"/api/schedule/slots?teacher_ids={','.join(map(str, ids))}&start={monday}&end={monday + timedelta(days=27)}"
+    with count_queries(app) as statements:
+        res = client.get(url)
+    assert res.status_code == 200
+    teachers = res.get_json()["teachers"]
+    assert len(teachers) == len(ids) and all(len(t["slots"]) == 28 for t in teachers)
+    assert len([s for s in statements if "FROM appointments" in s]) == 1
+    assert len(statements) <= 5
+
+
+def test_booking_and_status_changes_invalidate_cache(cached_app, client, student_headers, teacher_headers):
+    teacher = teacher_id(cached_app)
+    monday = next_monday()
+    assert "09:00-10:00" in slots(client, teacher, monday)[monday.isoformat()]
+
+    with count_queries(cached_app) as statements:
+        slots(client, teacher, monday)
+    assert not [s for s in statements if "FROM appointments" in s]
+
+    appointment = book(client, student_headers, teacher, appointment_date=monday.isoformat()).get_json()
+    assert "09:00-10:00" not in slots(client, teacher, monday)[monday.isoformat()]
+
+    appointment_id = appointment["appointment"]["id"]
+    client.patch(f"/api/schedule/appointments/{appointment_id}", json={"status": "cancelled"}, headers=student_headers)
+    assert "09:00-10:00" in slots(client, teacher, monday)[monday.isoformat()]
+
+
+def test_started_slots_are_dropped():
+    calendar = {"2026-11-01": ["09:00-10:00"], "2026-11-02": ["09:00-10:00", "14:00-15:00"], "2026-11-03": ["09:00-10:00"]}
+    assert availability.drop_started(calendar, datetime(2026, 11, 2, 9, 30)) == {
+        "2026-11-02": ["14:00-15:00"],
+        "2026-11-03": ["09:00-10:00"],
+    }
@@ -0,0 +1,79 @@
+import threading
+
+import pytest
+
+from app import config, create_app
+from app.extensions import db
+from app.models import Appointment, User
+from app.tests.helpers import auth_headers
+
+SLOT = {"appointment_date": "2026-11-02", "time_slot": "09:00-10:00", "appointment_type": "选校咨询"}
+
+
+def teacher_id(app) -> int:
+    with app.app_context():
+        return User.query.filter_by(email="teacher@test.com").first().id
+
+
+def book(client, headers, teacher: int, **overrides):
+    return client.post("/api/schedule/book", json={**SLOT, "teacher_id": teacher, **overrides}, headers=headers)
+
+
+def test_active_slot_is_exclusive_until_released(app, client, student_headers, teacher_headers):
+    teacher = teacher_id(app)
+    first = book(client, student_headers, teacher)
+    assert first.status_code == 201
+    assert book(client, student_headers, teacher).status_code == 409
+    assert book(client, student_headers, teacher, time_slot="10:00-11:00").status_code == 201
+
+    first_id = first.get_json()["appointment"]["id"]
+    client.patch(f"/api/schedule/appointments/{first_id}", json={"status": "cancelled"}, headers=student_headers)
+    second = book(client, student_headers, teacher)
+    assert second.status_code == 201
+
+    # A cancelled booking cannot be revived onto a slot someone else holds.
+    res = client.patch(f"/api/schedule/appointments/{first_id}", json={"status": "pending"}, headers=teacher_headers)
+    assert res.status_code == 409
+    with app.app_context():
+        assert db.session.get(Appointment, first_id).status == "cancelled"
+
+
+def test_invalid_teacher_id_is_rejected(client, student_headers):
+    assert book(client, student_headers, "abc").status_code == 400
+
+
+@pytest.fixture()
+def file_app(tmp_path, monkeypatch):
+    # In-memory SQLite shares one connection across threads; a file gives real concurrent transactions.
+    monkeypatch.setattr(config.TestingConfig, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'race.db'}")
+    app = create_app("testing")
+    app.instance_path = str(tmp_path / "instance")
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+def test_parallel_bookings_for_one_slot_yield_one_winner(file_app):
+    attempts = 200
+    teacher = teacher_id(file_app)
+    headers = auth_headers(file_app, "student@test.com")
+    barrier = threading.Barrier(attempts)
+    statuses: list[int] = []
+    lock = threading.Lock()
+
+    def attempt():
+        client = file_app.test_client()
+        barrier.wait()
+        status = book(client, headers, teacher).status_code
+        with lock:
+            statuses.append(status)
+
+    threads = [threading.Thread(target=attempt) for _ in range(attempts)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(statuses) == [201] + [409] * (attempts - 1)
+    with file_app.app_context():
+        assert Appointment.query.filter(Appointment.status.in_(("pending", "approved"))).count() == 1
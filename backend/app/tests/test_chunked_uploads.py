@@ -0,0 +1,167 @@
+import hashlib
+import io
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from werkzeug.exceptions import ClientDisconnected
+
+from app.extensions import db
+from app.models import UploadSession
+from app.models.document import Document
+from app.services import chunked_uploads
+
+PAYLOAD = os.urandom(200 * 1024)
+
+
+def start(client, headers, size=len(PAYLOAD), **extra):
+    return client.post("/api/documents/uploads", json={"filename": "portfolio.pdf", "size": size, **extra}, headers=headers)
+
+
+def patch(client, headers, upload_id, offset, data):
+    return client.patch(
+        f"/api/documents/uploads/{upload_id}",
+        data=data,
+        headers=dict(headers, **{"Upload-Offset": str(offset), "Content-Type": "application/offset+octet-stream"}),
+    )
+
+
+def test_resumable_upload_round_trip(app, client, student_headers):
+    checksum = hashlib.sha256(PAYLOAD).hexdigest()
+    res = start(client, student_headers, checksum=checksum)
+    assert res.status_code == 201
+    upload_id = res.get_json()["upload_id"]
+    assert res.headers["Location"].endswith(upload_id)
+
+    assert patch(client, student_headers, upload_id, 0, PAYLOAD[:70000]).headers["Upload-Offset"] == "70000"
+    # A retried chunk at a stale offset is rejected; the client asks where to resume.
+    assert patch(client, student_headers, upload_id, 0, PAYLOAD[:70000]).status_code == 409
+    assert client.get(f"/api/documents/uploads/{upload_id}", headers=student_headers).get_json()["offset"] == 70000
+    assert client.post(f"/api/documents/uploads/{upload_id}/complete", headers=student_headers).status_code == 409
+
+    # Simulate another worker: the cached hash state is gone and is rebuilt from disk.
+    chunked_uploads._hashers.clear()
+    assert patch(client, student_headers, upload_id, 70000, PAYLOAD[70000:]).status_code == 200
+
+    res = client.post(f"/api/documents/uploads/{upload_id}/complete", headers=student_headers)
+    assert res.status_code == 201
+    body = res.get_json()
+    assert body["sha256"] == checksum
+    doc_id = body["document"]["id"]
+    assert client.get(f"/api/documents/{doc_id}/download", headers=student_headers).data == PAYLOAD
+    with app.app_context():
+        assert db.session.get(UploadSession, upload_id) is None
+
+
+def test_limits_and_checksum_mismatch(app, client, student_headers, teacher_headers):
+    app.config["UPLOAD_MAX_FILE_SIZE"] = 1000
+    assert start(client, student_headers, size=1001).status_code == 413
+    app.config["UPLOAD_MAX_PENDING_BYTES"] = 1500
+    assert start(client, student_headers, size=1000).status_code == 201
+    assert start(client, student_headers, size=1000).status_code == 413
+
+    res = start(client, teacher_headers, size=4, checksum="0" * 64)
+    upload_id = res.get_json()["upload_id"]
+    # Other users cannot see or write someone else's upload.
+    assert patch(client, student_headers, upload_id, 0, b"data").status_code == 404
+    assert patch(client, teacher_headers, upload_id, 0, b"toolong").status_code == 413
+    assert patch(client, teacher_headers, upload_id, 0, b"data").status_code == 200
+    assert client.post(f"/api/documents/uploads/{upload_id}/complete", headers=teacher_headers).status_code == 422
+    with app.app_context():
+        assert Document.query.count() == 0
+
+
+class DroppingStream:
+    """Yields part of the body, then fails like a dropped connection."""
+
+    def __init__(self, data: bytes, cut: int) -> None:
+        self.buffer = io.BytesIO(data[:cut])
+
+    def read(self, size):
+        block = self.buffer.read(size)
+        if not block:
+            raise ClientDisconnected()
+        return block
+
+
+def test_dropped_connection_keeps_received_bytes_and_purge_removes_abandoned(app, client, student_headers):
+    upload_id = start(client, student_headers).get_json()["upload_id"]
+    with app.test_request_context():
+        session = db.session.get(UploadSession, upload_id)
+        with pytest.raises(ClientDisconnected):
+            chunked_uploads.append_chunk(session, 0, DroppingStream(PAYLOAD, 12345), len(PAYLOAD))
+        assert session.received == 12345
+        partial = chunked_uploads.partial_path(upload_id)
+        assert os.path.getsize(partial) == 12345
+
+        assert chunked_uploads.purge_expired() == 0
+        assert chunked_uploads.purge_expired(now=datetime.utcnow() + timedelta(days=2)) == 1
+        assert not os.path.exists(partial)
+        assert db.session.get(UploadSession, upload_id) is None
+
+
+def test_stale_retry_never_truncates_committed_bytes(app, client, student_headers):
+    upload_id = start(client, student_headers).get_json()["upload_id"]
+    with app.app_context():
+        # Loaded by another worker before the first chunk commits, like a retry racing it.
+        stale = db.session.get(UploadSession, upload_id)
+        db.session.expunge(stale)
+    assert patch(client, student_headers, upload_id, 0, PAYLOAD[:70000]).status_code == 200
+
+    with app.test_request_context():
+        db.session.add(stale)
+        with pytest.raises(chunked_uploads.UploadError) as excinfo:
+            chunked_uploads.append_chunk(stale, 0, io.BytesIO(PAYLOAD[:100]), 100)
+        assert excinfo.value.status == 409
+        assert os.path.getsize(chunked_uploads.partial_path(upload_id)) == 70000
+
+    assert patch(client, student_headers, upload_id, 70000, PAYLOAD[70000:]).status_code == 200
+    res = client.post(f"/api/documents/uploads/{upload_id}/complete", headers=student_headers)
+    assert res.get_json()["sha256"] == hashlib.sha256(PAYLOAD).hexdigest()
+
+
+def test_concurrent_writer_is_refused_until_its_lock_goes_stale(app, client, student_headers):
+    upload_id = start(client, student_headers).get_json()["upload_id"]
+    with app.app_context():
+        partial, lock = chunked_uploads.partial_path(upload_id), chunked_uploads.lock_path(upload_id)
+    open(lock, "w").close()
+    assert patch(client, student_headers, upload_id, 0, PAYLOAD[:1000]).status_code == 409
+    assert os.path.getsize(partial) == 0
+
+    old = datetime.now().timestamp() - chunked_uploads.LOCK_STALE_SECONDS - 1
+    os.utime(lock, (old, old))
+    assert patch(client, student_headers, upload_id, 0, PAYLOAD[:1000]).status_code == 200
+    assert not os.path.exists(lock)
+
+
+def test_double_complete_stores_one_document(app, client, student_headers):
+    upload_id = start(client, student_headers).get_json()["upload_id"]
+    assert patch(client, student_headers, upload_id, 0, PAYLOAD).status_code == 200
+    with app.app_context():
+        # Loaded by a retried request before the first complete commits.
+        stale = db.session.get(UploadSession, upload_id)
+        db.session.expunge(stale)
+        lock = chunked_uploads.lock_path(upload_id)
+
+    open(lock, "w").close()
+    assert client.post(f"/api/documents/uploads/{upload_id}/complete", headers=student_headers).status_code == 409
+    os.remove(lock)
+    assert client.post(f"/api/documents/uploads/{upload_id}/complete", headers=student_headers).status_code == 201
+
+    with app.test_request_context():
+        db.session.add(stale)
+        with pytest.raises(chunked_uploads.UploadError) as excinfo:
+            chunked_uploads.finalize(stale)
+        assert excinfo.value.status == 409
+        assert Document.query.count() == 1
+        assert not os.path.exists(lock)
+
+
+def test_missing_partial_file_is_gone(app, client, student_headers):
+    upload_id = start(client, student_headers).get_json()["upload_id"]
+    assert patch(client, student_headers, upload_id, 0, PAYLOAD[:1000]).status_code == 200
+    with app.app_context():
+        # As if the next request landed on a node without this scratch file.
+        os.remove(chunked_uploads.partial_path(upload_id))
+    assert patch(client, student_headers, upload_id, 1000, PAYLOAD[1000:]).status_code == 410
+    assert client.post(f"/api/documents/uploads/{upload_id}/complete", headers=student_headers).status_code == 410
@@ -0,0 +1,51 @@
+def create_news(client, headers, title):
+    res = client.post("/api/news", json={"title": title, "content": "<p>body</p>"}, headers=headers)
+    assert res.status_code == 201
+    return res.get_json()["id"]
+
+
+def test_news_list_revalidates_with_etag(client, teacher_headers):
+    create_news(client, teacher_headers, "First")
+    res = client.get("/api/news")
+    etag = res.headers["ETag"]
+    assert "no-store" not in res.headers["Cache-Control"]
+    assert res.headers.get("Last-Modified")
+
+    cached = client.get("/api/news", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.data == b""
+
+    create_news(client, teacher_headers, "Second")
+    fresh = client.get("/api/news", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert len(fresh.get_json()) == 2
+
+
+def test_news_detail_changes_etag_on_update(client, teacher_headers):
+    news_id = create_news(client, teacher_headers, "Detail")
+    etag = client.get(f"/api/news/{news_id}").headers["ETag"]
+    assert client.get(f"/api/news/{news_id}", headers={"If-None-Match": etag}).status_code == 304
+
+    client.put(f"/api/news/{news_id}", json={"title": "Detail v2"}, headers=teacher_headers)
+    assert client.get(f"/api/news/{news_id}", headers={"If-None-Match": etag}).status_code == 200
+    assert client.get("/api/news/999999").status_code == 404
+
+
+def test_roster_is_private_and_conditional(client, teacher_headers, student_headers):
+    res = client.get("/api/users/students", headers=teacher_headers)
+    assert res.status_code == 200
+    assert res.headers["Cache-Control"] == "private, no-cache"
+    assert "Authorization" in res.headers["Vary"]
+
+    headers = dict(teacher_headers, **{"If-None-Match": res.headers["ETag"]})
+    assert client.get("/api/users/students", headers=headers).status_code == 304
+
+    # Students never get a validator, even when replaying a teacher's ETag.
+    headers = dict(student_headers, **{"If-None-Match": res.headers["ETag"]})
+    assert client.get("/api/users/students", headers=headers).status_code == 403
+
+
+def test_private_endpoints_stay_uncached(client, student_headers):
+    res = client.get("/api/users/profile", headers=student_headers)
+    assert res.headers["Cache-Control"].startswith("no-store")
+    assert "ETag" not in res.headers
@@ -0,0 +1,104 @@
+import hashlib
+import io
+import os
+
+from app.extensions import db
+from app.models import DocumentBlob, User
+from app.models.document import Document
+from app.services import document_blobs, document_storage, storage_cleanup
+from app.tests.helpers import auth_headers
+
+PAYLOAD = os.urandom(100 * 1024)
+
+
+def upload(client, headers, payload=PAYLOAD, name="passport.pdf") -> int:
+    res = client.post(
+        "/api/documents",
+        data={"file": (io.BytesIO(payload), name)},
+        headers=headers,
+        content_type="multipart/form-data",
+    )
+    assert res.status_code == 201
+    return res.get_json()["document"]["id"]
+
+
+def classmate_headers(app) -> dict:
+    with app.app_context():
+        db.session.add(User(email="classmate@test.com", name="同学", role="student", password_hash="x"))
+        db.session.commit()
+    return auth_headers(app, "classmate@test.com")
+
+
+def stored_files(app) -> list[str]:
+    with app.app_context():
+        return [item.key for item in document_storage.storage().list()]
+
+
+def test_identical_uploads_share_one_blob_until_the_last_delete(app, client, student_headers):
+    other_headers = classmate_headers(app)
+    first = upload(client, student_headers)
+    second = upload(client, other_headers, name="form.pdf")
+    third = upload(client, student_headers, payload=b"%PDF different")
+
+    with app.app_context():
+        blob = DocumentBlob.query.filter_by(sha256=hashlib.sha256(PAYLOAD).hexdigest()).one()
+        assert blob.ref_count == 2
+        assert db.session.get(Document, first).file_path == db.session.get(Document, second).file_path
+    assert len(stored_files(app)) == 2
+
+    assert client.delete(f"/api/documents/{first}", headers=student_headers).status_code == 200
+    assert client.get(f"/api/documents/{second}/download", headers=other_headers).data == PAYLOAD
+    assert len(stored_files(app)) == 2
+
+    assert client.delete(f"/api/documents/{second}", headers=other_headers).status_code == 200
+    with app.app_context():
+        assert DocumentBlob.query.count() == 1
+        remaining = db.session.get(Document, third).file_path
+    assert stored_files(app) == [remaining]
+
+
+def test_resumable_upload_reuses_existing_blob(app, client, student_headers):
+    first = upload(client, student_headers)
+    upload_id = client.post(
+        "/api/documents/uploads", json={"filename": "again.pdf", "size": len(PAYLOAD)}, headers=student_headers
+    ).get_json()["upload_id"]
+    client.patch(
+        f"/api/documents/uploads/{upload_id}",
+        data=PAYLOAD,
+        headers=dict(student_headers, **{"Upload-Offset": "0"}),
+    )
+    res = client.post(f"/api/documents/uploads/{upload_id}/complete", headers=student_headers)
+    assert res.status_code == 201
+
+    with app.app_context():
+        again = db.session.get(Document, res.get_json()["document"]["id"])
+        assert again.blob_id == db.session.get(Document, first).blob_id
+        assert again.blob.ref_count == 2
+    assert len(stored_files(app)) == 1
+
+
+def test_dedupe_links_existing_uploads(app):
+    with app.app_context():
+        student = User.query.filter_by(email="student@test.com").first()
+        backend = document_storage.storage()
+        for key in ("old/a.pdf", "old/b.pdf"):
+            backend.put(key, io.BytesIO(PAYLOAD))
+            db.session.add(Document(user_id=student.id, name=key, original_name=key, file_path=key, file_type="pdf"))
+        db.session.add(
+            Document(user_id=student.id, name="gone", original_name="gone", file_path="old/gone.pdf", file_type="pdf")
+        )
+        db.session.commit()
+
+        preview = document_blobs.deduplicate_existing(dry_run=True)
+        assert (preview["linked"], preview["duplicates"], preview["bytes_freed"]) == (2, 1, len(PAYLOAD))
+        assert DocumentBlob.query.count() == 0
+
+        result = document_blobs.deduplicate_existing(batch_size=1)
+        assert (result["linked"], result["duplicates"]) == (2, 1)
+        assert len(result["missing"]) == 1
+        # The duplicate is queued in the linking transaction and removed by the worker.
+        assert len(list(backend.list("old/"))) == 2
+        assert storage_cleanup.process_pending()["deleted"] == 1
+        assert [item.key for item in backend.list("old/")] == ["old/a.pdf"]
+        assert {doc.file_path for doc in Document.query.filter(Document.blob_id.isnot(None))} == {"old/a.pdf"}
+        assert DocumentBlob.query.one().ref_count == 2
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app.extensions import db
+from app.models import Document, User
+
+
+def seed_documents(app, count: int) -> list[int]:
+    with app.app_context():
+        student = User.query.filter_by(email="student@test.com").first()
+        base = datetime(2026, 1, 1)
+        rows = [
+            Document(
+                user_id=student.id,
+                name=f"doc{i}",
+                original_name=f"doc{i}",
+                file_path=f"ab/cd/doc{i}",
+                file_type="pdf" if i % 2 else "docx",
+                category="transcript" if i % 3 == 0 else "general",
+                # Pairs share a timestamp so the id tiebreaker is exercised.
+                created_at=base + timedelta(minutes=i // 2),
+            )
+            for i in range(count)
+        ]
+        db.session.add_all(rows)
+        db.session.commit()
+        ordered = sorted(rows, key=lambda d: (d.created_at, d.id), reverse=True)
+        return [d.id for d in ordered]
+
+
+def test_keyset_pages_cover_every_document_once(app, client, student_headers):
+    expected = seed_documents(app, 7)
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/api/documents", query_string=params, headers=student_headers).get_json()
+        assert all("file_path" not in item for item in body["items"])
+        seen.extend(item["id"] for item in body["items"])
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    assert seen == expected
+
+    res = client.get("/api/documents", query_string={"cursor": "!!"}, headers=student_headers)
+    assert res.status_code == 400
+
+
+def test_filters_apply_to_both_list_modes(app, client, student_headers):
+    seed_documents(app, 7)
+
+    legacy = client.get("/api/documents", query_string={"file_type": "PDF"}, headers=student_headers).get_json()
+    assert [doc["name"] for doc in legacy] == ["doc5", "doc3", "doc1"]
+
+    page = client.get(
+        "/api/documents",
+        query_string={"category": "transcript", "file_type": "docx", "limit": 10},
+        headers=student_headers,
+    ).get_json()
+    assert [doc["name"] for doc in page["items"]] == ["doc6", "doc0"]
+    assert page["next_cursor"] is None
+
+
+def test_listing_uses_the_composite_index(app):
+    with app.app_context():
+        plan = db.session.execute(
+            text(
+                "EXPLAIN QUERY PLAN SELECT id FROM document WHERE user_id = 1 "
+                "ORDER BY created_at DESC, id DESC LIMIT 20"
+            )
+        ).all()
+    assert any("ix_document_user_id_created_at" in row[-1] for row in plan)
@@ -0,0 +1,79 @@
+import io
+
+from PIL import Image
+
+from app.services import document_previews
+
+from .test_document_text_search import make_pdf, upload
+
+
+def image_bytes(fmt: str, size=(3000, 2000)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def preview_objects(app) -> list[str]:
+    with app.app_context():
+        return [stored.key for stored in document_previews.storage().list()]
+
+
+def test_photo_preview_is_downscaled_webp_shared_by_content(app, client, student_headers, teacher_headers):
+    payload = image_bytes("PNG")
+    doc_id = upload(client, student_headers, payload, "photo.png").get_json()["document"]["id"]
+    upload(client, student_headers, payload, "same-photo.png")
+    assert len(preview_objects(app)) == 1
+
+    res = client.get(f"/api/documents/{doc_id}/preview", headers=student_headers)
+    assert res.status_code == 200
+    assert res.mimetype == "image/webp"
+    assert res.headers["Cache-Control"] == document_previews.CACHE_CONTROL
+    with Image.open(io.BytesIO(res.data)) as preview:
+        assert max(preview.size) == document_previews.PREVIEW_MAX_SIZE
+
+    with app.app_context():
+        from app.models import Document, User
+
+        student_id = User.query.filter_by(email="student@test.com").first().id
+        assert Document.query.count() == 2
+    listing = client.get(f"/api/users/students/{student_id}/documents", headers=teacher_headers).get_json()
+    preview_url = listing["documents"][0]["preview_url"]
+    assert client.get(preview_url, headers=teacher_headers).status_code == 200
+    assert client.get(preview_url, headers=student_headers).status_code == 403
+
+
+def test_scanned_pdf_uses_page_image_and_text_pdf_falls_back_to_html(client, student_headers):
+    scanned = upload(client, student_headers, image_bytes("PDF", (1000, 1400)), "scan.pdf").get_json()
+    res = client.get(f"/api/documents/{scanned['document']['id']}/preview", headers=student_headers)
+    assert res.mimetype == "image/webp"
+
+    typed = upload(client, student_headers, make_pdf("IELTS overall band 7.5"), "report.pdf").get_json()
+    res = client.get(f"/api/documents/{typed['document']['id']}/preview", headers=student_headers)
+    assert res.mimetype == "text/html"
+    assert b"IELTS overall band 7.5" in res.data
+
+
+def test_text_preview_is_escaped_and_sandboxed(client, student_headers):
+    doc_id = upload(client, student_headers, b"<script>alert(1)</script> notes", "notes.txt").get_json()["document"]["id"]
+    res = client.get(f"/api/documents/{doc_id}/preview", headers=student_headers)
+    assert b"<script>" not in res.data and b"&lt;script&gt;" in res.data
+    assert res.headers["Content-Security-Policy"] == document_previews.HTML_POLICY
+
+
+def test_unsupported_and_unrenderable_files(app, client, student_headers, monkeypatch):
+    sheet = upload(client, student_headers, b"PK\x03\x04", "marks.xlsx").get_json()["document"]["id"]
+    assert client.get(f"/api/documents/{sheet}/preview", headers=student_headers).status_code == 404
+
+    broken = upload(client, student_headers, b"not really a png", "broken.png").get_json()["document"]["id"]
+    renders = []
+    original = document_previews.render
+    monkeypatch.setattr(document_previews, "render", lambda *args: renders.append(1) or original(*args))
+    for _ in range(3):
+        res = client.get(f"/api/documents/{broken}/preview", headers=student_headers)
+        assert res.status_code == 422
+    # The failure recorded at upload is remembered; polling never renders again.
+    assert renders == []
+    assert [key.rsplit(".", 1)[1] for key in preview_objects(app)] == ["failed"]
+    with app.app_context():
+        assert document_previews.generate_preview(broken) is None and renders == []
+        assert document_previews.generate_preview(broken, retry_failed=True) is None and renders == [1]
@@ -0,0 +1,77 @@
+import io
+import os
+
+from app.extensions import db
+from app.models import User
+from app.models.document import Document
+from app.services import document_storage
+from app.tests.helpers import count_queries
+
+
+def add_document(app, file_path: str) -> int:
+    with app.app_context():
+        student = User.query.filter_by(email="student@test.com").first()
+        doc = Document(
+            user_id=student.id, name="cv.pdf", original_name="cv.pdf", file_path=file_path, file_type="pdf"
+        )
+        db.session.add(doc)
+        db.session.commit()
+        return doc.id
+
+
+def stored_path(app, doc_id: int) -> str:
+    with app.app_context():
+        return db.session.get(Document, doc_id).file_path
+
+
+def test_upload_stores_relative_key_under_configured_root(app, client, student_headers, tmp_path):
+    app.config["DOCUMENT_STORAGE_ROOT"] = str(tmp_path / "store")
+    res = client.post(
+        "/api/documents",
+        data={"file": (io.BytesIO(b"%PDF"), "cv.pdf")},
+        headers=student_headers,
+        content_type="multipart/form-data",
+    )
+    doc_id = res.get_json()["document"]["id"]
+
+    key = stored_path(app, doc_id)
+    assert not os.path.isabs(key)
+    assert (tmp_path / "store" / key).read_bytes() == b"%PDF"
+    assert client.get(f"/api/documents/{doc_id}/download", headers=student_headers).data == b"%PDF"
+
+
+def test_reads_never_write_or_escape_the_root(app, client, student_headers):
+    missing = add_document(app, "does-not-exist.pdf")
+    escaping = add_document(app, "../secrets.pdf")
+
+    with count_queries(app) as statements:
+        assert client.get(f"/api/documents/{missing}/view", headers=student_headers).status_code == 404
+    assert not [s for s in statements if s.lstrip().upper().startswith("UPDATE")]
+    assert client.get(f"/api/documents/{escaping}/download", headers=student_headers).status_code == 404
+
+
+def test_reconcile_converts_legacy_absolute_paths(app, tmp_path):
+    with app.app_context():
+        root = document_storage.storage_root()
+    os.makedirs(root)
+    for name in ("inside.pdf", "moved.pdf"):
+        with open(os.path.join(root, name), "wb") as fh:
+            fh.write(b"x")
+
+    inside = add_document(app, os.path.join(root, "inside.pdf"))
+    moved = add_document(app, "C:\\old\\instance\\uploads\\moved.pdf")
+    lost = add_document(app, "/srv/old/uploads/lost.pdf")
+    keyed = add_document(app, "already.pdf")
+
+    with app.app_context():
+        preview = document_storage.reconcile_legacy_paths(dry_run=True)
+    assert preview == {"converted": 2, "missing": [lost]}
+    assert os.path.isabs(stored_path(app, inside))
+
+    with app.app_context():
+        result = document_storage.reconcile_legacy_paths(batch_size=1)
+    assert result == {"converted": 2, "missing": [lost]}
+    assert stored_path(app, inside) == "inside.pdf"
+    assert stored_path(app, moved) == "moved.pdf"
+    assert stored_path(app, lost) == "/srv/old/uploads/lost.pdf"
+    assert stored_path(app, keyed) == "already.pdf"
@@ -0,0 +1,128 @@
+import io
+import zipfile
+
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models import Document, DocumentText, User
+from app.services import document_text
+
+
+def upload(client, headers, payload: bytes, name: str):
+    return client.post(
+        "/api/documents",
+        data={"file": (io.BytesIO(payload), name)},
+        headers=headers,
+        content_type="multipart/form-data",
+    )
+
+
+def make_docx(*paragraphs: str) -> bytes:
+    body = "".join(f"<w:p><w:r><w:t>{text}</w:t></w:r></w:p>" for text in paragraphs)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr(
+            "word/document.xml",
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            f"<w:body>{body}</w:body></w:document>",
+        )
+    return buffer.getvalue()
+
+
+def make_pdf(line: str) -> bytes:
+    stream = f"BT /F1 12 Tf 72 720 Td ({line}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+    ]
+    out = io.BytesIO(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def search(client, headers, **params):
+    return client.get("/api/users/students/documents/search", query_string=params, headers=headers)
+
+
+def test_uploads_are_extracted_and_searchable(app, client, teacher_headers, student_headers):
+    upload(client, student_headers, make_pdf("IELTS Test Report Form overall band 7.5"), "scan.pdf")
+    upload(client, student_headers, make_docx("个人陈述", "我参加了雅思考试"), "statement.docx")
+    upload(client, student_headers, "成绩单 数学 95".encode("gb18030"), "grades.txt")
+    upload(client, student_headers, b"\x89PNG not text", "photo.png")
+
+    with app.app_context():
+        statuses = {row.document.file_type: row.status for row in DocumentText.query}
+    assert statuses == {"pdf": "done", "docx": "done", "txt": "done", "png": "unsupported"}
+
+    hits = search(client, teacher_headers, q="ielts").get_json()["results"]
+    assert [hit["document"]["name"] for hit in hits] == ["scan.pdf"]
+    assert "IELTS Test Report" in hits[0]["snippet"]
+    assert hits[0]["student"]["email"] == "student@test.com"
+    assert hits[0]["document"]["download_url"].endswith("/download")
+
+    assert [h["document"]["name"] for h in search(client, teacher_headers, q="雅思").get_json()["results"]] == [
+        "statement.docx"
+    ]
+    assert [h["document"]["name"] for h in search(client, teacher_headers, q="数学").get_json()["results"]] == [
+        "grades.txt"
+    ]
+    assert search(client, teacher_headers, q="ielts", grade="no-such-grade").get_json()["results"] == []
+
+
+def test_search_is_teacher_only_and_needs_a_query(client, teacher_headers, student_headers):
+    assert search(client, student_headers, q="ielts").status_code == 403
+    assert search(client, teacher_headers, q=" ").status_code == 400
+
+
+def test_index_follows_renames_deletes_and_shared_content(app, client, teacher_headers, student_headers):
+    payload = b"TOEFL iBT score report"
+    first = upload(client, student_headers, payload, "toefl.txt").get_json()["document"]["id"]
+    second = upload(client, student_headers, payload, "copy.txt").get_json()["document"]["id"]
+
+    client.put(f"/api/documents/{first}", json={"name": "english-certificate.txt"}, headers=student_headers)
+    names = {h["document"]["name"] for h in search(client, teacher_headers, q="toefl").get_json()["results"]}
+    assert names == {"english-certificate.txt", "copy.txt"}
+
+    client.delete(f"/api/documents/{first}", headers=student_headers)
+    hits = search(client, teacher_headers, q="toefl").get_json()["results"]
+    assert [hit["document"]["id"] for hit in hits] == [second]
+
+    with app.app_context():
+        assert db.session.get(DocumentText, first) is None
+        assert document_text.rebuild_index() == 1
+        matches = document_text.matches("toefl")
+        assert list(db.session.scalars(select(matches.c.document_id))) == [second]
+
+
+def test_corrupt_files_are_marked_failed(app, client, student_headers):
+    doc_id = upload(client, student_headers, b"%PDF-1.4 truncated", "broken.pdf").get_json()["document"]["id"]
+    with app.app_context():
+        record = db.session.get(DocumentText, doc_id)
+        assert record.status == "failed" and record.error
+        assert db.session.get(Document, doc_id) is not None
+
+
+def test_filters_total_and_limit_apply_in_sql(app, client, teacher_headers, student_headers):
+    for index in range(3):
+        upload(client, student_headers, f"GRE report {index}".encode(), f"gre{index}.txt")
+    with app.app_context():
+        User.query.filter_by(email="student@test.com").first().grade = "2025"
+        db.session.commit()
+
+    res = search(client, teacher_headers, q="gre", limit=1).get_json()
+    assert res["total"] == 3 and len(res["results"]) == 1
+    res = search(client, teacher_headers, q="gre", grade="2025", limit=2).get_json()
+    assert res["total"] == 3 and len(res["results"]) == 2
+    assert search(client, teacher_headers, q="gre", grade="2026").get_json()["total"] == 0
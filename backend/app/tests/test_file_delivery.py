@@ -0,0 +1,81 @@
+import io
+
+import pytest
+
+from app.services import file_delivery
+
+PAYLOAD = bytes(range(256)) * 64  # 16 KiB
+
+
+def upload_document(client, headers, name="transcript.pdf"):
+    res = client.post(
+        "/api/documents",
+        data={"file": (io.BytesIO(PAYLOAD), name)},
+        headers=headers,
+        content_type="multipart/form-data",
+    )
+    assert res.status_code == 201
+    return res.get_json()["document"]["id"]
+
+
+def test_inline_mode_supports_range_and_resume(client, student_headers):
+    doc_id = upload_document(client, student_headers)
+    url = f"/api/documents/{doc_id}/download"
+
+    full = client.get(url, headers=student_headers)
+    assert full.status_code == 200
+    assert full.headers["Accept-Ranges"] == "bytes"
+    assert full.data == PAYLOAD
+    validator = full.headers["ETag"]
+    full.close()
+
+    part = client.get(url, headers=dict(student_headers, Range="bytes=1000-1999"))
+    assert part.status_code == 206
+    assert part.headers["Content-Range"] == f"bytes 1000-1999/{len(PAYLOAD)}"
+    assert part.data == PAYLOAD[1000:2000]
+    part.close()
+
+    # Resuming with If-Range against an unchanged file continues from the offset.
+    resumed = client.get(url, headers=dict(student_headers, Range="bytes=8192-", **{"If-Range": validator}))
+    assert resumed.status_code == 206
+    assert resumed.data == PAYLOAD[8192:]
+    resumed.close()
+
+
+@pytest.mark.parametrize(
+    ("mode", "header"),
+    [("x-accel", "X-Accel-Redirect"), ("x-sendfile", "X-Sendfile")],
+)
+def test_offload_modes_hand_the_file_to_the_front_server(app, client, student_headers, teacher_headers, mode, header):
+    doc_id = upload_document(client, student_headers)
+    app.config["FILE_DELIVERY_MODE"] = mode
+
+    res = client.get(f"/api/documents/{doc_id}/download", headers=dict(student_headers, Range="bytes=0-9"))
+    assert res.status_code == 200
+    assert res.data == b""
+    assert res.headers["Content-Type"] == "application/pdf"
+    assert res.headers["Content-Disposition"] == "attachment; filename=transcript.pdf"
+    target = res.headers[header]
+    if mode == "x-accel":
+        assert target.startswith("/_protected/uploads/")
+    else:
+        assert target.endswith(".pdf") and target.startswith("/")
+
+    # Authorization still runs before anything is offloaded.
+    denied = client.get(f"/api/documents/{doc_id}/download", headers=teacher_headers)
+    assert denied.status_code == 404
+    assert header not in denied.headers
+
+
+def test_x_accel_maps_a_storage_root_outside_the_instance_folder(app, client, student_headers, tmp_path):
+    app.config.update(FILE_DELIVERY_MODE="x-accel", DOCUMENT_STORAGE_ROOT=str(tmp_path / "srv" / "documents"))
+    with pytest.raises(RuntimeError, match="DOCUMENT_STORAGE_ROOT"):
+        file_delivery.validate_config(app)
+
+    app.config["X_ACCEL_NAMESPACE_PREFIXES"] = {"documents": "/_documents"}
+    file_delivery.validate_config(app)
+    doc_id = upload_document(client, student_headers)
+    res = client.get(f"/api/documents/{doc_id}/download", headers=student_headers)
+    assert res.data == b""
+    assert res.headers["X-Accel-Redirect"].startswith("/_documents/")
+    assert res.headers["X-Accel-Redirect"].endswith(".pdf")
@@ -0,0 +1,69 @@
+from app.services.html_sanitizer import FEED_CHUNK_SIZE, sanitize
+
+
+def test_drops_active_content_and_event_handlers():
+    result = sanitize(
+        '<p onclick="steal()">Hi <b>there</b></p>'
+        "<script>alert(1)</script><style>p{}</style>"
+        '<iframe src="https://evil"><p>inner</p></iframe><embed src="x.swf">'
+        '<a href=" java\tscript:alert(1)">link</a>'
+    )
+    assert result.html == '<p>Hi <b>there</b></p><a href="#">link</a>'
+    assert "alert" not in result.text and "inner" not in result.text
+
+
+def test_text_and_cover_come_from_the_same_pass():
+    big_image = "data:image/png;base64," + "A" * 200_000
+    result = sanitize(
+        f'<h1>Title</h1><p>Fish &amp; chips&#33;</p><img src="{big_image}"><img src="/second.png">'
+    )
+    assert result.text == "Title Fish & chips!"
+    assert result.cover_image == big_image
+    assert result.html.startswith("<h1>Title</h1><p>Fish &amp; chips&#33;</p><img src=")
+
+
+def test_unsafe_image_is_not_used_as_cover():
+    result = sanitize('<img src="javascript:alert(1)"><img src="/ok.png" />')
+    assert result.cover_image == "/ok.png"
+    assert result.html == '<img src="#"><img src="/ok.png" />'
+
+
+def test_text_limit_stops_collecting():
+    result = sanitize("<p>" + "word " * 10_000 + "</p>", text_limit=100)
+    assert len(result.text) <= 100 and result.text.startswith("word word")
+
+
+def test_unterminated_trailing_markup_is_dropped():
+    assert sanitize("<p>x</p><img src=x onerror=alert(1)").html == "<p>x</p>"
+    assert sanitize("<p>a</p><!--<script>alert(1)</script>").html == "<p>a</p>"
+
+
+def test_comment_wrapped_script_stays_inert():
+    assert sanitize("<!--<script>alert(1)</script>-->ok").html == "ok"
+    result = sanitize("<script><!--</script><img src=x onerror=alert(1)>-->")
+    assert result.html == '<img src="x">--&gt;'
+
+
+def test_text_is_escaped():
+    assert sanitize("a & b < c").html == "a &amp; b &lt; c"
+    assert sanitize("Fish &amp; chips").html == "Fish &amp; chips"
+
+
+def test_unclosed_dropped_element_ends_with_its_parent():
+    result = sanitize("<div><iframe>hi</div><p>after</p>")
+    assert result.html == "<div></div><p>after</p>"
+    assert result.text == "after"
+
+
+def test_bare_ampersands_are_not_turned_into_references():
+    result = sanitize("<p>AT&T rocks &amp; Tom&Jerry</p>")
+    assert result.html == "<p>AT&amp;T rocks &amp; Tom&amp;Jerry</p>"
+    assert result.text == "AT&T rocks & Tom&Jerry"
+    assert sanitize("&#x; &#33; &#x21; &#0;").html == "&amp;#x; &#33; &#x21; &amp;#0;"
+
+
+def test_reference_split_across_chunks_is_kept():
+    content = "x" * (FEED_CHUNK_SIZE - 3) + "&amp; AT&T"
+    result = sanitize(content)
+    assert result.html.endswith("x&amp; AT&amp;T")
+    assert result.text.endswith("x& AT&T")
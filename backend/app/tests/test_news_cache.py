@@ -0,0 +1,109 @@
+import pytest
+
+from app.extensions import cache
+from app.services import news_cache
+
+
+@pytest.fixture()
+def cached_app(app):
+    # The testing config uses NullCache; switch this app to a real store.
+    cache.init_app(app, config={"CACHE_TYPE": "SimpleCache"})
+    news_cache.stats.reset()
+    yield app
+    news_cache.stats.reset()
+
+
+def create_news(client, headers, title):
+    res = client.post("/api/news", json={"title": title, "content": "<p>body</p>"}, headers=headers)
+    assert res.status_code == 201
+    return res.get_json()["id"]
+
+
+def test_list_and_detail_are_served_from_cache(cached_app, client, teacher_headers):
+    news_id = create_news(client, teacher_headers, "Cached")
+
+    first = client.get("/api/news").get_json()
+    second = client.get("/api/news").get_json()
+    assert first == second
+    client.get(f"/api/news/{news_id}")
+    client.get(f"/api/news/{news_id}")
+
+    stats = client.get("/api/news/cache/stats", headers=teacher_headers).get_json()
+    assert stats["backend"] == "SimpleCache"
+    assert stats["list"]["hits"] == 1 and stats["list"]["misses"] == 1
+    assert stats["detail"]["hits"] == 1 and stats["detail"]["misses"] == 1
+
+
+def test_writes_invalidate_cached_payloads(cached_app, client, teacher_headers):
+    news_id = create_news(client, teacher_headers, "Original")
+    assert client.get(f"/api/news/{news_id}").get_json()["title"] == "Original"
+    assert [n["title"] for n in client.get("/api/news").get_json()] == ["Original"]
+
+    client.put(f"/api/news/{news_id}", json={"title": "Edited"}, headers=teacher_headers)
+    assert client.get(f"/api/news/{news_id}").get_json()["title"] == "Edited"
+    assert [n["title"] for n in client.get("/api/news").get_json()] == ["Edited"]
+
+    create_news(client, teacher_headers, "Another")
+    assert len(client.get("/api/news").get_json()) == 2
+
+    client.delete(f"/api/news/{news_id}", headers=teacher_headers)
+    assert client.get(f"/api/news/{news_id}").status_code == 404
+    assert [n["title"] for n in client.get("/api/news").get_json()] == ["Another"]
+
+
+def test_stats_require_teacher(client, student_headers):
+    assert client.get("/api/news/cache/stats", headers=student_headers).status_code == 403
+
+
+def test_renaming_the_author_changes_etags_and_cached_payloads(cached_app, client, teacher_headers):
+    news_id = create_news(client, teacher_headers, "Byline")
+    detail = client.get(f"/api/news/{news_id}")
+    listing = client.get("/api/news")
+    old_name = detail.get_json()["author_name"]
+
+    with cached_app.app_context():
+        from app.extensions import db
+        from app.models import User
+
+        User.query.filter_by(email="teacher@test.com").first().name = "Renamed Teacher"
+        db.session.commit()
+
+    res = client.get(f"/api/news/{news_id}", headers={"If-None-Match": detail.headers["ETag"]})
+    assert res.status_code == 200
+    assert res.get_json()["author_name"] == "Renamed Teacher" != old_name
+    res = client.get("/api/news", headers={"If-None-Match": listing.headers["ETag"]})
+    assert res.status_code == 200 and res.get_json()[0]["author_name"] == "Renamed Teacher"
+
+
+def test_a_reader_racing_a_write_cannot_pin_a_stale_detail(cached_app, client, teacher_headers):
+    news_id = create_news(client, teacher_headers, "Before")
+    # Read by a request that missed the cache just before the edit below...
+    stale = client.get(f"/api/news/{news_id}").get_json()
+    client.put(f"/api/news/{news_id}", json={"title": "After"}, headers=teacher_headers)
+    with cached_app.app_context():
+        # ...and stored after the edit's delete.
+        cache.set(news_cache.detail_key(news_id), stale)
+
+    assert client.get(f"/api/news/{news_id}").get_json()["title"] == "After"
+
+
+def test_filesystem_cache_invalidation_reaches_other_processes(app, client, teacher_headers, tmp_path):
+    from app import create_app
+    from app.extensions import db
+
+    config = {"CACHE_TYPE": "FileSystemCache", "CACHE_DIR": str(tmp_path / "cache")}
+    cache.init_app(app, config=config)
+    other = create_app("testing")  # another worker sharing the cache directory
+    cache.init_app(other, config=config)
+
+    news_id = create_news(client, teacher_headers, "Shared")
+    assert [n["title"] for n in client.get("/api/news").get_json()] == ["Shared"]
+    with app.app_context():
+        db.session.execute(db.text("UPDATE news SET title = 'Changed' WHERE id = :id"), {"id": news_id})
+        db.session.commit()
+    assert [n["title"] for n in client.get("/api/news").get_json()] == ["Shared"]
+
+    with other.app_context():
+        news_cache.invalidate(news_id)
+    assert [n["title"] for n in client.get("/api/news").get_json()] == ["Changed"]
+    assert client.get("/api/news/cache/stats", headers=teacher_headers).get_json()["backend"] == "FileSystemCache"
@@ -0,0 +1,98 @@
+import io
+import os
+import time
+
+from app.services import news_images
+
+
+def upload(client, headers, data: bytes, name="banner.png"):
+    return client.post(
+        "/api/news/upload_image",
+        data={"file": (io.BytesIO(data), name)},
+        headers=headers,
+        content_type="multipart/form-data",
+    )
+
+
+def test_same_bytes_are_stored_once(app, client, teacher_headers):
+    first = upload(client, teacher_headers, b"\x89PNG same bytes")
+    second = upload(client, teacher_headers, b"\x89PNG same bytes", name="copy.jpg")
+    assert first.status_code == 201
+    assert second.status_code == 200
+    assert second.get_json()["deduplicated"] is True
+    assert first.get_json()["url"] == second.get_json()["url"]
+
+    filename = first.get_json()["filename"]
+    with app.app_context():
+        path = news_images.path_for(filename)
+        root = news_images.upload_root()
+    assert os.path.relpath(path, root) == os.path.join(filename[:2], filename[2:4], filename)
+
+    res = client.get(first.get_json()["url"])
+    assert res.status_code == 200
+    assert res.data == b"\x89PNG same bytes"
+    res.close()
+
+
+def test_gc_removes_only_unreferenced_images(app, client, teacher_headers):
+    kept = upload(client, teacher_headers, b"kept image").get_json()
+    orphan = upload(client, teacher_headers, b"orphan image").get_json()
+    fresh = upload(client, teacher_headers, b"fresh image").get_json()
+    client.post(
+        "/api/news",
+        json={"title": "With image", "content": f'<p><img src="{kept["url"]}"></p>'},
+        headers=teacher_headers,
+    )
+
+    with app.app_context():
+        old = time.time() - 2 * news_images.GC_GRACE_SECONDS
+        for item in (kept, orphan):
+            os.utime(news_images.path_for(item["filename"]), (old, old))
+
+        removed = news_images.collect_garbage()
+        assert removed == [orphan["filename"]]
+        assert os.path.exists(news_images.path_for(kept["filename"]))
+        assert os.path.exists(news_images.path_for(fresh["filename"]))
+        assert not os.path.exists(news_images.path_for(orphan["filename"]))
+
+
+def make_png(width=1200, height=800) -> bytes:
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_upload_generates_variants_and_list_exposes_them(app, client, teacher_headers):
+    from PIL import Image
+
+    uploaded = upload(client, teacher_headers, make_png()).get_json()
+    client.post(
+        "/api/news",
+        json={"title": "Cover", "content": "<p>x</p>", "cover_image": uploaded["url"]},
+        headers=teacher_headers,
+    )
+
+    item = client.get("/api/news").get_json()[0]
+    variants = item["cover_variants"]
+    assert set(variants) == {"thumb", "thumb_webp", "webp"}
+
+    res = client.get(variants["thumb_webp"])
+    assert res.status_code == 200
+    thumb = Image.open(io.BytesIO(res.data))
+    assert thumb.format == "WEBP" and thumb.width == 480
+    res.close()
+
+    detail = client.get(f"/api/news/{item['id']}").get_json()
+    assert "cover_variants" not in detail
+
+
+def test_missing_variant_falls_back_to_original(app, client, teacher_headers):
+    uploaded = upload(client, teacher_headers, b"not really an image").get_json()
+    with app.app_context():
+        thumb_url = news_images.variant_urls(uploaded["url"])["thumb"]
+    res = client.get(thumb_url)
+    assert res.status_code == 200
+    assert res.data == b"not really an image"
+    res.close()
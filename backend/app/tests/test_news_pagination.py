@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models import News, User
+
+
+def seed_news(app, count: int) -> list[int]:
+    with app.app_context():
+        author = User.query.filter_by(email="teacher@test.com").first()
+        base = datetime(2026, 1, 1)
+        rows = []
+        for i in range(count):
+            # Pairs share a timestamp so the id tiebreaker is exercised.
+            rows.append(
+                News(
+                    title=f"Article {i}",
+                    summary=f"summary {i}",
+                    content="<p>x</p>",
+                    created_by=author.id,
+                    created_at=base + timedelta(minutes=i // 2),
+                )
+            )
+        db.session.add_all(rows)
+        db.session.commit()
+        ordered = sorted(rows, key=lambda n: (n.created_at, n.id), reverse=True)
+        return [n.id for n in ordered]
+
+
+def test_cursor_pages_cover_every_row_once(app, client):
+    expected = seed_news(app, 7)
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        res = client.get("/api/news", query_string=params)
+        assert res.status_code == 200
+        body = res.get_json()
+        assert len(body["items"]) <= 3
+        seen.extend(item["id"] for item in body["items"])
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+
+    assert seen == expected
+
+
+def test_legacy_mode_returns_plain_array(app, client):
+    expected = seed_news(app, 4)
+    res = client.get("/api/news")
+    assert [item["id"] for item in res.get_json()] == expected
+
+
+def test_search_pages_by_offset(app, client):
+    seed_news(app, 5)
+    first = client.get("/api/news", query_string={"q": "article", "limit": 2}).get_json()
+    second = client.get(
+        "/api/news", query_string={"q": "article", "limit": 2, "cursor": first["next_cursor"]}
+    ).get_json()
+
+    assert len(first["items"]) == 2 and len(second["items"]) == 2
+    assert not {i["id"] for i in first["items"]} & {i["id"] for i in second["items"]}
+
+
+def test_invalid_cursor_is_rejected(client):
+    res = client.get("/api/news", query_string={"limit": 5, "cursor": "not-a-cursor"})
+    assert res.status_code == 400
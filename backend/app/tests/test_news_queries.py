@@ -0,0 +1,62 @@
+from app.extensions import db
+from app.models import News, User
+from app.tests.helpers import count_queries
+
+
+def seed_news(app, count: int) -> None:
+    with app.app_context():
+        authors = [
+            User.query.filter_by(email="teacher@test.com").first(),
+            User.query.filter_by(email="student@test.com").first(),
+        ]
+        db.session.add_all(
+            News(
+                title=f"Guide {i}",
+                summary="summary",
+                content="<p>x</p>",
+                created_by=authors[i % 2].id,
+            )
+            for i in range(count)
+        )
+        db.session.commit()
+
+
+def queries_for(app, client, count: int, **params) -> int:
+    seed_news(app, count)
+    with count_queries(app) as statements:
+        res = client.get("/api/news", query_string=params)
+    assert res.status_code == 200
+    return len(statements)
+
+
+def test_list_query_count_is_constant(app, client):
+    small = queries_for(app, client, 3)
+    with app.app_context():
+        News.query.delete()
+        db.session.commit()
+    large = queries_for(app, client, 40)
+    assert small == large
+
+
+def test_search_query_count_is_constant(app, client):
+    small = queries_for(app, client, 3, q="guide")
+    large = queries_for(app, client, 40, q="guide")
+    assert small == large
+
+
+def test_list_payload_has_author_names(app, client):
+    seed_news(app, 2)
+    names = {item["author_name"] for item in client.get("/api/news").get_json()}
+    assert names == {"Teacher Test", "Student Test"}
+
+
+def test_detail_resolves_author_in_one_query(app, client):
+    seed_news(app, 1)
+    with app.app_context():
+        news_id = News.query.first().id
+    with count_queries(app) as statements:
+        res = client.get(f"/api/news/{news_id}")
+    assert res.get_json()["author_name"] in {"Teacher Test", "Student Test"}
+    # The conditional-GET validator reads news.updated_at on its own; the
+    # article and its author come back together in a single joined query.
+    assert len([sql for sql in statements if "user" in sql]) == 1
@@ -0,0 +1,100 @@
+from app.services import news_search
+
+
+def create_news(client, headers, title, summary=""):
+    res = client.post(
+        "/api/news",
+        json={"title": title, "content": f"<p>{title}</p>", "summary": summary},
+        headers=headers,
+    )
+    assert res.status_code == 201
+    return res.get_json()["id"]
+
+
+def search(client, keyword):
+    res = client.get("/api/news", query_string={"q": keyword})
+    assert res.status_code == 200
+    return [item["id"] for item in res.get_json()]
+
+
+def test_tokenize_splits_cjk_into_bigrams():
+    assert news_search.tokenize("留学生 Guide") == ["留学", "学生", "生", "guide"]
+
+
+def test_search_matches_cjk_substrings_and_prefixes(client, teacher_headers):
+    first = create_news(client, teacher_headers, "英国留学申请指南")
+    second = create_news(client, teacher_headers, "Scholarship deadlines", summary="美国奖学金")
+
+    assert search(client, "留学") == [first]
+    assert search(client, "学申") == [first]
+    assert search(client, "英") == [first]
+    assert search(client, "schol") == [second]
+    assert search(client, "奖学金") == [second]
+    assert sorted(search(client, "teacher")) == sorted([first, second])
+    assert search(client, "留学 scholarship") == []
+
+
+def test_search_ranks_title_matches_first(client, teacher_headers):
+    summary_hit = create_news(client, teacher_headers, "Weekly notes", summary="visa interview tips")
+    title_hit = create_news(client, teacher_headers, "Visa interview checklist")
+
+    assert search(client, "visa") == [title_hit, summary_hit]
+
+
+def test_index_follows_update_and_delete(client, teacher_headers):
+    news_id = create_news(client, teacher_headers, "Campus tour", summary="Guided visit")
+
+    res = client.put(f"/api/news/{news_id}", json={"title": "Open day"}, headers=teacher_headers)
+    assert res.status_code == 200
+    assert search(client, "campus") == []
+    assert search(client, "open") == [news_id]
+
+    res = client.delete(f"/api/news/{news_id}", headers=teacher_headers)
+    assert res.status_code == 200
+    assert search(client, "open") == []
+
+
+def test_reindex_command_backfills(app, client, teacher_headers):
+    news_id = create_news(client, teacher_headers, "Backfill me")
+    with app.app_context():
+        from app.extensions import db
+
+        db.session.execute(db.text("DELETE FROM news_fts"))
+        db.session.commit()
+    assert search(client, "backfill") == []
+
+    result = app.test_cli_runner().invoke(args=["news", "reindex"])
+    assert "Indexed 1 news articles." in result.output
+    assert search(client, "backfill") == [news_id]
+
+
+def test_unpaginated_search_returns_every_hit(app, client, teacher_headers):
+    with app.app_context():
+        from app.extensions import db
+        from app.models import News, User
+
+        author = User.query.filter_by(email="teacher@test.com").first()
+        db.session.add_all(
+            News(title=f"Exchange programme {index}", content="<p>x</p>", created_by=author.id) for index in range(520)
+        )
+        db.session.commit()
+
+    assert len(search(client, "exchange")) == 520
+    page = client.get("/api/news", query_string={"q": "exchange", "limit": 50}).get_json()
+    assert len(page["items"]) == 50 and page["next_cursor"]
+
+
+def test_renaming_an_author_reindexes_their_news(app, client, teacher_headers):
+    news_id = create_news(client, teacher_headers, "Interview workshop")
+    assert search(client, "ophelia") == []
+
+    with app.app_context():
+        from app.extensions import db
+        from app.models import User
+
+        User.query.filter_by(email="teacher@test.com").first().name = "Ophelia 王老师"
+        db.session.commit()
+
+    assert search(client, "ophelia") == [news_id]
+    assert search(client, "王老") == [news_id]
+    assert search(client, "interview") == [news_id]
@@ -0,0 +1,170 @@
+import io
+import os
+
+import pytest
+
+from app.services.storage import LocalStorage, S3Storage, StorageBackend, fanout_key
+
+PAYLOAD = os.urandom(200 * 1024)
+
+
+class ReadOnlyStream:
+    """Non-seekable request-body stand-in."""
+
+    def __init__(self, data: bytes) -> None:
+        self.buffer = io.BytesIO(data)
+
+    def read(self, size=-1):
+        return self.buffer.read(size)
+
+
+@pytest.fixture
+def s3_backend():
+    moto = pytest.importorskip("moto")
+
+    with moto.mock_aws():
+        backend = S3Storage("test-uploads", prefix="documents", region_name="us-east-1")
+        backend.client.create_bucket(Bucket="test-uploads")
+        yield backend
+
+
+@pytest.fixture(params=["local", "s3"])
+def backend(request, tmp_path):
+    if request.param == "local":
+        return LocalStorage(str(tmp_path / "store"))
+    return request.getfixturevalue("s3_backend")
+
+
+def test_round_trip_stream_list_and_delete(backend):
+    key = fanout_key("abcdef0123.bin")
+    assert key == "ab/cd/abcdef0123.bin"
+    assert backend.put(key, ReadOnlyStream(PAYLOAD)) == len(PAYLOAD)
+
+    assert backend.exists(key) and backend.size(key) == len(PAYLOAD)
+    chunks = list(backend.stream(key, chunk_size=16 * 1024))
+    assert max(len(chunk) for chunk in chunks) <= 16 * 1024
+    assert b"".join(chunks) == PAYLOAD
+    with backend.open(key) as handle:
+        assert handle.read(4) == PAYLOAD[:4]
+    assert [(item.key, item.size) for item in backend.list("ab/")] == [(key, len(PAYLOAD))]
+
+    backend.touch(key)
+    assert backend.delete(key)
+    assert not backend.exists(key)
+    with pytest.raises(FileNotFoundError):
+        backend.open(key)
+
+
+def test_s3_touch_keeps_content_type_and_metadata(s3_backend):
+    s3_backend.client.put_object(
+        Bucket="test-uploads",
+        Key="documents/ab/cd/abcd.pdf",
+        Body=b"%PDF",
+        ContentType="application/pdf",
+        Metadata={"sha256": "abc"},
+    )
+    s3_backend.touch("ab/cd/abcd.pdf")
+    head = s3_backend.client.head_object(Bucket="test-uploads", Key="documents/ab/cd/abcd.pdf")
+    assert head["ContentType"] == "application/pdf"
+    assert head["Metadata"] == {"sha256": "abc"}
+    with pytest.raises(FileNotFoundError):
+        s3_backend.touch("ab/cd/missing.pdf")
+
+
+def test_backends_must_implement_every_operation():
+    class Partial(StorageBackend):
+        def put(self, key, stream):
+            return 0
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_put_file_moves_the_source(backend, tmp_path):
+    source = tmp_path / "partial"
+    source.write_bytes(PAYLOAD)
+    backend.put_file("12/34/1234.pdf", str(source))
+    assert not source.exists()
+    assert b"".join(backend.stream("12/34/1234.pdf")) == PAYLOAD
+
+
+@pytest.mark.parametrize("key", ["", "../escape.pdf", "/etc/passwd", "a/../../b"])
+def test_keys_cannot_escape_the_namespace(backend, key):
+    with pytest.raises(FileNotFoundError):
+        backend.open(key)
+
+
+def test_presigned_url_only_for_remote_backends(tmp_path, s3_backend):
+    assert LocalStorage(str(tmp_path)).presigned_url("a.pdf") is None
+    url = s3_backend.presigned_url("a.pdf", download_name="简历.pdf", as_attachment=True)
+    assert "/test-uploads/documents/a.pdf?" in url
+    assert "X-Amz-Signature=" in url and "response-content-disposition=attachment" in url
+
+
+def test_documents_and_news_go_through_s3(app, client, student_headers, teacher_headers, s3_backend):
+    app.config.update(STORAGE_BACKEND="s3", S3_BUCKET="test-uploads", S3_REGION="us-east-1")
+    app.extensions["storage"] = {}
+    res = client.post(
+        "/api/documents",
+        data={"file": (io.BytesIO(PAYLOAD), "cv.pdf")},
+        headers=student_headers,
+        content_type="multipart/form-data",
+    )
+    doc_id = res.get_json()["document"]["id"]
+    assert not os.path.exists(os.path.join(app.instance_path, "uploads"))
+
+    download = client.get(f"/api/documents/{doc_id}/download", headers=student_headers)
+    assert download.status_code == 200 and download.data == PAYLOAD
+    assert download.headers["Content-Length"] == str(len(PAYLOAD))
+    assert download.headers["Content-Disposition"].startswith("attachment")
+
+    app.config["STORAGE_PRESIGNED_REDIRECTS"] = True
+    redirected = client.get(f"/api/documents/{doc_id}/view", headers=student_headers)
+    assert redirected.status_code == 302
+    assert "X-Amz-Signature=" in redirected.headers["Location"]
+
+    uploaded = client.post(
+        "/api/news/upload_image",
+        data={"file": (io.BytesIO(b"\x89PNG s3 bytes"), "banner.png")},
+        headers=teacher_headers,
+        content_type="multipart/form-data",
+    )
+    assert uploaded.status_code == 201
+    filename = uploaded.get_json()["filename"]
+    news = S3Storage("test-uploads", prefix="news", client=s3_backend.client)
+    assert [item.key for item in news.list()] == [fanout_key(filename)]
+    app.config["STORAGE_PRESIGNED_REDIRECTS"] = False
+    served = client.get(uploaded.get_json()["url"])
+    assert served.status_code == 200 and served.data == b"\x89PNG s3 bytes"
+    assert served.mimetype == "image/png"
+
+
+def test_s3_proxy_answers_range_and_if_range(app, client, student_headers, s3_backend):
+    app.config.update(STORAGE_BACKEND="s3", S3_BUCKET="test-uploads", S3_REGION="us-east-1")
+    app.extensions["storage"] = {}
+    res = client.post(
+        "/api/documents",
+        data={"file": (io.BytesIO(PAYLOAD), "cv.pdf")},
+        headers=student_headers,
+        content_type="multipart/form-data",
+    )
+    url = f"/api/documents/{res.get_json()['document']['id']}/download"
+
+    full = client.get(url, headers=student_headers)
+    assert full.status_code == 200 and full.headers["Accept-Ranges"] == "bytes"
+    part = client.get(url, headers=dict(student_headers, Range="bytes=1000-1999"))
+    assert part.status_code == 206 and part.data == PAYLOAD[1000:2000]
+    assert part.headers["Content-Range"] == f"bytes 1000-1999/{len(PAYLOAD)}"
+
+    resumed = client.get(url, headers=dict(student_headers, Range="bytes=8192-", **{"If-Range": full.headers["ETag"]}))
+    assert resumed.status_code == 206 and resumed.data == PAYLOAD[8192:]
+    stale = client.get(url, headers=dict(student_headers, Range="bytes=8192-", **{"If-Range": '"other"'}))
+    assert stale.status_code == 200 and stale.data == PAYLOAD
+    assert client.get(url, headers=dict(student_headers, Range=f"bytes={len(PAYLOAD)}-")).status_code == 416
+    assert client.get(url, headers=dict(student_headers, **{"If-None-Match": full.headers["ETag"]})).status_code == 304
+
+
+def test_stream_reads_a_byte_range(backend):
+    backend.put("ab/cd/range.bin", ReadOnlyStream(PAYLOAD))
+    assert b"".join(backend.stream("ab/cd/range.bin", chunk_size=1000, start=5, stop=4005)) == PAYLOAD[5:4005]
+    assert backend.stat("ab/cd/range.bin").size == len(PAYLOAD)
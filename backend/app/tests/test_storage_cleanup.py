@@ -0,0 +1,125 @@
+import io
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.extensions import db
+from app.models import Document, StorageDeletion, User
+from app.services import document_previews, document_storage, storage_cleanup, storage_quota
+from app.services.storage import LocalStorage
+
+from .test_document_text_search import upload
+
+DAY = 24 * 3600
+
+
+def stored_keys(app, namespace_storage) -> list[str]:
+    with app.app_context():
+        return sorted(item.key for item in namespace_storage().list())
+
+
+def age(backend, key: str, seconds: int = 2 * DAY) -> None:
+    stamp = time.time() - seconds
+    os.utime(backend.local_path(key), (stamp, stamp))
+
+
+def test_delete_queues_the_file_and_the_worker_removes_it(app, client, student_headers):
+    doc_id = upload(client, student_headers, b"%PDF transcript", "transcript.pdf").get_json()["document"]["id"]
+    assert len(stored_keys(app, document_storage.storage)) == 1
+
+    assert client.delete(f"/api/documents/{doc_id}", headers=student_headers).status_code == 200
+    assert stored_keys(app, document_storage.storage) == []
+    with app.app_context():
+        assert StorageDeletion.query.count() == 0
+
+
+def test_failed_commit_keeps_the_row_and_its_file(app, client, student_headers, monkeypatch):
+    doc_id = upload(client, student_headers, b"%PDF transcript", "transcript.pdf").get_json()["document"]["id"]
+
+    def broken(*_args):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(storage_quota, "uncharge", broken)
+    assert client.delete(f"/api/documents/{doc_id}", headers=student_headers).status_code == 500
+    with app.app_context():
+        document = db.session.get(Document, doc_id)
+        assert document is not None and StorageDeletion.query.count() == 0
+        assert document_storage.storage().exists(document.file_path)
+
+
+def test_failed_deletions_are_retried_with_backoff(app, monkeypatch):
+    with app.app_context():
+        backend = document_storage.storage()
+        backend.put("ab/cd/stale.pdf", io.BytesIO(b"x"))
+        storage_cleanup.schedule("documents", "ab/cd/stale.pdf")
+        db.session.commit()
+
+        def unavailable(self, key):
+            raise OSError("disk busy")
+
+        with monkeypatch.context() as patched:
+            patched.setattr(LocalStorage, "delete", unavailable)
+            assert storage_cleanup.process_pending()["failed"] == 1
+        row = StorageDeletion.query.one()
+        assert row.attempts == 1 and row.last_error == "disk busy"
+
+        # Not due yet, then deleted once the backoff has passed.
+        assert storage_cleanup.process_pending() == {"deleted": 0, "kept": 0, "failed": 0}
+        later = datetime.utcnow() + timedelta(seconds=storage_cleanup.RETRY_DELAYS[0] + 1)
+        assert storage_cleanup.process_pending(now=later)["deleted"] == 1
+        assert not backend.exists("ab/cd/stale.pdf")
+
+
+def test_sweep_queues_only_old_unreferenced_files(app, client, student_headers):
+    doc_id = upload(client, student_headers, b"kept notes", "notes.txt").get_json()["document"]["id"]
+    with app.app_context():
+        documents = document_storage.storage()
+        kept = db.session.get(Document, doc_id).file_path
+        documents.put("aa/bb/orphan-old.pdf", io.BytesIO(b"old"))
+        documents.put("aa/bb/orphan-new.pdf", io.BytesIO(b"new"))
+        for key in (kept, "aa/bb/orphan-old.pdf"):
+            age(documents, key)
+
+        previews = document_previews.storage()
+        kept_preview = document_previews.find_preview(db.session.get(Document, doc_id))[0]
+        previews.put("ff/ee/" + "f" * 64 + ".webp", io.BytesIO(b"stale preview"))
+        for key in (kept_preview, "ff/ee/" + "f" * 64 + ".webp"):
+            age(previews, key)
+
+        assert storage_cleanup.sweep(dry_run=True)["documents"] == ["aa/bb/orphan-old.pdf"]
+        found = storage_cleanup.sweep()
+        assert found["documents"] == ["aa/bb/orphan-old.pdf"]
+        assert found["previews"] == ["ff/ee/" + "f" * 64 + ".webp"]
+        # Already queued objects are not queued twice.
+        assert storage_cleanup.sweep()["documents"] == []
+
+        assert storage_cleanup.process_pending()["deleted"] == 2
+        assert sorted(item.key for item in documents.list()) == sorted([kept, "aa/bb/orphan-new.pdf"])
+        assert [item.key for item in previews.list()] == [kept_preview]
+
+
+@pytest.mark.parametrize("limit", [1, 2])
+def test_sweep_is_bounded(app, limit):
+    with app.app_context():
+        documents = document_storage.storage()
+        for name in ("a", "b", "c"):
+            documents.put(f"aa/bb/{name}.pdf", io.BytesIO(b"x"))
+            age(documents, f"aa/bb/{name}.pdf")
+        assert len(storage_cleanup.sweep_orphans("documents", batch_size=1, limit=limit)) == limit
+
+
+def test_sweep_skips_documents_while_legacy_paths_remain(app):
+    with app.app_context():
+        documents = document_storage.storage()
+        documents.put("legacy.pdf", io.BytesIO(b"x"))
+        age(documents, "legacy.pdf")
+        student = User.query.filter_by(email="student@test.com").first()
+        legacy_path = documents.local_path("legacy.pdf")
+        db.session.add(
+            Document(user_id=student.id, name="cv", original_name="cv.pdf", file_path=legacy_path, file_type="pdf")
+        )
+        db.session.commit()
+        assert storage_cleanup.sweep_orphans("documents") == []
+        assert documents.exists("legacy.pdf")
@@ -0,0 +1,95 @@
+import io
+import os
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from app.extensions import db
+from app.models import User
+from app.services import document_storage, storage_quota
+
+PAYLOAD = os.urandom(100 * 1024)
+
+
+def upload(client, headers, payload=PAYLOAD, name="transcript.pdf"):
+    return client.post(
+        "/api/documents",
+        data={"file": (io.BytesIO(payload), name)},
+        headers=headers,
+        content_type="multipart/form-data",
+    )
+
+
+def set_student(app, **values) -> int:
+    with app.app_context():
+        student = User.query.filter_by(email="student@test.com").first()
+        for name, value in values.items():
+            setattr(student, name, value)
+        db.session.commit()
+        return student.id
+
+
+def test_usage_follows_uploads_and_deletes(app, client, student_headers):
+    first = upload(client, student_headers).get_json()["document"]["id"]
+    upload(client, student_headers, payload=b"%PDF small")
+
+    usage = client.get("/api/documents/usage", headers=student_headers).get_json()
+    assert usage["used"] == len(PAYLOAD) + 10
+    assert usage["quota"] == app.config["STORAGE_QUOTAS"]["student"]
+
+    client.delete(f"/api/documents/{first}", headers=student_headers)
+    assert client.get("/api/documents/usage", headers=student_headers).get_json()["used"] == 10
+
+
+def test_uploads_past_the_quota_are_rejected_and_not_stored(app, client, student_headers):
+    set_student(app, storage_quota=len(PAYLOAD) + 1000)
+    assert upload(client, student_headers).status_code == 201
+
+    res = upload(client, student_headers, payload=os.urandom(50 * 1024))
+    assert res.status_code == 413
+    assert res.get_json()["usage"]["remaining"] == 1000
+    with app.app_context():
+        assert len(list(document_storage.storage().list())) == 1
+
+    # Chunked uploads are checked when the session is created.
+    res = client.post("/api/documents/uploads", json={"filename": "big.pdf", "size": 5000}, headers=student_headers)
+    assert res.status_code == 413
+
+
+def test_streaming_write_stops_at_the_limit(app):
+    with app.test_request_context():
+        upload_file = FileStorage(io.BytesIO(PAYLOAD), "scan.pdf")
+        with pytest.raises(storage_quota.QuotaExceeded):
+            document_storage.save_upload(upload_file, "pdf", limit=64 * 1024)
+        # No object and no half-written temp file is left behind.
+        assert [files for _, _, files in os.walk(document_storage.storage_root()) if files] == []
+
+
+def test_teacher_usage_report_quota_override_and_reconcile(app, client, teacher_headers, student_headers):
+    upload(client, student_headers)
+    student_id = set_student(app, storage_used=5)  # simulate drift
+
+    report = client.get("/api/users/storage-usage", headers=teacher_headers).get_json()
+    assert report["users"][0]["id"] == student_id and report["users"][0]["used"] == 5
+    assert client.get("/api/users/storage-usage", headers=student_headers).status_code == 403
+
+    res = client.put(f"/api/users/{student_id}/storage-quota", json={"quota": 2048}, headers=teacher_headers)
+    assert res.get_json()["quota"] == 2048
+    assert client.put(f"/api/users/{student_id}/storage-quota", json={"quota": -1}, headers=teacher_headers).status_code == 400
+
+    with app.app_context():
+        result = storage_quota.reconcile(batch_size=1)
+        assert result["corrected"] == [student_id]
+        assert db.session.get(User, student_id).storage_used == len(PAYLOAD)
+        assert storage_quota.reconcile()["corrected"] == []
+
+
+def test_teachers_cannot_change_teacher_quotas(app, client, teacher_headers):
+    with app.app_context():
+        teacher_id = User.query.filter_by(email="teacher@test.com").first().id
+
+    res = client.put(f"/api/users/{teacher_id}/storage-quota", json={"quota": 10**12}, headers=teacher_headers)
+    assert res.status_code == 404
+    with app.app_context():
+        assert db.session.get(User, teacher_id).storage_quota is None
+    assert client.put("/api/users/9999/storage-quota", json={"quota": 1}, headers=teacher_headers).status_code == 404
@@ -0,0 +1,107 @@
+from datetime import date
+
+import jwt
+
+from app.extensions import db
+from app.models import Application, Appointment, School, User
+from app.models.document import Document
+from app.tests.helpers import count_queries
+
+
+def seed_student(app) -> int:
+    with app.app_context():
+        student = User.query.filter_by(email="student@test.com").first()
+        teacher = User.query.filter_by(email="teacher@test.com").first()
+        school = School(name="UCL", city="London", country="UK")
+        db.session.add(school)
+        db.session.flush()
+        db.session.add_all(
+            Document(user_id=student.id, name=f"doc{i}", original_name=f"doc{i}.pdf", file_path=f"doc{i}.pdf", file_type="pdf")
+            for i in range(3)
+        )
+        db.session.add(
+            Appointment(
+                student_id=student.id,
+                teacher_id=teacher.id,
+                appointment_date=date(2026, 11, 2),
+                time_slot="09:00-10:00",
+                appointment_type="咨询",
+            )
+        )
+        db.session.add(Application(user_id=student.id, school_id=school.id, status="submitted"))
+        db.session.commit()
+        return student.id
+
+
+def test_detail_embeds_requested_collections_in_batched_queries(app, client, teacher_headers):
+    student_id = seed_student(app)
+
+    with count_queries(app) as statements:
+        res = client.get(
+            f"/api/users/students/{student_id}?include=documents,appointments,applications",
+            headers=teacher_headers,
+        )
+    assert res.status_code == 200
+    body = res.get_json()
+    assert body["document_count"] == 3
+    assert body["appointments"][0]["teacher"]["name"] == "Teacher Test"
+    assert body["applications"][0]["school"]["name"] == "UCL"
+    # Teacher lookup, student, then one query per included collection.
+    assert len(statements) <= 5
+
+    default = client.get(f"/api/users/students/{student_id}", headers=teacher_headers).get_json()
+    assert set(default) == {"student", "documents", "document_count"}
+    bad = client.get(f"/api/users/students/{student_id}?include=grades", headers=teacher_headers)
+    assert bad.status_code == 400
+
+
+def test_batch_runs_subrequests_with_each_endpoints_permissions(app, client, teacher_headers, student_headers):
+    student_id = seed_student(app)
+    requests = [
+        {"id": "detail", "path": f"/api/users/students/{student_id}?include=appointments"},
+        {"id": "roster", "path": "/api/users/students?page_size=5"},
+        {"id": "missing", "path": "/api/users/students/999999"},
+    ]
+
+    res = client.post("/api/batch", json={"requests": requests}, headers=teacher_headers)
+    assert res.status_code == 200
+    responses = {item["id"]: item for item in res.get_json()["responses"]}
+    assert responses["detail"]["status"] == 200
+    assert len(responses["detail"]["body"]["appointments"]) == 1
+    assert responses["roster"]["body"]["total"] >= 1
+    assert responses["missing"]["status"] == 404
+    assert "no-store" in res.headers["Cache-Control"]
+
+    etag = responses["roster"]["headers"]["ETag"]
+    revalidate = [{"id": "roster", "path": "/api/users/students?page_size=5", "headers": {"If-None-Match": etag}}]
+    res = client.post("/api/batch", json={"requests": revalidate}, headers=teacher_headers)
+    assert res.get_json()["responses"][0]["status"] == 304
+
+    res = client.post("/api/batch", json={"requests": requests[1:2]}, headers=student_headers)
+    assert res.get_json()["responses"][0]["status"] == 403
+
+
+def test_batch_rejects_writes_and_bad_tokens(client, teacher_headers):
+    write = [{"method": "POST", "path": "/api/news"}]
+    assert client.post("/api/batch", json={"requests": write}, headers=teacher_headers).status_code == 400
+    nested = [{"path": "/api/batch"}]
+    assert client.post("/api/batch", json={"requests": nested}, headers=teacher_headers).status_code == 400
+    bad_token = {"Authorization": "Bearer not-a-token"}
+    assert client.post("/api/batch", json={"requests": [{"path": "/api/news"}]}, headers=bad_token).status_code in (401, 422)
+
+
+def test_batch_verifies_the_token_once(app, client, teacher_headers, monkeypatch):
+    decodes = []
+    original = jwt.decode
+
+    def counting(*args, **kwargs):
+        # flask_jwt_extended also peeks at the claims unverified (for the key loader); count signature checks.
+        if (kwargs.get("options") or {}).get("verify_signature", True):
+            decodes.append(1)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(jwt, "decode", counting)
+    requests = [{"id": i, "path": "/api/users/students?page_size=5"} for i in range(5)]
+    res = client.post("/api/batch", json={"requests": requests}, headers=teacher_headers)
+    assert [item["status"] for item in res.get_json()["responses"]] == [200] * 5
+    assert len(decodes) == 1
@@ -0,0 +1,63 @@
+from app.extensions import db
+from app.models import User
+from app.models.document import Document
+from app.tests.helpers import count_queries
+
+
+def seed_students(app, count: int) -> None:
+    with app.app_context():
+        for i in range(count):
+            student = User(
+                email=f"roster{i}@test.com",
+                name=f"Student {i:02d}",
+                role="student",
+                grade="2024" if i % 2 else "2025",
+                class_name=f"Class {i % 3}",
+            )
+            student.set_password("x")
+            db.session.add(student)
+            db.session.flush()
+            db.session.add_all(
+                Document(
+                    user_id=student.id,
+                    name=f"doc{j}",
+                    original_name=f"doc{j}.pdf",
+                    file_path=f"doc{j}.pdf",
+                    file_type="pdf",
+                )
+                for j in range(i % 4)
+            )
+        db.session.commit()
+
+
+def test_roster_pages_with_counts_in_constant_queries(app, client, teacher_headers):
+    seed_students(app, 30)
+
+    with count_queries(app) as statements:
+        res = client.get("/api/users/students?page=2&page_size=10&sort=name&order=asc", headers=teacher_headers)
+    assert res.status_code == 200
+    body = res.get_json()
+    # Seeded students plus the default student account.
+    assert body["total"] == 31
+    assert body["pages"] == 4
+    assert [s["name"] for s in body["students"]][:2] == ["Student 10", "Student 11"]
+    assert body["students"][0]["document_count"] == 10 % 4
+    assert len([s for s in statements if "document" in s.lower()]) <= 2
+
+
+def test_roster_filters_and_sorts_by_document_count(app, client, teacher_headers, student_headers):
+    seed_students(app, 12)
+
+    res = client.get(
+        "/api/users/students?grade=2024&class_name=Class 1&sort=document_count&order=desc",
+        headers=teacher_headers,
+    )
+    students = res.get_json()["students"]
+    assert {s["grade"] for s in students} == {"2024"}
+    assert {s["class_name"] for s in students} == {"Class 1"}
+    counts = [s["document_count"] for s in students]
+    assert counts == sorted(counts, reverse=True)
+
+    assert client.get("/api/users/students?sort=password_hash", headers=teacher_headers).status_code == 400
+    assert client.get("/api/users/students", headers=student_headers).status_code == 403
+
@@ -0,0 +1,84 @@
+from app.extensions import db
+from app.models import User
+from app.services import student_search
+
+
+def add_student(app, email, name, **fields):
+    with app.app_context():
+        student = User(email=email, name=name, role="student", **fields)
+        student.set_password("x")
+        db.session.add(student)
+        db.session.commit()
+        return student.id
+
+
+def search(client, headers, keyword, **params):
+    res = client.get("/api/users/students", query_string={"q": keyword, **params}, headers=headers)
+    assert res.status_code == 200
+    return [s["id"] for s in res.get_json()["students"]]
+
+
+def test_pinyin_text_includes_syllables_spellings_and_initials():
+    tokens = student_search.pinyin_text("张三").split()
+    assert {"zhang", "san", "zhangsan", "zs"} <= set(tokens)
+    # Surname heteronyms keep every reading.
+    assert {"zengxiaoming", "cengxiaoming"} <= set(student_search.pinyin_text("曾小明").split())
+    assert student_search.pinyin_text("Alice") == ""
+
+
+def test_roster_search_matches_names_pinyin_and_identifiers(app, client, teacher_headers):
+    zhang = add_student(app, "zs@test.com", "张三", student_id="2024001", class_name="A1")
+    li = add_student(app, "lisi@test.com", "李四", student_id="2024002", grade="2025")
+
+    assert search(client, teacher_headers, "张") == [zhang]
+    assert search(client, teacher_headers, "zhangs") == [zhang]
+    assert search(client, teacher_headers, "zs") == [zhang]
+    assert search(client, teacher_headers, "ls") == [li]
+    assert set(search(client, teacher_headers, "20240")) == {zhang, li}
+    assert search(client, teacher_headers, "lisi") == [li]
+    assert search(client, teacher_headers, "20240", grade="2025") == [li]
+    assert search(client, teacher_headers, "nobody") == []
+
+
+def test_roster_search_ranks_name_hits_first_and_tracks_updates(app, client, teacher_headers):
+    by_class = add_student(app, "c@test.com", "Other", class_name="wang")
+    by_name = add_student(app, "w@test.com", "王五")
+
+    assert search(client, teacher_headers, "wang") == [by_name, by_class]
+
+    with app.app_context():
+        db.session.get(User, by_name).name = "赵六"
+        db.session.commit()
+    assert search(client, teacher_headers, "wang") == [by_class]
+    assert search(client, teacher_headers, "zhao") == [by_name]
+
+
+def test_relevance_search_pages_and_counts_in_sql(app, client, teacher_headers):
+    ids = {add_student(app, f"chen{i}@test.com", f"陈{i}", grade="2025" if i % 2 else "2026") for i in range(5)}
+
+    pages = []
+    for page in (1, 2, 3):
+        res = client.get(
+            "/api/users/students", query_string={"q": "chen", "page": page, "page_size": 2}, headers=teacher_headers
+        ).get_json()
+        assert res["total"] == 5 and res["pages"] == 3
+        pages.extend(s["id"] for s in res["students"])
+    assert len(pages) == 5 and set(pages) == ids
+
+    res = client.get("/api/users/students", query_string={"q": "chen", "grade": "2025"}, headers=teacher_headers)
+    assert res.get_json()["total"] == 2
+
+
+def test_usage_updates_skip_the_index_rewrite(app, client, teacher_headers, monkeypatch):
+    student = add_student(app, "u@test.com", "孙七")
+    calls = []
+    monkeypatch.setattr(student_search, "pinyin_text", lambda name: calls.append(name) or "")
+
+    with app.app_context():
+        db.session.get(User, student).storage_used = 4096
+        db.session.commit()
+        assert calls == []
+        db.session.get(User, student).grade = "2027"
+        db.session.commit()
+        assert calls == ["孙七"]
+    assert search(client, teacher_headers, "2027") == [student]
@@ -0,0 +1,82 @@
+import io
+import os
+import zipfile
+
+from app.extensions import db
+from app.models import User
+from app.services.zip_stream import ZipEntry, iter_zip, unique_arcname
+
+PAYLOAD = os.urandom(300 * 1024)
+
+
+def upload_document(client, headers, name, payload=PAYLOAD):
+    res = client.post(
+        "/api/documents",
+        data={"file": (io.BytesIO(payload), name)},
+        headers=headers,
+        content_type="multipart/form-data",
+    )
+    assert res.status_code == 201
+    return res.get_json()["document"]["id"]
+
+
+def student_id(app) -> int:
+    with app.app_context():
+        student = User.query.filter_by(email="student@test.com").first()
+        student.class_name = "A1"
+        db.session.commit()
+        return student.id
+
+
+def test_iter_zip_streams_in_bounded_chunks(tmp_path):
+    source = tmp_path / "big.bin"
+    source.write_bytes(PAYLOAD)
+    entries = [ZipEntry.for_path("a.bin", str(source)), ZipEntry.for_path("gone.pdf", str(tmp_path / "nope"))]
+
+    chunks = list(iter_zip(entries, chunk_size=16 * 1024))
+    assert max(len(chunk) for chunk in chunks) < 17 * 1024
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+    assert archive.read("a.bin") == PAYLOAD
+    assert archive.read("missing_files.txt") == b"gone.pdf\n"
+
+
+def test_closing_the_stream_stops_reading(tmp_path):
+    source = tmp_path / "big.bin"
+    source.write_bytes(PAYLOAD)
+    entries = [ZipEntry.for_path("a.bin", str(source)), ZipEntry.for_path("b.bin", str(source))]
+    stream = iter_zip(entries, chunk_size=1024)
+    next(stream)
+    stream.close()
+    # A closed generator produces nothing more, and the source handle was released.
+    assert list(stream) == []
+
+
+def test_unique_arcname_deduplicates_and_strips_traversal():
+    used: set[str] = set()
+    assert unique_arcname("report.pdf", used) == "report.pdf"
+    assert unique_arcname("report.pdf", used) == "report (2).pdf"
+    assert unique_arcname("../../etc/passwd", used) == "etc/passwd"
+
+
+def test_student_and_class_exports(app, client, teacher_headers, student_headers):
+    sid = student_id(app)
+    first = upload_document(client, student_headers, "transcript.pdf")
+    upload_document(client, student_headers, "transcript.pdf", payload=b"second")
+
+    res = client.get(f"/api/users/students/{sid}/documents/export", headers=teacher_headers)
+    assert res.status_code == 200
+    assert res.mimetype == "application/zip"
+    assert res.is_streamed
+    archive = zipfile.ZipFile(io.BytesIO(res.data))
+    assert sorted(archive.namelist()) == ["transcript (2).pdf", "transcript.pdf"]
+    assert archive.read("transcript.pdf") == PAYLOAD
+
+    res = client.get(f"/api/users/students/{sid}/documents/export?ids={first}", headers=teacher_headers)
+    assert zipfile.ZipFile(io.BytesIO(res.data)).namelist() == ["transcript.pdf"]
+
+    res = client.get("/api/users/students/export?class_name=A1", headers=teacher_headers)
+    names = zipfile.ZipFile(io.BytesIO(res.data)).namelist()
+    assert len(names) == 2 and all(name.startswith(f"{sid}_Student Test/") for name in names)
+
+    assert client.get("/api/users/students/export", headers=teacher_headers).status_code == 400
+    assert client.get("/api/users/students/export?class_name=A1", headers=student_headers).status_code == 403
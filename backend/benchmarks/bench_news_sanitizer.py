@@ -0,0 +1,133 @@
+"""Micro-benchmark: single-pass news sanitizer vs. the previous regex pipeline.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_news_sanitizer
+    python -m benchmarks.bench_news_sanitizer --sizes 100k 1m --repeat 5
+
+Bodies are synthetic but shaped like pasted articles: headings, paragraphs
+with entities and inline styles, links, tables and one large base64 image.
+The legacy pipeline is the sanitize + plain text + cover extraction sequence
+that ``create_news`` used to run, kept here verbatim as the baseline.
+"""
+import argparse
+import base64
+import os
+import re
+import statistics
+import time
+from html import unescape
+
+from app.services.html_sanitizer import sanitize
+
+SIZES = {"100k": 100 * 1024, "1m": 1024 * 1024, "5m": 5 * 1024 * 1024}
+
+# --- legacy regex pipeline (baseline) ---------------------------------------
+
+TAG_DROP_PATTERN = re.compile(r"(?is)<(script|style|iframe|object|embed)[^>]*>.*?</\\1>")
+EVENT_ATTR_PATTERN_DOUBLE = re.compile(r'(?i)\son\w+\s*=\s*"[^"]*"')
+EVENT_ATTR_PATTERN_SINGLE = re.compile(r"(?i)\son\w+\s*=\s*'[^']*'")
+EVENT_ATTR_PATTERN_BARE = re.compile(r"(?i)\son\w+\s*=\s*[^\s>]+")
+JS_URI_PATTERN = re.compile(r"(?i)(href|src)\s*=\s*([\"'])\s*javascript:[^\"']*\\2")
+IMG_SRC_PATTERN = re.compile(r'(?is)<img[^>]+src=["\']([^"\']+)["\']')
+SUMMARY_STRIP_TAG_PATTERN = re.compile(r"(?is)<[^>]+>")
+
+
+def sanitize_news_html(content: str) -> str:
+    """Basic backend sanitization as defense-in-depth.
+
+    Frontend still uses DOMPurify before rendering details.
+    """
+    cleaned = TAG_DROP_PATTERN.sub("", content or "")
+    cleaned = EVENT_ATTR_PATTERN_DOUBLE.sub("", cleaned)
+    cleaned = EVENT_ATTR_PATTERN_SINGLE.sub("", cleaned)
+    cleaned = EVENT_ATTR_PATTERN_BARE.sub("", cleaned)
+    cleaned = JS_URI_PATTERN.sub(r"\\1=\\2#\\2", cleaned)
+    return cleaned.strip()
+
+
+def html_to_plain_text(content: str) -> str:
+    no_script = TAG_DROP_PATTERN.sub("", content or "")
+    no_tag = SUMMARY_STRIP_TAG_PATTERN.sub(" ", no_script)
+    text = unescape(no_tag)
+    text = re.sub(r"\s+", " ", text).strip()
+    return text
+
+
+def extract_cover_from_html(content: str) -> str | None:
+    match = IMG_SRC_PATTERN.search(content or "")
+    if match:
+        src = (match.group(1) or "").strip()
+        return src or None
+    return None
+
+
+
+
+def legacy_pipeline(content: str):
+    cleaned = sanitize_news_html(content)
+    return cleaned, html_to_plain_text(cleaned), extract_cover_from_html(cleaned)
+
+
+def single_pass(content: str):
+    result = sanitize(content, text_limit=720)
+    return result.html, result.text, result.cover_image
+
+
+# --- synthetic articles ------------------------------------------------------
+
+PARAGRAPH = (
+    '<p style="line-height:1.6" onclick="track()">留学申请季即将开始，&nbsp;请同学们关注'
+    '<a href="https://example.com/apply?id=1&amp;lang=zh">申请指南</a>与 IELTS / TOEFL 考试安排。'
+    "Deadlines for the <strong>Fall intake</strong> are approaching &mdash; plan early.</p>\n"
+)
+TABLE = (
+    "<table><tr><th>School</th><th>Deadline</th></tr>"
+    + "".join(f"<tr><td>University {i}</td><td>2026-01-{i % 28 + 1:02d}</td></tr>" for i in range(20))
+    + "</table>\n"
+)
+
+
+def make_article(size: int, image_share: float = 0.4) -> str:
+    image_bytes = int(size * image_share * 3 / 4)
+    image = base64.b64encode(os.urandom(image_bytes)).decode("ascii")
+    parts = ["<h1>2026 留学资讯汇总</h1>", f'<p><img src="data:image/png;base64,{image}" alt="banner"></p>']
+    length = sum(len(p) for p in parts)
+    i = 0
+    while length < size:
+        chunk = TABLE if i % 10 == 9 else PARAGRAPH
+        if i % 25 == 0:
+            chunk += "<script>console.log('tracking')</script>"
+        parts.append(chunk)
+        length += len(chunk)
+        i += 1
+    return "".join(parts)
+
+
+def measure(fn, content: str, repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(content)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", choices=sorted(SIZES), default=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'size':>6} {'impl':>12} {'median ms':>10} {'min ms':>10} {'MB/s':>8}")
+    for label in args.sizes:
+        content = make_article(SIZES[label])
+        for name, fn in (("legacy-regex", legacy_pipeline), ("single-pass", single_pass)):
+            timings = measure(fn, content, args.repeat)
+            median = statistics.median(timings)
+            throughput = len(content) / (1024 * 1024) / median if median else float("inf")
+            print(f"{label:>6} {name:>12} {median * 1000:>10.1f} {min(timings) * 1000:>10.1f} {throughput:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,20 @@
 ﻿let allStudents = [];
 
+const ROSTER_PAGE_SIZE = 48;
+
 const state = {
   activeStudentId: null,
   detailRequestSeq: 0,
+  page: 1,
+  pages: 0,
+  total: 0,
+  sort: "created_at",
+  order: "desc",
+  sortChosen: false,
+  q: "",
+  grade: "",
+  className: "",
+  listRequestSeq: 0,
 };
 
 function getAuthHeaders() {
@@ -89,13 +101,111 @@ async function ensureTeacher() {
 }
 
 async function fetchStudents() {
+  const requestSeq = ++state.listRequestSeq;
   const container = document.getElementById("students-list");
   container.className = "loading";
   container.innerHTML = "加载中...";
 
-  const data = await API.get("/api/users/students", { headers: getAuthHeaders() });
+  const params = new URLSearchParams({
+    page: String(state.page),
+    page_size: String(ROSTER_PAGE_SIZE),
+    sort: state.sort,
+    order: state.order,
+  });
+  if (state.q) {
+    params.set("q", state.q);
+    // Relevance order unless the teacher picked a sort explicitly.
+    if (!state.sortChosen) {
+      params.delete("sort");
+      params.delete("order");
+    }
+  }
+  if (state.grade) params.set("grade", state.grade);
+  if (state.className) params.set("class_name", state.className);
+
+  const data = await API.get(`/api/users/students?${params.toString()}`, { headers: getAuthHeaders() });
+  if (requestSeq !== state.listRequestSeq) {
+    return;
+  }
   allStudents = Array.isArray(data.students) ? data.students : [];
+  state.total = Number(data.total || 0);
+  state.pages = Number(data.pages || 0);
   renderStudents(allStudents);
+  renderPager();
+}
+
+function renderPager() {
+  const pager = document.getElementById("roster-pager");
+  if (!pager) return;
+  pager.style.display = state.pages > 1 ? "flex" : "none";
+  document.getElementById("roster-page-info").textContent = `第 ${state.page} / ${state.pages} 页 · 共 ${state.total} 名学生`;
+  document.getElementById("roster-prev").disabled = state.page <= 1;
+  document.getElementById("roster-next").disabled = state.page >= state.pages;
+}
+
+function reloadStudents() {
+  fetchStudents().catch((error) => {
+    console.error("加载学生列表失败:", error);
+    alert(`加载学生列表失败: ${error.message || error}`);
+  });
+}
+
+function bindRosterControls() {
+  const sortEl = document.getElementById("roster-sort");
+  if (sortEl) {
+    sortEl.addEventListener("change", () => {
+      const [sort, order] = String(sortEl.value).split(":");
+      state.sort = sort;
+      state.order = order;
+      state.sortChosen = true;
+      state.page = 1;
+      reloadStudents();
+    });
+  }
+
+  let filterTimer = null;
+  [["filter-grade", "grade"], ["filter-class", "className"]].forEach(([id, key]) => {
+    const el = document.getElementById(id);
+    if (!el) return;
+    el.addEventListener("input", () => {
+      clearTimeout(filterTimer);
+      filterTimer = setTimeout(() => {
+        state[key] = String(el.value || "").trim();
+        state.page = 1;
+        reloadStudents();
+      }, 300);
+    });
+  });
+
+  const exportBtn = document.getElementById("export-class");
+  if (exportBtn) {
+    exportBtn.addEventListener("click", () => {
+      if (!state.className) {
+        alert("请先在“班级”中输入要导出的班级");
+        return;
+      }
+      const params = new URLSearchParams({ class_name: state.className });
+      if (state.grade) params.set("grade", state.grade);
+      openTeacherDocByUrl(`/api/users/students/export?${params.toString()}`, "download", `${state.className}.zip`);
+    });
+  }
+
+  const prev = document.getElementById("roster-prev");
+  const next = document.getElementById("roster-next");
+  if (prev) {
+    prev.addEventListener("click", () => {
+      if (state.page <= 1) return;
+      state.page -= 1;
+      reloadStudents();
+    });
+  }
+  if (next) {
+    next.addEventListener("click", () => {
+      if (state.page >= state.pages) return;
+      state.page += 1;
+      reloadStudents();
+    });
+  }
 }
 
 function renderStudents(list) {
@@ -166,19 +276,15 @@ function bindSearch() {
   const input = document.getElementById("search-input");
   if (!input) return;
 
+  let searchTimer = null;
   input.addEventListener("input", (event) => {
-    const keyword = String(event.target.value || "").trim().toLowerCase();
-    if (!keyword) {
-      renderStudents(allStudents);
-      return;
-    }
-
-    const filtered = allStudents.filter((student) => {
-      return [student.name, student.student_id, student.email, student.grade, student.class_name]
-        .filter(Boolean)
-        .some((field) => String(field).toLowerCase().includes(keyword));
-    });
-    renderStudents(filtered);
+    clearTimeout(searchTimer);
+    const keyword = String(event.target.value || "").trim();
+    searchTimer = setTimeout(() => {
+      state.q = keyword;
+      state.page = 1;
+      reloadStudents();
+    }, 300);
   });
 }
 
@@ -189,17 +295,16 @@ async function openStudentDetail(studentId) {
   setModalLoading();
 
   try {
-    const [detail, docsResp] = await Promise.all([
-      API.get(`/api/users/students/${studentId}`, { headers: getAuthHeaders() }),
-      API.get(`/api/users/students/${studentId}/documents`, { headers: getAuthHeaders() }),
-    ]);
+    const detail = await API.get(`/api/users/students/${studentId}?include=documents`, {
+      headers: getAuthHeaders(),
+    });
 
     // Ignore stale response to avoid showing student/doc mismatch.
     if (requestSeq !== state.detailRequestSeq) {
       return;
     }
 
-    const documents = Array.isArray(docsResp.documents) ? docsResp.documents : detail.documents || [];
+    const documents = Array.isArray(detail.documents) ? detail.documents : [];
     renderStudentDetail(detail.student, documents);
   } catch (error) {
     console.error("加载学生详情失败:", error);
@@ -262,7 +367,7 @@ function renderStudentDetail(student, documents) {
     .join("");
 }
 
-async function openTeacherDocByUrl(endpoint, mode) {
+async function openTeacherDocByUrl(endpoint, mode, filename = "document") {
   if (!endpoint) return;
   const endpointPath = String(endpoint).startsWith("/") ? endpoint : `/${endpoint}`;
 
@@ -287,7 +392,7 @@ async function openTeacherDocByUrl(endpoint, mode) {
         previewWindow.close();
       }
       await Auth.refresh();
-      return openTeacherDocByUrl(endpointPath, mode);
+      return openTeacherDocByUrl(endpointPath, mode, filename);
     }
 
     if (!response.ok) {
@@ -301,7 +406,7 @@ async function openTeacherDocByUrl(endpoint, mode) {
     if (mode === "download") {
       const link = document.createElement("a");
       link.href = url;
-      link.download = "document";
+      link.download = filename;
       document.body.appendChild(link);
       link.click();
       document.body.removeChild(link);
@@ -358,6 +463,8 @@ function bindModalEvents() {
     } else if (action === "download-doc") {
       const endpoint = btn.dataset.downloadUrl || "";
       openTeacherDocByUrl(endpoint, "download");
+    } else if (action === "export-docs" && state.activeStudentId) {
+      openTeacherDocByUrl(`/api/users/students/${state.activeStudentId}/documents/export`, "download", "documents.zip");
     }
   });
 }
@@ -389,6 +496,7 @@ async function initStudentsPage() {
     if (!allowed) return;
 
     bindSearch();
+    bindRosterControls();
     bindStudentCardEvents();
     bindModalEvents();
     await fetchStudents();
@@ -0,0 +1,43 @@
+"""add updated_at to user and document
+
+Revision ID: 5b8e2c4f91a3
+Revises: c3f1a7d2e845
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = "5b8e2c4f91a3"
+down_revision = "c3f1a7d2e845"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    for table in ("user", "document"):
+        columns = {c["name"] for c in inspector.get_columns(table)}
+        if "updated_at" in columns:
+            continue
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column("updated_at", sa.DateTime(), nullable=True))
+        # Seed from created_at so conditional-GET validators start out stable.
+        op.execute(f'UPDATE "{table}" SET updated_at = created_at WHERE updated_at IS NULL')
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    for table in ("document", "user"):
+        columns = {c["name"] for c in inspector.get_columns(table)}
+        if "updated_at" not in columns:
+            continue
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column("updated_at")
@@ -0,0 +1,47 @@
+"""add news full-text search index
+
+Revision ID: 99e57398ae68
+Revises: 9f1d3bc1d7c0
+Create Date: 2026-10-17 09:00:00.000000
+
+Existing rows are not indexed here; run ``flask news reindex`` afterwards.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "99e57398ae68"
+down_revision = "9f1d3bc1d7c0"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
+    if dialect == "sqlite":
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS news_fts "
+            "USING fts5(title, summary, author, tokenize='unicode61 remove_diacritics 2')"
+        )
+    elif dialect == "postgresql":
+        op.execute(
+            "CREATE TABLE IF NOT EXISTS news_search ("
+            "news_id INTEGER PRIMARY KEY REFERENCES news(id) ON DELETE CASCADE, "
+            "document tsvector NOT NULL)"
+        )
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_news_search_document ON news_search USING GIN (document)"
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
+    if dialect == "sqlite":
+        op.execute("DROP TABLE IF EXISTS news_fts")
+    elif dialect == "postgresql":
+        op.execute("DROP TABLE IF EXISTS news_search")
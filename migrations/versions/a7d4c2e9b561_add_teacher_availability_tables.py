@@ -0,0 +1,86 @@
+"""add teacher availability: working hours, slot templates, blackout dates
+
+Revision ID: a7d4c2e9b561
+Revises: f2c7a9d5e183
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = "a7d4c2e9b561"
+down_revision = "f2c7a9d5e183"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    if "teacher_working_hours" not in tables:
+        op.create_table(
+            "teacher_working_hours",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("teacher_id", sa.Integer(), nullable=False),
+            sa.Column("weekday", sa.SmallInteger(), nullable=False),
+            sa.Column("start_time", sa.Time(), nullable=False),
+            sa.Column("end_time", sa.Time(), nullable=False),
+            sa.ForeignKeyConstraint(["teacher_id"], ["user.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index(
+            "ix_teacher_working_hours_teacher_id", "teacher_working_hours", ["teacher_id"], unique=False
+        )
+
+    if "slot_template" not in tables:
+        op.create_table(
+            "slot_template",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("teacher_id", sa.Integer(), nullable=False),
+            sa.Column("start_time", sa.Time(), nullable=False),
+            sa.Column("end_time", sa.Time(), nullable=False),
+            sa.ForeignKeyConstraint(["teacher_id"], ["user.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("teacher_id", "start_time", "end_time", name="uq_slot_template_teacher_slot"),
+        )
+        op.create_index("ix_slot_template_teacher_id", "slot_template", ["teacher_id"], unique=False)
+
+    if "teacher_blackout" not in tables:
+        op.create_table(
+            "teacher_blackout",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("teacher_id", sa.Integer(), nullable=False),
+            sa.Column("start_date", sa.Date(), nullable=False),
+            sa.Column("end_date", sa.Date(), nullable=False),
+            sa.Column("reason", sa.String(length=255), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(["teacher_id"], ["user.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index(
+            "ix_teacher_blackout_teacher_dates",
+            "teacher_blackout",
+            ["teacher_id", "start_date", "end_date"],
+            unique=False,
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    if "teacher_blackout" in tables:
+        op.drop_index("ix_teacher_blackout_teacher_dates", table_name="teacher_blackout")
+        op.drop_table("teacher_blackout")
+    if "slot_template" in tables:
+        op.drop_index("ix_slot_template_teacher_id", table_name="slot_template")
+        op.drop_table("slot_template")
+    if "teacher_working_hours" in tables:
+        op.drop_index("ix_teacher_working_hours_teacher_id", table_name="teacher_working_hours")
+        op.drop_table("teacher_working_hours")
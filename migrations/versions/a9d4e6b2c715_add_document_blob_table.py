@@ -0,0 +1,58 @@
+"""add document_blob table for content-deduplicated uploads
+
+Revision ID: a9d4e6b2c715
+Revises: f1c7d3a8e592
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = "a9d4e6b2c715"
+down_revision = "f1c7d3a8e592"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if "document_blob" not in inspector.get_table_names():
+        op.create_table(
+            "document_blob",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("sha256", sa.String(length=64), nullable=False),
+            sa.Column("storage_key", sa.String(length=1024), nullable=False),
+            sa.Column("size", sa.BigInteger(), nullable=False),
+            sa.Column("ref_count", sa.Integer(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("sha256", name="uq_document_blob_sha256"),
+        )
+
+    columns = {c["name"] for c in inspector.get_columns("document")}
+    if "blob_id" not in columns:
+        # Existing rows keep owning their files until `flask documents dedupe` links them.
+        with op.batch_alter_table("document", schema=None) as batch_op:
+            batch_op.add_column(sa.Column("blob_id", sa.Integer(), nullable=True))
+            batch_op.create_foreign_key("fk_document_blob_id", "document_blob", ["blob_id"], ["id"])
+            batch_op.create_index("ix_document_blob_id", ["blob_id"], unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    columns = {c["name"] for c in inspector.get_columns("document")}
+    if "blob_id" in columns:
+        with op.batch_alter_table("document", schema=None) as batch_op:
+            batch_op.drop_index("ix_document_blob_id")
+            batch_op.drop_constraint("fk_document_blob_id", type_="foreignkey")
+            batch_op.drop_column("blob_id")
+
+    if "document_blob" in inspector.get_table_names():
+        op.drop_table("document_blob")
@@ -0,0 +1,48 @@
+"""add storage usage counter and quota override to user
+
+Revision ID: b3e7f2a4d806
+Revises: a9d4e6b2c715
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = "b3e7f2a4d806"
+down_revision = "a9d4e6b2c715"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    columns = {c["name"] for c in inspector.get_columns("user")}
+
+    with op.batch_alter_table("user", schema=None) as batch_op:
+        if "storage_used" not in columns:
+            batch_op.add_column(sa.Column("storage_used", sa.BigInteger(), nullable=False, server_default="0"))
+        if "storage_quota" not in columns:
+            batch_op.add_column(sa.Column("storage_quota", sa.BigInteger(), nullable=True))
+
+    if "storage_used" not in columns:
+        # Seed the counter; `flask users reconcile-usage` recomputes it later if it drifts.
+        op.execute(
+            'UPDATE "user" SET storage_used = ('
+            "SELECT COALESCE(SUM(document.file_size), 0) FROM document WHERE document.user_id = \"user\".id)"
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    columns = {c["name"] for c in inspector.get_columns("user")}
+
+    with op.batch_alter_table("user", schema=None) as batch_op:
+        if "storage_quota" in columns:
+            batch_op.drop_column("storage_quota")
+        if "storage_used" in columns:
+            batch_op.drop_column("storage_used")
@@ -0,0 +1,39 @@
+"""add news (created_at, id) index for keyset pagination
+
+Revision ID: c3f1a7d2e845
+Revises: 99e57398ae68
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = "c3f1a7d2e845"
+down_revision = "99e57398ae68"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "news" not in inspector.get_table_names():
+        return
+
+    existing_indexes = {ix.get("name") for ix in inspector.get_indexes("news")}
+    if "ix_news_created_at_id" not in existing_indexes:
+        op.create_index("ix_news_created_at_id", "news", ["created_at", "id"], unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "news" not in inspector.get_table_names():
+        return
+
+    existing_indexes = {ix.get("name") for ix in inspector.get_indexes("news")}
+    if "ix_news_created_at_id" in existing_indexes:
+        op.drop_index("ix_news_created_at_id", table_name="news")
@@ -0,0 +1,65 @@
+"""add document_text table and document full-text index
+
+Revision ID: c8d1f5a3e927
+Revises: b3e7f2a4d806
+Create Date: 2026-10-17 17:00:00.000000
+
+Existing uploads have no text yet; run ``flask documents extract-text`` afterwards.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = "c8d1f5a3e927"
+down_revision = "b3e7f2a4d806"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    dialect = bind.dialect.name
+
+    if "document_text" not in inspector.get_table_names():
+        op.create_table(
+            "document_text",
+            sa.Column("document_id", sa.Integer(), nullable=False),
+            sa.Column("status", sa.String(length=16), nullable=False),
+            sa.Column("content", sa.Text(), nullable=False),
+            sa.Column("error", sa.String(length=255), nullable=True),
+            sa.Column("extracted_at", sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(["document_id"], ["document.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("document_id"),
+        )
+
+    if dialect == "sqlite":
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS document_fts "
+            "USING fts5(name, content, tokenize='unicode61 remove_diacritics 2')"
+        )
+    elif dialect == "postgresql":
+        op.execute(
+            "CREATE TABLE IF NOT EXISTS document_search ("
+            "document_id INTEGER PRIMARY KEY REFERENCES document(id) ON DELETE CASCADE, "
+            "document tsvector NOT NULL)"
+        )
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_document_search_document ON document_search USING GIN (document)"
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    dialect = bind.dialect.name
+
+    if dialect == "sqlite":
+        op.execute("DROP TABLE IF EXISTS document_fts")
+    elif dialect == "postgresql":
+        op.execute("DROP TABLE IF EXISTS document_search")
+
+    if "document_text" in inspector.get_table_names():
+        op.drop_table("document_text")
@@ -0,0 +1,41 @@
+"""add document (user_id, created_at, id) index for keyset pagination
+
+Revision ID: d5a9e3c7b214
+Revises: c8d1f5a3e927
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = "d5a9e3c7b214"
+down_revision = "c8d1f5a3e927"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "document" not in inspector.get_table_names():
+        return
+
+    existing_indexes = {ix.get("name") for ix in inspector.get_indexes("document")}
+    if "ix_document_user_id_created_at" not in existing_indexes:
+        op.create_index(
+            "ix_document_user_id_created_at", "document", ["user_id", "created_at", "id"], unique=False
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "document" not in inspector.get_table_names():
+        return
+
+    existing_indexes = {ix.get("name") for ix in inspector.get_indexes("document")}
+    if "ix_document_user_id_created_at" in existing_indexes:
+        op.drop_index("ix_document_user_id_created_at", table_name="document")
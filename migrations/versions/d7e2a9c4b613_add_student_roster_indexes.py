@@ -0,0 +1,51 @@
+"""add indexes for the teacher student roster
+
+Revision ID: d7e2a9c4b613
+Revises: 5b8e2c4f91a3
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = "d7e2a9c4b613"
+down_revision = "5b8e2c4f91a3"
+branch_labels = None
+depends_on = None
+
+
+INDEXES = (
+    ("user", "ix_user_role_grade_class", ["role", "grade", "class_name"]),
+    ("user", "ix_user_role_created_at", ["role", "created_at"]),
+    # Per-student document counts are a LEFT JOIN on document.user_id.
+    ("document", "ix_document_user_id", ["user_id"]),
+)
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    for table, name, columns in INDEXES:
+        if table not in tables:
+            continue
+        existing_indexes = {ix.get("name") for ix in inspector.get_indexes(table)}
+        if name not in existing_indexes:
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    for table, name, _columns in reversed(INDEXES):
+        if table not in tables:
+            continue
+        existing_indexes = {ix.get("name") for ix in inspector.get_indexes(table)}
+        if name in existing_indexes:
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,47 @@
+"""add student roster search index
+
+Revision ID: e4b8c1f0a27d
+Revises: d7e2a9c4b613
+Create Date: 2026-10-17 13:00:00.000000
+
+Existing students are not indexed here; run ``flask users reindex`` afterwards.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e4b8c1f0a27d"
+down_revision = "d7e2a9c4b613"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
+    if dialect == "sqlite":
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS student_fts "
+            "USING fts5(name, pinyin, ident, tokenize='unicode61 remove_diacritics 2')"
+        )
+    elif dialect == "postgresql":
+        op.execute(
+            "CREATE TABLE IF NOT EXISTS student_search ("
+            'user_id INTEGER PRIMARY KEY REFERENCES "user"(id) ON DELETE CASCADE, '
+            "document tsvector NOT NULL)"
+        )
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_student_search_document ON student_search USING GIN (document)"
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
+    if dialect == "sqlite":
+        op.execute("DROP TABLE IF EXISTS student_fts")
+    elif dialect == "postgresql":
+        op.execute("DROP TABLE IF EXISTS student_search")
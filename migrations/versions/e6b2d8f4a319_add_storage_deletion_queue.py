@@ -0,0 +1,45 @@
+"""add storage_deletion queue for deferred file deletion
+
+Revision ID: e6b2d8f4a319
+Revises: d5a9e3c7b214
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = "e6b2d8f4a319"
+down_revision = "d5a9e3c7b214"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if "storage_deletion" not in inspector.get_table_names():
+        op.create_table(
+            "storage_deletion",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("namespace", sa.String(length=32), nullable=False),
+            sa.Column("key", sa.String(length=1024), nullable=False),
+            sa.Column("attempts", sa.Integer(), nullable=False),
+            sa.Column("last_error", sa.String(length=255), nullable=True),
+            sa.Column("not_before", sa.DateTime(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_storage_deletion_not_before", "storage_deletion", ["not_before"], unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if "storage_deletion" in inspector.get_table_names():
+        op.drop_index("ix_storage_deletion_not_before", table_name="storage_deletion")
+        op.drop_table("storage_deletion")
@@ -0,0 +1,54 @@
+"""add upload_session table for resumable uploads
+
+Revision ID: f1c7d3a8e592
+Revises: e4b8c1f0a27d
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = "f1c7d3a8e592"
+down_revision = "e4b8c1f0a27d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "upload_session" in inspector.get_table_names():
+        return
+
+    op.create_table(
+        "upload_session",
+        sa.Column("id", sa.String(length=32), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("filename", sa.String(length=255), nullable=False),
+        sa.Column("file_type", sa.String(length=32), nullable=False),
+        sa.Column("category", sa.String(length=64), nullable=False),
+        sa.Column("total_size", sa.BigInteger(), nullable=False),
+        sa.Column("received", sa.BigInteger(), nullable=False),
+        sa.Column("checksum", sa.String(length=64), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_upload_session_user_id", "upload_session", ["user_id"], unique=False)
+    op.create_index("ix_upload_session_expires_at", "upload_session", ["expires_at"], unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "upload_session" not in inspector.get_table_names():
+        return
+
+    op.drop_index("ix_upload_session_expires_at", table_name="upload_session")
+    op.drop_index("ix_upload_session_user_id", table_name="upload_session")
+    op.drop_table("upload_session")
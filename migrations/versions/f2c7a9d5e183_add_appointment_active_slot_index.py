@@ -0,0 +1,65 @@
+"""add partial unique index on active appointment slots
+
+Revision ID: f2c7a9d5e183
+Revises: e6b2d8f4a319
+Create Date: 2026-10-17 20:00:00.000000
+
+Double bookings left by the old check-then-insert race are resolved first:
+per slot the approved (else the earliest) active appointment is kept and the
+others are marked cancelled.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = "f2c7a9d5e183"
+down_revision = "e6b2d8f4a319"
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = "uq_appointments_active_slot"
+ACTIVE = "status IN ('pending', 'approved')"
+RANK = "CASE {0}.status WHEN 'approved' THEN 0 ELSE 1 END"
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "appointments" not in inspector.get_table_names():
+        return
+    existing_indexes = {ix.get("name") for ix in inspector.get_indexes("appointments")}
+    if INDEX_NAME in existing_indexes:
+        return
+
+    op.execute(
+        "UPDATE appointments SET status = 'cancelled' "
+        f"WHERE {ACTIVE} AND EXISTS ("
+        "SELECT 1 FROM appointments AS other "
+        "WHERE other.teacher_id = appointments.teacher_id "
+        "AND other.appointment_date = appointments.appointment_date "
+        "AND other.time_slot = appointments.time_slot "
+        "AND other.status IN ('pending', 'approved') "
+        f"AND ({RANK.format('other')} < {RANK.format('appointments')} "
+        f"OR ({RANK.format('other')} = {RANK.format('appointments')} AND other.id < appointments.id)))"
+    )
+    op.create_index(
+        INDEX_NAME,
+        "appointments",
+        ["teacher_id", "appointment_date", "time_slot"],
+        unique=True,
+        sqlite_where=sa.text(ACTIVE),
+        postgresql_where=sa.text(ACTIVE),
+    )
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "appointments" not in inspector.get_table_names():
+        return
+
+    existing_indexes = {ix.get("name") for ix in inspector.get_indexes("appointments")}
+    if INDEX_NAME in existing_indexes:
+        op.drop_index(INDEX_NAME, table_name="appointments")